@@ -7,6 +7,17 @@ import os
 from application.config import LocalDevelopmentConfig as LDC
 from application.database import init_app  # use the new init_app
 from application.api import register_routes
+from application.api.representations import init_representations
+from application.compression import init_compression
+from application.cache import init_cache
+from application.instrumentation import init_instrumentation
+from application.passwords import init_passwords
+from application.ratelimit import init_ratelimit
+from application.jobs import init_jobs
+from application.audit import init_audit
+from application.merchants import init_merchants
+from application.storage import init_storage
+from application.realtime import init_realtime, socketio
 
 load_dotenv()
 
@@ -20,6 +31,13 @@ def create_app():
     - Configs (development only for now)
     - Database (SQLAlchemy + Alembic migrations)
     - CORS and session security
+    - JSON encoding and response compression
+    - Request / SQL instrumentation
+    - Background job registry (jobs run in worker.py)
+    - Buffered audit log writer
+    - Merchant dictionary (vendor -> canonical merchant)
+    - Content-addressed receipt storage
+    - Socket.IO push of transaction changes
     """
 
     app = Flask(__name__, template_folder="../templates")
@@ -34,10 +52,41 @@ def create_app():
     # Initialize DB, Alembic migrations, and engine
     init_app(app)
 
+    # Read-through cache for users / categories
+    init_cache(app)
+
+    # Bounded KDF pool for password hashing
+    init_passwords(app)
+
+    # Token-bucket throttling for auth endpoints (after the cache: may use its shared tier)
+    init_ratelimit(app)
+
+    # Background job handlers (enqueue validates against this registry)
+    init_jobs(app)
+
+    # Audit events are buffered and written in batches off the request thread
+    init_audit(app)
+
+    # Compiled vendor matcher, loaded from merchant_aliases on first use
+    init_merchants(app)
+
+    # Receipt files, stored once per content hash
+    init_storage(app)
+
     # REST API
     api = Api(app)
+    init_representations(api)
     register_routes(api)
 
+    # WebSocket push of transaction deltas to each user's room
+    init_realtime(app)
+
+    # gzip/brotli for large payloads
+    init_compression(app)
+
+    # Per-endpoint latency / SQL metrics and /metrics endpoint
+    init_instrumentation(app)
+
     # Set up CORS
     CORS(app, supports_credentials=True, origins=["http://localhost:5173"])
 
@@ -56,4 +105,5 @@ from application.api import *
 
 
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5050, debug=True)
+    # socketio.run serves both the REST API and the Socket.IO endpoint
+    socketio.run(app, host="0.0.0.0", port=5050, debug=True, allow_unsafe_werkzeug=True)
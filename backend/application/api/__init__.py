@@ -3,6 +3,11 @@ from .general_api import *
 from .auth.auth_api import *
 from .user.user_api import *
 from .transaction.transaction_api import *
+from .export.export_api import *
+from .job.job_api import *
+from .merchant.merchant_api import *
+from .receipt.receipt_api import *
+from .ml.ml_api import *
 
 
 def register_routes(api):
@@ -11,13 +16,17 @@ def register_routes(api):
     """
     # General / Utility Routes
     api.add_resource(HealthCheck, "/api/health")
+    api.add_resource(Liveness, "/api/health/live")
+    api.add_resource(Readiness, "/api/health/ready")
     api.add_resource(Home, "/")
+    api.add_resource(CacheStats, "/api/admin/cache")
 
     # Authentication
     api.add_resource(Register, "/api/register")
     api.add_resource(Login, "/api/login")
     api.add_resource(Profile, "/api/profile")
     api.add_resource(Logout, "/api/logout")
+    api.add_resource(LogoutAll, "/api/logout-all")
     api.add_resource(Refresh, "/api/token/refresh")
     api.add_resource(PasswordResetRequest, "/api/password-reset/request")
     api.add_resource(PasswordResetConfirm, "/api/password-reset/confirm")
@@ -31,4 +40,29 @@ def register_routes(api):
 
     # Transactions
     api.add_resource(TransactionListAPI, "/api/transactions")
-    api.add_resource(TransactionDetailAPI, "/api/transactions/<int:txn_id>")
\ No newline at end of file
+    api.add_resource(TransactionSummaryAPI, "/api/transactions/summary")
+    api.add_resource(TransactionChangesAPI, "/api/transactions/changes")
+    api.add_resource(TransactionImportAPI, "/api/transactions/import")
+    api.add_resource(TransactionDuplicatesAPI, "/api/transactions/duplicates")
+    api.add_resource(CategorySuggestionAPI, "/api/transactions/suggest-category")
+    api.add_resource(TransactionDetailAPI, "/api/transactions/<int:txn_id>")
+
+    # Merchant dictionary
+    api.add_resource(MerchantListAPI, "/api/merchants")
+    api.add_resource(MerchantDetailAPI, "/api/merchants/<int:merchant_id>")
+
+    # Receipt attachments
+    api.add_resource(TransactionReceiptsAPI, "/api/transactions/<int:txn_id>/receipts")
+    api.add_resource(ReceiptDetailAPI, "/api/receipts/<int:receipt_id>")
+    api.add_resource(ReceiptFileAPI, "/api/receipts/<int:receipt_id>/file")
+    api.add_resource(ReceiptThumbnailAPI, "/api/receipts/<int:receipt_id>/thumbnail")
+
+    # Categorizer models
+    api.add_resource(MLModelListAPI, "/api/admin/ml/models")
+
+    # Exports
+    api.add_resource(TransactionExportAPI, "/api/admin/exports/transactions")
+
+    # Background jobs
+    api.add_resource(JobListAPI, "/api/jobs")
+    api.add_resource(JobDetailAPI, "/api/jobs/<int:job_id>")
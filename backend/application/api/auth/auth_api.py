@@ -4,13 +4,10 @@ from flask import request, jsonify
 from flask_restful import Resource
 from ...models.models import User
 from application.database import db
-import jwt
 import datetime
 import os
 from werkzeug.security import generate_password_hash, check_password_hash
 
-SECRET_KEY = os.getenv("SECRET_KEY", "dev_secret_key")
-
 
 # application/api/auth_api.py
 
@@ -18,15 +15,21 @@ from flask_restful import Resource
 from flask import request, jsonify, current_app
 from werkzeug.security import generate_password_hash, check_password_hash
 from ...models.models import User, PasswordResetToken, TokenBlocklist
+from ...models.model_utils import get_user
+from ...ratelimit import rate_limited, client_ip
+from ... import audit
 from application.database import db
 from .auth_utils import (
-    create_access_token,
-    create_refresh_token,
     decode_token,
     revoke_token,
     token_required,
     role_required,
-    is_jti_revoked
+    is_jti_revoked,
+    issue_token_pair,
+    rotate_refresh_token,
+    revoke_token_family,
+    revoke_all_user_tokens,
+    RefreshError
 )
 import datetime
 import os
@@ -37,6 +40,7 @@ REFRESH_EXPIRES_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRES_DAYS", 7))
 
 
 class Register(Resource):
+    @rate_limited("register_ip")
     def post(self):
         data = request.get_json() or {}
         name = data.get("name")
@@ -56,6 +60,7 @@ class Register(Resource):
 
 
 class Login(Resource):
+    @rate_limited("login_ip", "login_account")
     def post(self):
         data = request.get_json() or {}
         email = data.get("email")
@@ -65,20 +70,19 @@ class Login(Resource):
 
         user = User.query.filter_by(email=email).first()
         if not user or not user.check_password(password):
+            audit.record("auth.login_failed", actor_id=user.id if user else None,
+                         details={"email": email, "ip": client_ip()})
             return {"message": "invalid credentials"}, 401
+        if not user.is_active:
+            return {"message": "account is disabled"}, 403
 
-        access_token, access_jti, access_exp = create_access_token(user.id, additional_claims={"role": user.role})
-        refresh_token, refresh_jti, refresh_exp = create_refresh_token(user.id)
-
-        # Optionally store refresh_jti in DB (we're not creating a separate refresh model here, but you can)
-        # For now we'll not persist refresh tokens but we do allow revocation via blocklist.
+        # starts a new refresh-token family (persisted in RefreshToken)
+        tokens = issue_token_pair(user)
+        audit.record("auth.login", actor_id=user.id, details={"ip": client_ip()})
 
         return {
             "message": "ok",
-            "access_token": access_token,
-            "access_expires": access_exp.isoformat(),
-            "refresh_token": refresh_token,
-            "refresh_expires": refresh_exp.isoformat(),
+            **tokens,
             "user": user.to_dict()
         }, 200
 
@@ -97,26 +101,42 @@ class Logout(Resource):
         exp = datetime.datetime.utcfromtimestamp(payload.get("exp")) if payload.get("exp") else None
         revoke_token(jti=jti, user_id=payload.get("user_id"), token_type=payload.get("type", "access"), expires_at=exp)
 
-        # optionally handle refresh token revocation if refresh token provided in body
+        # optionally end the refresh-token family (this device's session) if provided in body
         data = request.get_json() or {}
         refresh = data.get("refresh_token")
         if refresh:
             try:
                 ref_payload = decode_token(refresh)
-                revoke_token(jti=ref_payload.get("jti"), user_id=ref_payload.get("user_id"), token_type="refresh",
-                             expires_at=datetime.datetime.utcfromtimestamp(ref_payload.get("exp")))
+                if ref_payload.get("fam") and ref_payload.get("user_id") == request.user.id:
+                    revoke_token_family(ref_payload["fam"])
             except Exception:
                 pass
 
+        audit.record("auth.logout", actor_id=request.user.id, details={"ip": client_ip()})
         return {"message": "tokens revoked"}, 200
 
 
+class LogoutAll(Resource):
+    """
+    Revoke every access and refresh token of the current user (all devices).
+    POST /api/logout-all
+    """
+    @token_required
+    def post(self):
+        revoke_all_user_tokens(request.user)
+        audit.record("auth.logout_all", actor_id=request.user.id, details={"ip": client_ip()})
+        return {"message": "all sessions revoked"}, 200
+
+
 class Refresh(Resource):
     """
     Refresh access token using refresh token provided in body.
+    The refresh token is rotated: the response carries a new one and the old
+    one stops working. Replaying an old one revokes the whole session family.
     POST /api/token/refresh
     body: {"refresh_token": "<token>"}
     """
+    @rate_limited("refresh_ip")
     def post(self):
         data = request.get_json() or {}
         refresh_token = data.get("refresh_token")
@@ -133,12 +153,20 @@ class Refresh(Resource):
         if is_jti_revoked(payload.get("jti")):
             return {"message": "refresh token revoked"}, 401
 
-        user = User.query.get(payload.get("user_id"))
+        user = get_user(payload.get("user_id"))
         if not user:
             return {"message": "user not found"}, 404
+        if not user.is_active:
+            return {"message": "account is disabled"}, 403
 
-        access_token, access_jti, access_exp = create_access_token(user.id, additional_claims={"role": user.role})
-        return {"access_token": access_token, "access_expires": access_exp.isoformat()}, 200
+        try:
+            tokens = rotate_refresh_token(payload, user)
+        except RefreshError as e:
+            if e.reuse:
+                audit.record("auth.refresh_reuse", actor_id=user.id,
+                             details={"family": payload.get("fam"), "ip": client_ip()})
+            return {"message": e.message}, e.status
+        return tokens, 200
 
 
 class PasswordResetRequest(Resource):
@@ -147,6 +175,7 @@ class PasswordResetRequest(Resource):
     POST /api/password-reset/request
     body: {"email": "<email>"}
     """
+    @rate_limited("reset_ip", "reset_account")
     def post(self):
         data = request.get_json() or {}
         email = data.get("email")
@@ -194,11 +223,9 @@ class PasswordResetConfirm(Resource):
         user = matched.user
         user.set_password(new_pw)
         db.session.add(user)
-        db.session.commit()
-
-        # optionally revoke all outstanding refresh tokens (force logout everywhere)
-        # For simplicity, add blocklist entry for all tokens belonging to user created before now
-        # (This is rough; a full implementation would store issued jtis for refresh tokens.)
+        # force logout everywhere: one token_generation bump invalidates every issued token
+        revoke_all_user_tokens(user)
+        audit.record("auth.password_reset", actor_id=user.id, details={"ip": client_ip()})
         return {"message": "password reset successful"}, 200
 
 
@@ -217,21 +244,6 @@ class Profile(Resource):
     GET /api/profile
     """
 
+    @token_required
     def get(self):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return {"message": "Missing or invalid Authorization header."}, 401
-
-        token = auth_header.split(" ")[1]
-
-        try:
-            payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-            user = User.query.get(payload["user_id"])
-            if not user:
-                return {"message": "User not found."}, 404
-        except jwt.ExpiredSignatureError:
-            return {"message": "Token expired."}, 401
-        except jwt.InvalidTokenError:
-            return {"message": "Invalid token."}, 401
-
-        return {"user": user.to_dict()}, 200
+        return {"user": request.user.to_dict()}, 200
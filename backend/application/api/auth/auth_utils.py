@@ -5,7 +5,10 @@ import jwt
 import datetime
 from functools import wraps
 from flask import request, jsonify, current_app
-from ...models.models import User, TokenBlocklist
+from sqlalchemy import update, func
+from application.cache import invalidate_on_commit, user_key
+from ...models.models import User, TokenBlocklist, RefreshToken
+from ...models.model_utils import get_user
 from application.database import db
 
 # configuration
@@ -33,7 +36,7 @@ def create_access_token(user_id: int, additional_claims: dict = None):
     token = jwt.encode(payload, _get_secret(), algorithm="HS256")
     return token, jti, exp
 
-def create_refresh_token(user_id: int):
+def create_refresh_token(user_id: int, additional_claims: dict = None):
     now = datetime.datetime.utcnow()
     exp = now + datetime.timedelta(days=REFRESH_TOKEN_EXPIRES)
     jti = jwt.utils.base64url_encode(os.urandom(16)).decode('utf-8')
@@ -44,9 +47,97 @@ def create_refresh_token(user_id: int):
         "iat": now,
         "jti": jti
     }
+    if additional_claims:
+        payload.update(additional_claims)
     token = jwt.encode(payload, _get_secret(), algorithm="HS256")
     return token, jti, exp
 
+
+# --------------------------- Refresh token families ---------------------------
+def issue_token_pair(user, family_id: str = None, commit: bool = True):
+    """
+    Issue an access token and a persisted refresh token for `user`.
+    A new login starts a new family; rotation passes the existing family_id.
+    Both tokens carry the user's token_generation ("gen").
+    """
+    family_id = family_id or jwt.utils.base64url_encode(os.urandom(16)).decode('utf-8')
+    gen = user.token_generation or 0
+    access_token, _, access_exp = create_access_token(user.id, additional_claims={"role": user.role, "gen": gen})
+    refresh_token, refresh_jti, refresh_exp = create_refresh_token(user.id, additional_claims={"fam": family_id, "gen": gen})
+    db.session.add(RefreshToken(user_id=user.id, token=refresh_jti, family_id=family_id, expires_at=refresh_exp))
+    if commit:
+        db.session.commit()
+    return {
+        "access_token": access_token,
+        "access_expires": access_exp.isoformat(),
+        "refresh_token": refresh_token,
+        "refresh_expires": refresh_exp.isoformat(),
+    }
+
+
+class RefreshError(Exception):
+    """Refresh rejected; `status` is the HTTP status to answer with."""
+
+    def __init__(self, message, status=401, reuse=False):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.reuse = reuse  # an already-rotated token was replayed
+
+
+def revoke_token_family(family_id: str, commit: bool = True):
+    RefreshToken.query.filter_by(family_id=family_id, revoked=False).update({"revoked": True}, synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
+def revoke_all_user_tokens(user, commit: bool = True):
+    """
+    Log `user` out everywhere: one integer bump invalidates every access and
+    refresh token already issued (checked against the cached user), and the
+    persisted refresh rows are marked revoked for bookkeeping.
+    The bump is an SQL increment: `user` may be a cached snapshot, and writing
+    back snapshot + 1 would revoke nothing if another process bumped it first.
+    """
+    db.session.execute(
+        update(User).where(User.id == user.id)
+        .values(token_generation=func.coalesce(User.token_generation, 0) + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if user in db.session:
+        db.session.expire(user, ["token_generation"])  # re-read on next access (issue_token_pair)
+    invalidate_on_commit(db.session, user_key(user.id))
+    RefreshToken.query.filter_by(user_id=user.id, revoked=False).update({"revoked": True}, synchronize_session=False)
+    if commit:
+        db.session.commit()
+
+
+def rotate_refresh_token(payload: dict, user):
+    """
+    Exchange a decoded refresh token for a new token pair in the same family.
+    Reusing an already-rotated token revokes the whole family (the token leaked).
+    """
+    if payload.get("gen", 0) != (user.token_generation or 0):
+        raise RefreshError("refresh token revoked")
+
+    row = RefreshToken.query.filter_by(token=payload.get("jti")).first()
+    if row is None or row.user_id != user.id:
+        raise RefreshError("unknown refresh token")
+    if row.revoked:
+        raise RefreshError("refresh token revoked")
+
+    # compare-and-set, so two concurrent refreshes with one token can't both win
+    claimed = (
+        RefreshToken.query.filter_by(id=row.id, used_at=None, revoked=False)
+        .update({"used_at": datetime.datetime.utcnow()}, synchronize_session=False)
+    )
+    if not claimed:
+        revoke_token_family(row.family_id, commit=False)
+        db.session.commit()
+        raise RefreshError("refresh token reuse detected; session revoked", reuse=True)
+
+    return issue_token_pair(user, family_id=row.family_id)
+
 def decode_token(token: str):
     try:
         payload = jwt.decode(token, _get_secret(), algorithms=["HS256"])
@@ -82,16 +173,24 @@ def token_required(fn):
         except Exception as e:
             # jwt exceptions will be thrown for expired/invalid
             return jsonify({"message": "Invalid or expired token", "detail": str(e)}), 401
+        if payload.get("type", "access") != "access":
+            return jsonify({"message": "Access token required"}), 401
 
         jti = payload.get("jti")
         if is_jti_revoked(jti):
             return jsonify({"message": "Token has been revoked"}), 401
 
         # attach user info to request context (flask.g could be used but returning here for simplicity)
-        request.user = User.query.get(payload.get("user_id"))
+        request.user = get_user(payload.get("user_id"))
         if not request.user:
             return jsonify({"message": "User not found"}), 404
 
+        # "revoke all" bumps token_generation; the user comes from cache, so this costs nothing
+        if payload.get("gen", 0) != (request.user.token_generation or 0):
+            return jsonify({"message": "Token has been revoked"}), 401
+        if not request.user.is_active:
+            return jsonify({"message": "Account is disabled"}), 401
+
         return fn(*args, **kwargs)
     return wrapper
 
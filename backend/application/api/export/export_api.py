@@ -0,0 +1,47 @@
+import uuid
+from datetime import datetime
+from flask import request
+from flask_restful import Resource
+from ..auth.auth_utils import role_required
+from ...services.export_service import FORMATS, _require_pyarrow
+from ...jobs import enqueue
+
+
+class TransactionExportAPI(Resource):
+    """
+    Admin-only: queue a job writing transaction history as partitioned Parquet / Arrow IPC files.
+    POST /api/admin/exports/transactions
+    body: {"format": "parquet"|"arrow", "user_id": <optional>, "start_date": "...", "end_date": "..."}
+    Answers 202 with a job id; poll GET /api/jobs/<id> for progress and the result.
+    """
+
+    @role_required("admin")
+    def post(self):
+        data = request.get_json() or {}
+        fmt = data.get("format", "parquet")
+        if fmt not in FORMATS:
+            return {"message": f"format must be one of: {', '.join(FORMATS)}"}, 400
+
+        try:
+            for key in ("start_date", "end_date"):
+                if data.get(key):
+                    datetime.fromisoformat(data[key])
+        except ValueError:
+            return {"message": "Invalid date format. Use ISO 8601 (YYYY-MM-DD)."}, 400
+
+        try:
+            _require_pyarrow()  # fail now rather than in the worker
+        except RuntimeError as e:
+            return {"message": str(e)}, 501
+
+        # the timestamp keeps export folders sortable, the random part keeps same-second exports apart
+        export_id = datetime.utcnow().strftime("%Y%m%dT%H%M%S") + f"-{uuid.uuid4().hex[:8]}-{fmt}"
+        job = enqueue("export_transactions", {
+            "format": fmt,
+            "user_id": data.get("user_id"),
+            "start_date": data.get("start_date"),
+            "end_date": data.get("end_date"),
+            "export_id": export_id,
+        }, user_id=request.user.id)
+        return {"message": "export queued", "export_id": export_id, "job_id": job.id,
+                "status_url": f"/api/jobs/{job.id}"}, 202
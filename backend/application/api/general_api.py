@@ -1,8 +1,131 @@
 # application/api/general_api.py
 from flask_restful import Resource
-from flask import jsonify
+from flask import jsonify, current_app
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from sqlalchemy import text
 import datetime
+import threading
+import time
 from ..database import db
+from ..cache import cache
+from .auth.auth_utils import role_required
+
+
+# --------------------------- Readiness probe ---------------------------
+# A load balancer may poll every second from several nodes; the probe result is
+# cached for HEALTH_CACHE_SECONDS and only one thread refreshes it at a time.
+_probe_lock = threading.Lock()
+_probe_state = {"result": None, "checked_at": 0.0, "inflight": None, "script_heads": None}
+_probe_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="health-probe")
+
+
+def _db_probe(engine):
+    """SELECT 1 plus the alembic revision, on one pooled connection."""
+    from alembic.runtime.migration import MigrationContext
+
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        latency_ms = (time.perf_counter() - started) * 1000
+        current = MigrationContext.configure(conn).get_current_heads()
+    return latency_ms, set(current)
+
+
+def _script_heads(app):
+    if _probe_state["script_heads"] is None:
+        from alembic.script import ScriptDirectory
+        from alembic.config import Config as AlembicConfig
+
+        migrate = app.extensions["migrate"]
+        cfg = AlembicConfig()
+        cfg.set_main_option("script_location", migrate.directory)
+        _probe_state["script_heads"] = set(ScriptDirectory.from_config(cfg).get_heads())
+    return _probe_state["script_heads"]
+
+
+def _pool_status(engine):
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"class": type(pool).__name__}
+    capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+    checked_out = pool.checkedout()
+    return {
+        "class": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": checked_out,
+        "overflow": pool.overflow(),
+        "saturation": round(checked_out / capacity, 3) if capacity else None,
+    }
+
+
+def _run_readiness_checks(app):
+    engine = db.engine
+    timeout = app.config.get("HEALTH_DB_TIMEOUT", 2.0)
+    checks = {"ready": True}
+
+    # Don't stack probes behind a hung one: report the timeout until it returns.
+    inflight = _probe_state["inflight"]
+    if inflight is not None and not inflight.done():
+        checks["database"] = {"status": "timeout", "detail": "previous probe still running"}
+        checks["ready"] = False
+    else:
+        future = _probe_pool.submit(_db_probe, engine)
+        _probe_state["inflight"] = future
+        try:
+            latency_ms, current_heads = future.result(timeout=timeout)
+            checks["database"] = {"status": "connected", "latency_ms": round(latency_ms, 2)}
+            script_heads = _script_heads(app)
+            if not script_heads:
+                migration_status = "no_migrations"
+            elif current_heads == script_heads:
+                migration_status = "up_to_date"
+            else:
+                migration_status = "behind"
+            checks["migrations"] = {
+                "status": migration_status,
+                "current": sorted(current_heads),
+                "head": sorted(script_heads),
+            }
+            if migration_status == "behind" and app.config.get("HEALTH_REQUIRE_MIGRATIONS", False):
+                checks["ready"] = False
+        except FutureTimeout:
+            checks["database"] = {"status": "timeout", "timeout_s": timeout}
+            checks["ready"] = False
+        except Exception as e:
+            checks["database"] = {"status": f"error: {str(e)}"}
+            checks["ready"] = False
+
+    pool = _pool_status(engine)
+    checks["pool"] = pool
+    if pool.get("saturation") is not None and pool["saturation"] >= app.config.get("HEALTH_MAX_POOL_SATURATION", 1.0):
+        checks["ready"] = False
+
+    stats = cache.stats()
+    checks["cache"] = {
+        "enabled": stats["enabled"],
+        "warm": stats["local_entries"] > 0,
+        "entries": stats["local_entries"],
+        "hit_ratio": stats["local"]["hit_ratio"],
+    }
+    return checks
+
+
+def readiness(app):
+    """Cached readiness result; at most one probe per HEALTH_CACHE_SECONDS per process."""
+    ttl = app.config.get("HEALTH_CACHE_SECONDS", 5.0)
+    now = time.monotonic()
+    if _probe_state["result"] is None or now - _probe_state["checked_at"] >= ttl:
+        # non-blocking: if another thread is refreshing, serve the previous result
+        if _probe_lock.acquire(blocking=_probe_state["result"] is None):
+            try:
+                if _probe_state["result"] is None or time.monotonic() - _probe_state["checked_at"] >= ttl:
+                    result = _run_readiness_checks(app)
+                    result["checked_at"] = datetime.datetime.utcnow().isoformat() + "Z"
+                    _probe_state["result"] = result
+                    _probe_state["checked_at"] = time.monotonic()
+            finally:
+                _probe_lock.release()
+    return _probe_state["result"]
 
 
 
@@ -23,15 +146,11 @@ class Home(Resource):
 class HealthCheck(Resource):
     """
     Basic health check endpoint for verifying API and DB connectivity.
+    Uses the (cached) readiness probe, so polling it does not add DB load.
     """
 
     def get(self):
-        try:
-            # Quick DB check
-            # db.session.execute("SELECT 1")
-            db_status = "connected"
-        except Exception as e:
-            db_status = f"error: {str(e)}"
+        db_status = readiness(current_app._get_current_object())["database"]["status"]
 
         response = {
             "status": "ok",
@@ -42,3 +161,39 @@ class HealthCheck(Resource):
         }
 
         return jsonify(response)
+
+
+class Liveness(Resource):
+    """
+    Liveness: the process is up and serving requests. Never touches the DB,
+    so a slow database does not get healthy workers restarted.
+    """
+
+    def get(self):
+        return {"status": "alive", "timestamp": datetime.datetime.utcnow().isoformat() + "Z"}, 200
+
+
+class Readiness(Resource):
+    """
+    Readiness: DB answers within HEALTH_DB_TIMEOUT, pool is not saturated.
+    Also reports migration head status and cache warmness. 503 when not ready.
+    """
+
+    def get(self):
+        result = readiness(current_app._get_current_object())
+        return {"status": "ready" if result["ready"] else "not_ready", **result}, 200 if result["ready"] else 503
+
+
+class CacheStats(Resource):
+    """
+    Admin-only: cache hit/miss counters. DELETE clears both tiers.
+    """
+
+    @role_required("admin")
+    def get(self):
+        return {"cache": cache.stats()}, 200
+
+    @role_required("admin")
+    def delete(self):
+        cache.clear()
+        return {"message": "cache cleared"}, 200
@@ -0,0 +1,64 @@
+# application/api/http_cache.py
+"""
+Conditional GET helpers (ETag / Last-Modified) shared by API resources.
+
+Resources compute a cheap validator first (usually from a version counter that
+is already loaded with `request.user`), and only run the real query and
+serialization when the client's cached copy is stale.
+"""
+
+import hashlib
+import datetime
+from flask import request, make_response
+from werkzeug.http import http_date
+
+
+def make_etag(*parts) -> str:
+    """Build a short, stable ETag value from arbitrary parts."""
+    raw = "|".join(str(p) for p in parts)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:32]
+
+
+def normalized_args() -> str:
+    """Query string with params sorted, so `?a=1&b=2` and `?b=2&a=1` share an ETag."""
+    return "&".join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+
+
+def _to_utc(dt: datetime.datetime):
+    # our DateTime columns are naive UTC; HTTP dates have second resolution
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=datetime.timezone.utc)
+    return dt.replace(microsecond=0)
+
+
+def is_not_modified(etag: str = None, last_modified: datetime.datetime = None) -> bool:
+    """
+    True if the request's validators match the current representation.
+    If-None-Match takes precedence over If-Modified-Since (RFC 9110).
+    """
+    if etag and request.if_none_match:
+        # weak comparison: the body may be re-encoded (e.g. compressed) in transit
+        return request.if_none_match.contains_weak(etag)
+    if last_modified and request.if_modified_since:
+        return _to_utc(last_modified) <= request.if_modified_since
+    return False
+
+
+def cache_headers(etag: str = None, last_modified: datetime.datetime = None) -> dict:
+    """
+    Validator headers for a 200 response. `no-cache` makes the browser revalidate
+    every time, which is cheap because of the 304 path.
+    """
+    headers = {"Cache-Control": "private, no-cache"}
+    if etag:
+        headers["ETag"] = f'W/"{etag}"'
+    if last_modified:
+        headers["Last-Modified"] = http_date(_to_utc(last_modified))
+    return headers
+
+
+def not_modified_response(etag: str = None, last_modified: datetime.datetime = None):
+    """Empty 304 response carrying the same validators as the 200 would."""
+    resp = make_response("", 304)
+    resp.headers.extend(cache_headers(etag, last_modified))
+    return resp
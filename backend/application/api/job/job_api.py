@@ -0,0 +1,68 @@
+from flask import request
+from flask_restful import Resource
+from application.database import db
+from application import audit
+from ...models.models import Job
+from ...jobs import enqueue, cancel, HANDLERS, QUEUED
+from ..auth.auth_utils import token_required, role_required
+
+
+def _visible_job(job_id, user):
+    job = db.session.get(Job, job_id)
+    if not job or (user.role != "admin" and job.user_id != user.id):
+        return None
+    return job
+
+
+class JobListAPI(Resource):
+    """
+    GET  /api/jobs   own jobs (admins: all), newest first; ?status=&type=&limit=
+    POST /api/jobs   admin-only: enqueue any registered job type {"type": ..., "payload": {...}}
+    """
+
+    @token_required
+    def get(self):
+        user = request.user
+        query = Job.query
+        if user.role != "admin":
+            query = query.filter(Job.user_id == user.id)
+        if request.args.get("status"):
+            query = query.filter(Job.status == request.args["status"])
+        if request.args.get("type"):
+            query = query.filter(Job.type == request.args["type"])
+        limit = min(request.args.get("limit", 50, type=int), 200)
+        jobs = query.order_by(Job.id.desc()).limit(limit).all()
+        return {"jobs": [j.to_dict() for j in jobs]}, 200
+
+    @role_required("admin")
+    def post(self):
+        data = request.get_json() or {}
+        job_type = data.get("type")
+        if job_type not in HANDLERS:
+            return {"message": f"type must be one of: {', '.join(sorted(HANDLERS))}"}, 400
+        job = enqueue(job_type, data.get("payload") or {}, user_id=request.user.id)
+        audit.record("job.enqueue", actor_id=request.user.id, details={"job_id": job.id, "type": job_type})
+        return {"message": "job queued", "job_id": job.id, "status_url": f"/api/jobs/{job.id}"}, 202
+
+
+class JobDetailAPI(Resource):
+    """
+    GET    /api/jobs/<id>   status, progress, result / error (poll this)
+    DELETE /api/jobs/<id>   cancel a job that has not started yet
+    """
+
+    @token_required
+    def get(self, job_id):
+        job = _visible_job(job_id, request.user)
+        if not job:
+            return {"message": "Job not found"}, 404
+        return {"job": job.to_dict()}, 200
+
+    @token_required
+    def delete(self, job_id):
+        job = _visible_job(job_id, request.user)
+        if not job:
+            return {"message": "Job not found"}, 404
+        if job.status != QUEUED or not cancel(job):
+            return {"message": f"Job is {job.status}, only queued jobs can be cancelled"}, 409
+        return {"message": "Job cancelled", "job": job.to_dict()}, 200
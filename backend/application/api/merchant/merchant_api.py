@@ -0,0 +1,118 @@
+from flask import request
+from flask_restful import Resource
+from sqlalchemy.exc import IntegrityError
+from application.database import db
+from application import audit
+from ...models.models import Merchant, MerchantAlias, Job
+from ...merchants import add_merchant, normalize_vendor
+from ...services.merchant_service import detach_merchant
+from ...jobs import enqueue, QUEUED
+from ..auth.auth_utils import token_required, role_required
+
+
+def _alias_conflicts(patterns, merchant_id=None):
+    """Normalized patterns already owned by another merchant."""
+    if not patterns:
+        return []
+    query = MerchantAlias.query.filter(MerchantAlias.pattern.in_(patterns))
+    if merchant_id is not None:
+        query = query.filter(MerchantAlias.merchant_id != merchant_id)
+    return sorted(a.pattern for a in query)
+
+
+def _queue_backfill():
+    """Existing transactions pick up dictionary changes through the normalize_vendors job (one queued at a time)."""
+    queued = Job.query.filter_by(type="normalize_vendors", status=QUEUED).first()
+    return queued or enqueue("normalize_vendors", {}, user_id=request.user.id, commit=False)
+
+
+class MerchantListAPI(Resource):
+    """
+    GET  /api/merchants?q=   merchant dictionary (any user; used for filters / labels)
+    POST /api/merchants      admin-only: {"name": ..., "aliases": ["amazon", "amzn", ...]}
+    """
+
+    @token_required
+    def get(self):
+        query = Merchant.query
+        q = (request.args.get("q") or "").strip()
+        if q:
+            query = query.filter(Merchant.name.ilike(f"%{q}%"))
+        return {"merchants": [m.to_dict() for m in query.order_by(Merchant.name)]}, 200
+
+    @role_required("admin")
+    def post(self):
+        data = request.get_json() or {}
+        name = (data.get("name") or "").strip()
+        aliases = data.get("aliases") or [name]
+        if not name or not isinstance(aliases, list):
+            return {"message": "name required; aliases must be a list"}, 400
+        conflicts = _alias_conflicts([normalize_vendor(a) for a in aliases])
+        if conflicts:
+            return {"message": "aliases already belong to another merchant", "aliases": conflicts}, 409
+        try:
+            merchant = add_merchant(db.session, name, aliases)
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            return {"message": "Merchant already exists"}, 409
+        job = _queue_backfill()
+        db.session.commit()
+        audit.record("merchant.create", actor_id=request.user.id, details={"merchant_id": merchant.id, "name": name})
+        return {"message": "Merchant created", "merchant": merchant.to_dict(), "job_id": job.id}, 201
+
+
+class MerchantDetailAPI(Resource):
+    """
+    GET    /api/merchants/<id>
+    PUT    /api/merchants/<id>   admin-only: {"name": ..., "aliases": [...]} (aliases replace the list)
+    DELETE /api/merchants/<id>   admin-only; its transactions are detached, then re-resolved
+                                 against the remaining aliases
+    """
+
+    @token_required
+    def get(self, merchant_id):
+        merchant = db.session.get(Merchant, merchant_id)
+        if not merchant:
+            return {"message": "Merchant not found"}, 404
+        return {"merchant": merchant.to_dict()}, 200
+
+    @role_required("admin")
+    def put(self, merchant_id):
+        merchant = db.session.get(Merchant, merchant_id)
+        if not merchant:
+            return {"message": "Merchant not found"}, 404
+        data = request.get_json() or {}
+        if data.get("name"):
+            merchant.name = data["name"].strip()
+        job = None
+        if data.get("aliases") is not None:
+            if not isinstance(data["aliases"], list):
+                return {"message": "aliases must be a list"}, 400
+            patterns = [p for p in dict.fromkeys(map(normalize_vendor, data["aliases"])) if p]
+            conflicts = _alias_conflicts(patterns, merchant_id)
+            if conflicts:
+                return {"message": "aliases already belong to another merchant", "aliases": conflicts}, 409
+            existing = {a.pattern: a for a in merchant.aliases}
+            merchant.aliases = [existing.get(p) or MerchantAlias(pattern=p) for p in patterns]
+            job = _queue_backfill()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return {"message": "Merchant name already taken"}, 409
+        audit.record("merchant.update", actor_id=request.user.id, details={"merchant_id": merchant_id})
+        return {"message": "Merchant updated", "merchant": merchant.to_dict(),
+                "job_id": job.id if job else None}, 200
+
+    @role_required("admin")
+    def delete(self, merchant_id):
+        merchant = db.session.get(Merchant, merchant_id)
+        if not merchant:
+            return {"message": "Merchant not found"}, 404
+        detach_merchant(merchant_id)
+        db.session.delete(merchant)
+        job = _queue_backfill()
+        db.session.commit()
+        audit.record("merchant.delete", actor_id=request.user.id, details={"merchant_id": merchant_id})
+        return {"message": f"Merchant {merchant_id} deleted", "job_id": job.id}, 200
@@ -0,0 +1,48 @@
+from flask import request, current_app
+from flask_restful import Resource
+from ...models.models import MLModel
+from ...services.training_service import suggest_categories, GLOBAL_MODEL, USER_MODEL
+from ..auth.auth_utils import token_required, role_required
+
+
+class CategorySuggestionAPI(Resource):
+    """
+    GET /api/transactions/suggest-category?vendor=&note=&amount=&limit=3
+    Likely categories for a transaction being entered, from the latest categorizer
+    version mixed with the user's personal layer. Empty until a model was trained
+    (POST /api/jobs {"type": "train_categorizer"} or the worker's daily run).
+    """
+
+    @token_required
+    def get(self):
+        vendor, note = request.args.get("vendor"), request.args.get("note")
+        if not (vendor or note):
+            return {"message": "vendor or note is required"}, 400
+        try:
+            amount = float(request.args["amount"]) if request.args.get("amount") else None
+            limit = int(request.args.get("limit", 3))
+        except ValueError:
+            return {"message": "amount and limit must be numbers"}, 400
+        if not 1 <= limit <= 20:
+            return {"message": "limit must be between 1 and 20"}, 400
+        suggestions = suggest_categories(request.user.id, vendor, note, amount, limit=limit,
+                                         personal_weight=current_app.config.get("ML_PERSONAL_WEIGHT", 0.6))
+        return {"suggestions": suggestions}, 200
+
+
+class MLModelListAPI(Resource):
+    """
+    GET /api/admin/ml/models?name=&owner_id=   trained versions, newest first, with their
+    training metadata (mode, rows, watermark, metrics). Defaults to the global categorizer.
+    """
+
+    @role_required("admin")
+    def get(self):
+        name = request.args.get("name", GLOBAL_MODEL)
+        if name not in (GLOBAL_MODEL, USER_MODEL):
+            return {"message": f"name must be {GLOBAL_MODEL} or {USER_MODEL}"}, 400
+        query = MLModel.query.filter_by(name=name)
+        if request.args.get("owner_id"):
+            query = query.filter_by(owner_id=request.args.get("owner_id", type=int))
+        rows = query.order_by(MLModel.id.desc()).limit(100).all()
+        return {"models": [m.to_dict() for m in rows]}, 200
@@ -0,0 +1,143 @@
+import os
+from flask import request, current_app, send_file
+from flask_restful import Resource
+from application.database import db
+from application.sharding import shards, use_shard
+from application.storage import receipts, UploadTooLarge
+from ...models.models import Receipt, Transaction
+from ...services.receipt_service import save_receipt, delete_receipts, THUMBNAIL_SUFFIX
+from ..auth.auth_utils import token_required
+
+
+def _owned_transaction(txn_id, user):
+    """(transaction, error_response) for a live transaction the user may attach receipts to."""
+    if shards.enabled and shards.name_for_id(txn_id) is None:
+        return None, ({"message": "Transaction not found."}, 404)
+    with use_shard(row_id=txn_id):
+        txn = db.session.get(Transaction, txn_id)
+    if not txn or txn.is_deleted:
+        return None, ({"message": "Transaction not found."}, 404)
+    if user.role != "admin" and txn.user_id != user.id:
+        return None, ({"message": "Access denied."}, 403)
+    return txn, None
+
+
+def _visible_receipt(receipt_id, user):
+    receipt = db.session.get(Receipt, receipt_id)
+    if not receipt or (user.role != "admin" and receipt.user_id != user.id):
+        return None
+    return receipt
+
+
+def _send_stored(receipt, suffix, mimetype, download_name):
+    """
+    Stream a stored file with Range support (send_file conditional=True answers
+    206 / 416 and If-None-Match). Content never changes under a digest, so the
+    ETag is the digest and the response may be cached privately for a long time.
+    """
+    path = receipts.path(receipt.sha256, suffix)
+    if not os.path.isfile(path):
+        return {"message": "File not found"}, 404
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=receipt.sha256 + suffix,
+                         download_name=download_name,
+                         max_age=current_app.config.get("RECEIPT_CACHE_MAX_AGE", 365 * 24 * 3600))
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    # Werkzeug only advertises ranges on 206 answers; tell clients up front
+    response.headers["Accept-Ranges"] = "bytes"
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    return response
+
+
+class TransactionReceiptsAPI(Resource):
+    """
+    GET  /api/transactions/<id>/receipts   receipts attached to a transaction
+    POST /api/transactions/<id>/receipts   upload one: multipart field "file", or the raw
+                                           file as the request body (?filename=receipt.jpg)
+    Raw bodies are streamed straight to the store; multipart parts larger than
+    500 KB are spooled to a temporary file by Werkzeug first.
+    """
+
+    @token_required
+    def get(self, txn_id):
+        txn, error = _owned_transaction(txn_id, request.user)
+        if error:
+            return error
+        rows = Receipt.query.filter_by(transaction_id=txn.id).order_by(Receipt.id).all()
+        return {"receipts": [r.to_dict() for r in rows]}, 200
+
+    @token_required
+    def post(self, txn_id):
+        txn, error = _owned_transaction(txn_id, request.user)
+        if error:
+            return error
+        config = current_app.config
+        if request.mimetype == "multipart/form-data":
+            upload = request.files.get("file")
+            if upload is None:
+                return {"message": "multipart upload needs a 'file' field"}, 400
+            stream, filename = upload.stream, upload.filename
+        else:
+            stream, filename = request.stream, request.args.get("filename")
+
+        try:
+            receipt, created = save_receipt(
+                txn.user_id, txn.id, stream, filename=filename,
+                allowed_extensions=config.get("RECEIPT_EXTENSIONS"),
+                max_bytes=config.get("RECEIPT_MAX_BYTES"),
+            )
+        except UploadTooLarge as e:
+            return {"message": str(e)}, 413
+        except ValueError as e:
+            return {"message": str(e)}, 415
+        if not created:
+            return {"message": "Receipt already attached.", "receipt": receipt.to_dict()}, 200
+        return {"message": "Receipt uploaded.", "receipt": receipt.to_dict()}, 201
+
+
+class ReceiptDetailAPI(Resource):
+    """
+    GET    /api/receipts/<id>   metadata (thumbnail_status: pending | ready | failed | none)
+    DELETE /api/receipts/<id>   the stored file goes once no receipt references it
+    """
+
+    @token_required
+    def get(self, receipt_id):
+        receipt = _visible_receipt(receipt_id, request.user)
+        if not receipt:
+            return {"message": "Receipt not found"}, 404
+        return {"receipt": receipt.to_dict()}, 200
+
+    @token_required
+    def delete(self, receipt_id):
+        receipt = _visible_receipt(receipt_id, request.user)
+        if not receipt:
+            return {"message": "Receipt not found"}, 404
+        delete_receipts([receipt])
+        return {"message": f"Receipt {receipt_id} deleted"}, 200
+
+
+class ReceiptFileAPI(Resource):
+    """GET /api/receipts/<id>/file   the original file (Range requests supported)"""
+
+    @token_required
+    def get(self, receipt_id):
+        receipt = _visible_receipt(receipt_id, request.user)
+        if not receipt:
+            return {"message": "Receipt not found"}, 404
+        return _send_stored(receipt, "", receipt.content_type, receipt.filename or receipt.sha256)
+
+
+class ReceiptThumbnailAPI(Resource):
+    """GET /api/receipts/<id>/thumbnail   JPEG thumbnail once thumbnail_status is "ready" """
+
+    @token_required
+    def get(self, receipt_id):
+        receipt = _visible_receipt(receipt_id, request.user)
+        if not receipt:
+            return {"message": "Receipt not found"}, 404
+        if receipt.thumbnail_status != "ready":
+            return {"message": f"Thumbnail is {receipt.thumbnail_status}",
+                    "thumbnail_status": receipt.thumbnail_status}, 404
+        return _send_stored(receipt, THUMBNAIL_SUFFIX, "image/jpeg", f"{receipt.sha256[:16]}-thumb.jpg")
@@ -0,0 +1,72 @@
+# application/api/representations.py
+"""
+JSON representation for the Flask-RESTful `Api`.
+
+Flask-RESTful serializes resource return values with the stdlib `json` module
+(indented in debug mode). This swaps in a pluggable encoder: `orjson` when it is
+installed, compact stdlib `json` otherwise. Select with the `JSON_ENCODER`
+config key: "auto" (default), "orjson" or "json".
+"""
+
+import json
+import uuid
+import datetime
+from decimal import Decimal
+from flask import Response, make_response, current_app
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(obj):
+    # same fallbacks for both encoders; anything else is a serialization bug and raises
+    if isinstance(obj, (datetime.date, datetime.datetime, datetime.time)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps_stdlib(data) -> bytes:
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+def dumps_orjson(data) -> bytes:
+    return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+ENCODERS = {"json": dumps_stdlib}
+if orjson is not None:
+    ENCODERS["orjson"] = dumps_orjson
+
+
+def get_encoder(name: str = "auto"):
+    """Return a `dumps(data) -> bytes` callable for the configured encoder name."""
+    if name == "auto":
+        return ENCODERS.get("orjson", dumps_stdlib)
+    if name not in ENCODERS:
+        raise ValueError(f"JSON encoder '{name}' is not available (installed: {sorted(ENCODERS)})")
+    return ENCODERS[name]
+
+
+def output_json(data, code, headers=None):
+    """Flask-RESTful representation function for application/json."""
+    if isinstance(data, Response):
+        # `return jsonify(...), 401` from the auth decorators: already rendered, keep its body
+        data.status_code = code
+        data.headers.extend(headers or {})
+        return data
+    dumps = get_encoder(current_app.config.get("JSON_ENCODER", "auto"))
+    resp = make_response(dumps(data), code)
+    resp.headers.extend(headers or {})
+    resp.mimetype = "application/json"
+    return resp
+
+
+def init_representations(api):
+    """Register the fast JSON representation on the Api instance."""
+    api.representations["application/json"] = output_json
@@ -1,55 +1,147 @@
-from flask import request
+from contextlib import nullcontext
+from functools import wraps
+from flask import request, current_app
 from flask_restful import Resource
-from datetime import datetime
-from sqlalchemy import and_
-from application.database import db
-from ...models.models import Transaction
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, func, extract, select
+from sqlalchemy.orm import joinedload
+from application.database import db, use_primary, reads_from_replica
+from application.sharding import shards, use_shard, for_each_shard, merge_sorted
+from ...models.models import Transaction, Category, User, Merchant, TransactionTag
+from ...merchants import resolve_merchant_id
+from ...tags import normalize_tag
+from ...services.import_service import import_transactions, find_duplicates
 from ..auth.auth_utils import token_required
+from ..http_cache import make_etag, normalized_args, is_not_modified, not_modified_response, cache_headers
+
+
+def _transactions_version(user):
+    """
+    Cheap version stamp for the transactions visible to `user`.
+    Regular users: their own data_version (already loaded by token_required, no query).
+    Admins see everyone's rows, so use the sum of all counters (one aggregate over users).
+
+    The stamp must describe the copy the body is read from, and be read before it:
+    a fresh stamp over a lagging replica's rows would let clients pin old rows with
+    304s. Unsharded GETs may read a replica, so the counters are read there too;
+    sharded transactions are always read from the shards, so the stamp comes from
+    the primary.
+    """
+    replica = reads_from_replica() and not shards.enabled
+    if user.role != "admin":
+        if not replica:
+            return f"u{user.id}:{user.data_version}"
+        version = db.session.scalar(select(User.data_version).where(User.id == user.id))
+        return f"u{user.id}:{version}"
+    with nullcontext() if replica else use_primary():
+        total, count = db.session.query(func.coalesce(func.sum(User.data_version), 0), func.count(User.id)).one()
+    return f"all:{total}:{count}"
+
+
+def _owner_filter(user):
+    """Whose rows are visible: the user's own, or for admins everyone's unless ?user_id= narrows it."""
+    if user.role != "admin":
+        return user.id
+    return request.args.get("user_id", type=int)
+
+
+def _per_shard(user, fn):
+    """
+    Run fn(session) where the visible rows live and return the per-shard results:
+    a single owner's shard, or (admins without ?user_id=) all shards in parallel.
+    """
+    owner_id = _owner_filter(user)
+    if owner_id is None:
+        return for_each_shard(fn)
+    with use_shard(owner_id):
+        return [fn(db.session)]
+
+
+def _apply_filters(query, user):
+    """
+    Apply role visibility and the shared query-string filters.
+    Returns (query, error_response) — error_response is set on bad input.
+    """
+    owner_id = _owner_filter(user)
+    if owner_id is not None:
+        query = query.filter(Transaction.user_id == owner_id)
+
+    category_id = request.args.get("category_id", type=int)
+    merchant_id = request.args.get("merchant_id", type=int)
+    vendor = request.args.get("vendor")
+    start_date = request.args.get("start_date")
+    end_date = request.args.get("end_date")
+    is_recurring = request.args.get("is_recurring", type=lambda x: x.lower() == "true")
+
+    if category_id:
+        query = query.filter(Transaction.category_id == category_id)
+    if merchant_id:
+        query = query.filter(Transaction.merchant_id == merchant_id)
+    if vendor:
+        # a vendor the merchant dictionary knows filters on the indexed id, catching every spelling
+        vendor_merchant_id = resolve_merchant_id(vendor)
+        if vendor_merchant_id is not None:
+            query = query.filter(Transaction.merchant_id == vendor_merchant_id)
+        else:
+            query = query.filter(Transaction.vendor.ilike(f"%{vendor}%"))
+    if start_date or end_date:
+        try:
+            if start_date:
+                sd = datetime.fromisoformat(start_date)
+                query = query.filter(Transaction.date >= sd)
+            if end_date:
+                ed = datetime.fromisoformat(end_date)
+                query = query.filter(Transaction.date <= ed)
+        except ValueError:
+            return query, ({"message": "Invalid date format. Use ISO 8601 (YYYY-MM-DD)."}, 400)
+    if is_recurring is not None:
+        query = query.filter(Transaction.is_recurring == is_recurring)
+    # ?tag=a&tag=b: transactions carrying every listed tag, via ix_txn_tags_user_tag
+    for tag in dict.fromkeys(filter(None, map(normalize_tag, request.args.getlist("tag")))):
+        tagged = select(TransactionTag.transaction_id).where(TransactionTag.tag == tag)
+        if owner_id is not None:
+            tagged = tagged.where(TransactionTag.user_id == owner_id)
+        query = query.filter(Transaction.id.in_(tagged))
+    return query, None
+
+
+def _on_transaction_shard(fn):
+    """Sharded mode: run the handler on the shard owning `txn_id` (ids encode their shard)."""
+    @wraps(fn)
+    def wrapper(self, txn_id):
+        if shards.enabled and shards.name_for_id(txn_id) is None:
+            return {"message": "Transaction not found."}, 404
+        with use_shard(row_id=txn_id):
+            return fn(self, txn_id)
+    return wrapper
 
 
 
 class TransactionListAPI(Resource):
     """
-    List all transactions (user-specific unless admin)
-    or create a new transaction.
+    List all transactions (user-specific unless admin; admins can narrow with ?user_id=)
+    or create a new transaction. `?tag=` (repeatable) keeps rows carrying every given tag;
+    tags are set through meta_data["tags"].
     """
 
     @token_required
     def get(self):
         user = request.user
-        query = Transaction.query.filter_by(is_deleted=False)
-
-        # Role-based visibility
-        if user.role != "admin":
-            query = query.filter_by(user_id=user.id)
-
-        # Filters
-        category_id = request.args.get("category_id", type=int)
-        vendor = request.args.get("vendor")
-        start_date = request.args.get("start_date")
-        end_date = request.args.get("end_date")
-        is_recurring = request.args.get("is_recurring", type=lambda x: x.lower() == "true")
-
-        if category_id:
-            query = query.filter(Transaction.category_id == category_id)
-        if vendor:
-            query = query.filter(Transaction.vendor.ilike(f"%{vendor}%"))
-        if start_date or end_date:
-            try:
-                if start_date:
-                    sd = datetime.fromisoformat(start_date)
-                    query = query.filter(Transaction.date >= sd)
-                if end_date:
-                    ed = datetime.fromisoformat(end_date)
-                    query = query.filter(Transaction.date <= ed)
-            except ValueError:
-                return {"message": "Invalid date format. Use ISO 8601 (YYYY-MM-DD)."}, 400
-        if is_recurring is not None:
-            query = query.filter(Transaction.is_recurring == is_recurring)
 
-        # Optional pagination helper
-        transactions = query.order_by(Transaction.date.desc()).all()
-        return {"transactions": [t.to_dict() for t in transactions]}, 200
+        # Conditional GET: answer 304 before touching the transactions table
+        etag = make_etag("transactions", user.role, _transactions_version(user), normalized_args())
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        query, error = _apply_filters(Transaction.query.filter_by(is_deleted=False), user)
+        if error:
+            return error
+
+        query = query.order_by(Transaction.date.desc())
+        # admins see every user's rows: one query per shard in parallel, merged by date
+        pages = _per_shard(user, lambda session: [t.to_dict() for t in query.with_session(session)])
+        transactions = merge_sorted(pages, key=lambda t: t["date"], reverse=True)
+        return {"transactions": transactions}, 200, cache_headers(etag)
 
     @token_required
     def post(self):
@@ -94,12 +186,251 @@ class TransactionListAPI(Resource):
         return {"message": "Transaction added successfully.", "transaction": txn.to_dict()}, 201
 
 
+def _parse_watermark(value):
+    """'<iso updated_at>_<id>' (as returned by the changes endpoint) or a plain ISO timestamp."""
+    ts, sep, last_id = value.rpartition("_")
+    if not sep:
+        ts, last_id = value, "0"
+    return datetime.fromisoformat(ts), int(last_id)
+
+
+def _format_watermark(ts, last_id):
+    return f"{ts.isoformat()}_{last_id}"
+
+
+def _change_entry(txn):
+    if txn.is_deleted:
+        return {"id": txn.id, "user_id": txn.user_id, "deleted_at": (txn.deleted_at or txn.updated_at).isoformat()}
+    return txn.to_dict()
+
+
+class TransactionChangesAPI(Resource):
+    """
+    Incremental sync: rows created / updated / soft-deleted after a watermark.
+    GET /api/transactions/changes?since=<watermark>&limit=500 (admins: &user_id=)
+
+    Keyset pagination on (updated_at, id). Live rows come back in "changes",
+    soft-deleted ones as tombstones in "deleted". Keep calling with the returned
+    "watermark" while "has_more" is true; omit `since` for the initial full sync.
+    Hard deletes leave no tombstone; only soft deletes are reported.
+    """
+
+    @token_required
+    def get(self):
+        user = request.user
+        config = current_app.config
+        limit = min(request.args.get("limit", config.get("SYNC_PAGE_SIZE", 500), type=int),
+                    config.get("SYNC_MAX_PAGE_SIZE", 2000))
+        if limit <= 0:
+            return {"message": "limit must be positive."}, 400
+
+        query = Transaction.query.options(joinedload(Transaction.category))
+        owner_id = _owner_filter(user)
+        if owner_id is not None:
+            query = query.filter(Transaction.user_id == owner_id)
+
+        since = request.args.get("since")
+        if since:
+            try:
+                since_ts, since_id = _parse_watermark(since)
+            except ValueError:
+                return {"message": "Invalid watermark. Pass back the value returned by this endpoint."}, 400
+            query = query.filter(or_(
+                Transaction.updated_at > since_ts,
+                and_(Transaction.updated_at == since_ts, Transaction.id > since_id),
+            ))
+
+        query = query.order_by(Transaction.updated_at, Transaction.id).limit(limit + 1)
+
+        def page(q):
+            return [(t.updated_at, t.id, t.is_deleted, _change_entry(t)) for t in q]
+
+        pages = _per_shard(user, lambda session: page(query.with_session(session)))
+        rows = merge_sorted(pages, key=lambda row: row[:2])[:limit + 1]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        # A row flushed just before "now" may belong to a transaction that has not
+        # committed yet and would land behind the watermark. On the last page the
+        # watermark therefore trails now by SYNC_SETTLE_SECONDS; the few rows inside
+        # that window are sent again next time (applying a change twice is harmless).
+        settled = (datetime.utcnow() - timedelta(seconds=config.get("SYNC_SETTLE_SECONDS", 5)), 0)
+        key = rows[-1][:2] if rows else None
+        if not has_more:
+            key = min(key, settled) if key else settled
+            if since:
+                key = max(key, (since_ts, since_id))
+
+        return {
+            "changes": [entry for _, _, deleted, entry in rows if not deleted],
+            "deleted": [entry for _, _, deleted, entry in rows if deleted],
+            "watermark": _format_watermark(*key),
+            "has_more": has_more,
+        }, 200
+
+
+def _summarize(base):
+    """(by_category, by_month, by_merchant, by_tag) grouped rows for a filtered Transaction query."""
+    by_category = (
+        base.outerjoin(Category, Transaction.category_id == Category.id)
+        .with_entities(Transaction.category_id, Category.name, func.count(Transaction.id), func.sum(Transaction.amount))
+        .group_by(Transaction.category_id, Category.name)
+        .all()
+    )
+    year = extract("year", Transaction.date)
+    month = extract("month", Transaction.date)
+    by_month = (
+        base.with_entities(year, month, func.count(Transaction.id), func.sum(Transaction.amount))
+        .group_by(year, month)
+        .order_by(year, month)
+        .all()
+    )
+    by_merchant = (
+        base.with_entities(Transaction.merchant_id, func.count(Transaction.id), func.sum(Transaction.amount))
+        .group_by(Transaction.merchant_id)
+        .all()
+    )
+    by_tag = (
+        base.join(TransactionTag, TransactionTag.transaction_id == Transaction.id)
+        .with_entities(TransactionTag.tag, func.count(Transaction.id), func.sum(Transaction.amount))
+        .group_by(TransactionTag.tag)
+        .all()
+    )
+    return by_category, by_month, by_merchant, by_tag
+
+
+def _accumulate(groups, key, count, total):
+    prev_count, prev_total = groups.get(key, (0, 0.0))
+    groups[key] = (prev_count + count, prev_total + float(total or 0))
+
+
+class TransactionSummaryAPI(Resource):
+    """
+    Spending totals grouped by category, by month, by merchant and by tag.
+    Accepts the same filters as the list endpoint.
+    """
+
+    @token_required
+    def get(self):
+        user = request.user
+
+        etag = make_etag("summary", user.role, _transactions_version(user), normalized_args())
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        base = db.session.query(Transaction).filter(Transaction.is_deleted.is_(False))
+        base, error = _apply_filters(base, user)
+        if error:
+            return error
+
+        # grouped per shard, then the partial groups are added up
+        parts = _per_shard(user, lambda session: _summarize(base.with_session(session)))
+        by_category, by_month, by_merchant, by_tag = {}, {}, {}, {}
+        for categories, months, merchants, tags in parts:
+            for cid, name, count, total in categories:
+                _accumulate(by_category, (cid, name), count, total)
+            for y, m, count, total in months:
+                _accumulate(by_month, (int(y), int(m)), count, total)
+            for mid, count, total in merchants:
+                _accumulate(by_merchant, mid, count, total)
+            for tag, count, total in tags:
+                _accumulate(by_tag, tag, count, total)
+        # merchants live on the primary (transactions may be sharded): names in one lookup
+        merchant_names = dict(
+            db.session.query(Merchant.id, Merchant.name).filter(Merchant.id.in_([m for m in by_merchant if m]))
+        ) if by_merchant else {}
+
+        response = {
+            "by_category": [
+                {"category_id": cid, "category": name, "count": count, "total": total}
+                for (cid, name), (count, total) in by_category.items()
+            ],
+            "by_month": [
+                {"month": f"{y:04d}-{m:02d}", "count": count, "total": total}
+                for (y, m), (count, total) in sorted(by_month.items())
+            ],
+            "by_merchant": [
+                {"merchant_id": mid, "merchant": merchant_names.get(mid), "count": count, "total": total}
+                for mid, (count, total) in sorted(by_merchant.items(), key=lambda item: -item[1][1])
+            ],
+            # a transaction with several tags counts once per tag
+            "by_tag": [
+                {"tag": tag, "count": count, "total": total}
+                for tag, (count, total) in sorted(by_tag.items(), key=lambda item: -item[1][1])
+            ],
+        }
+        response["total"] = sum(row["total"] for row in response["by_category"])
+        return response, 200, cache_headers(etag)
+
+
+class TransactionImportAPI(Resource):
+    """
+    Bulk import, e.g. a parsed bank statement (admins: ?user_id= imports for that user).
+    POST /api/transactions/import
+    body: {"transactions": [{"amount", "date", "vendor", "note", "currency", "category"}, ...],
+           "skip_duplicates": true, "window_days": 3}
+
+    Rows matching an existing transaction (same amount, day and normalized
+    vendor; one skipped row per existing copy) are skipped and listed in
+    "duplicates"; imported rows that look
+    like an existing one (same amount within window_days) are listed in
+    "near_duplicates" as [new id, other id] pairs.
+    """
+
+    @token_required
+    def post(self):
+        user = request.user
+        config = current_app.config
+        data = request.get_json() or {}
+        rows = data.get("transactions")
+        if not isinstance(rows, list) or not rows:
+            return {"message": "transactions must be a non-empty list"}, 400
+        if len(rows) > config.get("IMPORT_MAX_ROWS", 50_000):
+            return {"message": f"at most {config.get('IMPORT_MAX_ROWS', 50_000)} rows per import"}, 413
+        window_days = data.get("window_days", config.get("DUPLICATE_WINDOW_DAYS", 3))
+        if not isinstance(window_days, int) or not 0 <= window_days <= 31:
+            return {"message": "window_days must be an integer between 0 and 31"}, 400
+
+        owner_id = _owner_filter(user) or user.id
+        try:
+            report = import_transactions(
+                owner_id, rows,
+                skip_duplicates=data.get("skip_duplicates", True) is not False,
+                window_days=window_days,
+                batch_size=config.get("IMPORT_BATCH_SIZE", 5_000),
+            )
+        except LookupError as e:
+            return {"message": str(e)}, 404
+        except ValueError as e:
+            return {"message": str(e)}, 400
+        return {"message": f"Imported {report['imported']} transactions.", **report}, 201 if report["imported"] else 200
+
+
+class TransactionDuplicatesAPI(Resource):
+    """
+    Duplicate scan over the user's transactions (admins: ?user_id=).
+    GET /api/transactions/duplicates?window_days=3
+    "exact": groups of ids with the same fingerprint; "near": [id, id] pairs with
+    the same amount within window_days.
+    """
+
+    @token_required
+    def get(self):
+        user = request.user
+        window_days = request.args.get("window_days", current_app.config.get("DUPLICATE_WINDOW_DAYS", 3), type=int)
+        if not 0 <= window_days <= 31:
+            return {"message": "window_days must be between 0 and 31"}, 400
+        result = find_duplicates(_owner_filter(user) or user.id, window_days)
+        return {"window_days": window_days, **result}, 200
+
+
 class TransactionDetailAPI(Resource):
     """
     Retrieve, update, or delete a specific transaction.
     """
 
     @token_required
+    @_on_transaction_shard
     def get(self, txn_id):
         user = request.user
         txn = Transaction.query.get(txn_id)
@@ -107,9 +438,14 @@ class TransactionDetailAPI(Resource):
             return {"message": "Transaction not found."}, 404
         if user.role != "admin" and txn.user_id != user.id:
             return {"message": "Access denied."}, 403
-        return {"transaction": txn.to_dict()}, 200
+
+        etag = make_etag("transaction", txn.id, txn.updated_at.isoformat())
+        if is_not_modified(etag, txn.updated_at):
+            return not_modified_response(etag, txn.updated_at)
+        return {"transaction": txn.to_dict()}, 200, cache_headers(etag, txn.updated_at)
 
     @token_required
+    @_on_transaction_shard
     def put(self, txn_id):
         user = request.user
         txn = Transaction.query.get(txn_id)
@@ -145,6 +481,7 @@ class TransactionDetailAPI(Resource):
         return {"message": "Transaction updated.", "transaction": txn.to_dict()}, 200
 
     @token_required
+    @_on_transaction_shard
     def delete(self, txn_id):
         user = request.user
         txn = Transaction.query.get(txn_id)
@@ -154,5 +491,6 @@ class TransactionDetailAPI(Resource):
             return {"message": "Access denied."}, 403
 
         txn.is_deleted = True
+        txn.deleted_at = datetime.utcnow()
         db.session.commit()
         return {"message": "Transaction deleted (soft)."}, 200
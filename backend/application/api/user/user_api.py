@@ -1,8 +1,13 @@
 from flask_restful import Resource
-from flask import request, jsonify
+from flask import request, jsonify, current_app
+from sqlalchemy import or_
 from ...models.models import User
+from ...models.model_utils import user_transaction_stats
 from application.database import db
-from ..auth.auth_utils import token_required, role_required
+from application import audit
+from ..auth.auth_utils import token_required, role_required, revoke_all_user_tokens, issue_token_pair
+from ...jobs import enqueue
+from ..http_cache import make_etag, is_not_modified, not_modified_response, cache_headers
 
 
 class UserProfile(Resource):
@@ -13,7 +18,11 @@ class UserProfile(Resource):
     @token_required
     def get(self):
         user = request.user
-        return {"user": user.to_dict()}, 200
+        # user row is already loaded by token_required, so the 304 path costs no extra query
+        etag = make_etag("profile", user.id, user.updated_at.isoformat())
+        if is_not_modified(etag, user.updated_at):
+            return not_modified_response(etag, user.updated_at)
+        return {"user": user.to_dict()}, 200, cache_headers(etag, user.updated_at)
 
     @token_required
     def put(self):
@@ -52,19 +61,58 @@ class UserPasswordChange(Resource):
             return {"message": "Old password incorrect"}, 403
 
         user.set_password(new_pw)
-        db.session.commit()
-        return {"message": "Password changed successfully"}, 200
+        # sign out other devices; this client gets a fresh token pair
+        revoke_all_user_tokens(user)
+        return {"message": "Password changed successfully", **issue_token_pair(user)}, 200
+
+
+EMPTY_STATS = {"transaction_count": 0, "total_amount": 0.0, "last_transaction_at": None}
+
+
+def _like_pattern(text):
+    escaped = text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
 
 
 class UserList(Resource):
     """
     Admin-only list and create users.
+
+    GET /api/users?q=&role=&is_active=&limit=&cursor=
+      q        substring of name or email (case-insensitive)
+      cursor   `next_cursor` of the previous page (keyset on id, stable under inserts)
+    Each user carries its transaction count / total / last date for the page,
+    computed with one grouped query over just those users.
     """
 
     @role_required("admin")
     def get(self):
-        users = User.query.all()
-        return {"users": [u.to_dict() for u in users]}, 200
+        limit = request.args.get("limit", current_app.config.get("USER_PAGE_SIZE", 50), type=int)
+        limit = max(1, min(limit, current_app.config.get("USER_MAX_PAGE_SIZE", 500)))
+
+        query = User.query
+        q = (request.args.get("q") or "").strip()
+        if q:
+            pattern = _like_pattern(q)
+            query = query.filter(or_(User.name.ilike(pattern, escape="\\"), User.email.ilike(pattern, escape="\\")))
+        if request.args.get("role"):
+            query = query.filter(User.role == request.args["role"])
+        is_active = request.args.get("is_active", type=lambda x: x.lower() == "true")
+        if is_active is not None:
+            query = query.filter(User.is_active == is_active)
+        cursor = request.args.get("cursor", type=int)
+        if cursor:
+            query = query.filter(User.id > cursor)
+
+        users = query.order_by(User.id).limit(limit + 1).all()
+        has_more = len(users) > limit
+        users = users[:limit]
+        stats = user_transaction_stats([u.id for u in users])
+        return {
+            "users": [{**u.to_dict(), "stats": stats.get(u.id, EMPTY_STATS)} for u in users],
+            "next_cursor": users[-1].id if has_more else None,
+            "has_more": has_more,
+        }, 200
 
     @role_required("admin")
     def post(self):
@@ -84,6 +132,7 @@ class UserList(Resource):
         new_user.set_password(password)
         db.session.add(new_user)
         db.session.commit()
+        audit.record("user.create", actor_id=request.user.id, details={"user_id": new_user.id, "role": role})
         return {"message": "User created", "user": new_user.to_dict()}, 201
 
 
@@ -119,14 +168,30 @@ class UserDetail(Resource):
         if role:
             user.role = role
 
+        changed = {key: data[key] for key in ("name", "email", "role") if data.get(key)}
         db.session.commit()
+        audit.record("user.update", actor_id=request.user.id, details={"user_id": user_id, "changed": changed})
         return {"message": "User updated", "user": user.to_dict()}, 200
 
     @role_required("admin")
     def delete(self, user_id):
+        """
+        Deactivate now (every token stops working), delete the data in the
+        background `delete_user` job. Answers 202 with the job to poll.
+        """
         user = User.query.get(user_id)
         if not user:
             return {"message": "User not found"}, 404
-        db.session.delete(user)
+        if user.id == request.user.id:
+            return {"message": "You cannot delete your own account"}, 400
+        user.is_active = False
+        revoke_all_user_tokens(user, commit=False)
+        job = enqueue("delete_user", {"user_id": user_id}, user_id=request.user.id, commit=False)
         db.session.commit()
-        return {"message": f"User {user_id} deleted"}, 200
+        audit.record("user.delete", actor_id=request.user.id,
+                     details={"user_id": user_id, "email": user.email, "job_id": job.id})
+        return {
+            "message": f"User {user_id} deactivated; data is being deleted",
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+        }, 202
@@ -0,0 +1,236 @@
+"""
+Buffered audit logging with time-partitioned retention.
+
+`audit.record(action, actor_id=..., details=...)` only appends to an in-memory
+buffer; a background thread writes the buffer to `audit_logs` with one batched
+INSERT when it reaches AUDIT_BATCH_SIZE events or every AUDIT_FLUSH_INTERVAL
+seconds, whichever comes first. Logins, logouts and admin changes therefore
+never wait for an audit commit. The buffer is flushed on interpreter exit; a
+failed flush keeps the events for the next attempt (at most AUDIT_MAX_BUFFER,
+the oldest are dropped beyond that and counted in `audit.dropped`).
+
+Events are written on their own connection, independent of the request's
+session: an audit entry is recorded even when the request later rolls back.
+Writes that must be atomic with a state change (job outcomes, see jobs.py)
+still add an AuditLog row to their own session.
+
+Retention (the `audit_retention` job, enqueued daily by worker.py):
+- whole months older than AUDIT_HOT_DAYS move from `audit_logs` into a
+  per-month partition table `audit_logs_YYYYMM` (INSERT ... SELECT + DELETE
+  in one transaction), so the hot table only holds recent events,
+- partitions entirely older than AUDIT_RETENTION_DAYS are dropped with one
+  DROP TABLE instead of a large DELETE.
+
+Config keys:
+- AUDIT_ASYNC            buffer + background thread (default True; False writes inline)
+- AUDIT_BATCH_SIZE       events per INSERT batch (default 200)
+- AUDIT_FLUSH_INTERVAL   max seconds an event waits in the buffer (default 2.0)
+- AUDIT_MAX_BUFFER       events kept while the database is unavailable (default 10000)
+- AUDIT_HOT_DAYS         age after which a month is moved to its partition (default 31)
+- AUDIT_RETENTION_DAYS   age after which partitions are dropped (default 365, None keeps all)
+"""
+
+import atexit
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timedelta
+from sqlalchemy import Column, Index, MetaData, Table, insert, select, delete, func, inspect
+
+logger = logging.getLogger("application.audit")
+
+PARTITION_PREFIX = "audit_logs_"
+
+
+class AuditWriter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._buffer = []
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self.engine = None
+        self.table = None
+        self.async_mode = True
+        self.batch_size = 200
+        self.interval = 2.0
+        self.max_buffer = 10_000
+        self.dropped = 0
+
+    def configure(self, engine, table, async_mode=True, batch_size=200, interval=2.0, max_buffer=10_000):
+        self.flush()
+        self.engine, self.table = engine, table
+        self.async_mode = async_mode
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_buffer = max_buffer
+
+    # --------------------------- Producer side ---------------------------
+    def record(self, action: str, actor_id: int = None, details=None):
+        """Queue one audit event; `details` may be a dict (stored as JSON) or a string."""
+        if self.engine is None:
+            logger.warning("audit writer not configured, dropping %s", action)
+            return
+        if details is not None and not isinstance(details, str):
+            details = json.dumps(details, default=str)
+        row = {"actor_id": actor_id, "action": action[:255], "details": details, "created_at": datetime.utcnow()}
+        if not self.async_mode:
+            self._write([row])
+            return
+        self._ensure_thread()
+        with self._lock:
+            self._buffer.append(row)
+            pending = len(self._buffer)
+        if pending >= self.batch_size:
+            self._wake.set()
+
+    def _ensure_thread(self):
+        # started lazily, and again in a forked child (threads do not survive fork)
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            if self._pid not in (None, os.getpid()):
+                self._buffer = []  # the parent still owns (and flushes) what it buffered
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+            self._thread.start()
+
+    # --------------------------- Writer thread ---------------------------
+    def _run(self):
+        while not self._stopping:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    def _write(self, rows):
+        with self.engine.begin() as conn:
+            conn.execute(insert(self.table), rows)
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of events written."""
+        with self._flush_lock:
+            with self._lock:
+                rows, self._buffer = self._buffer, []
+            if not rows:
+                return 0
+            try:
+                for i in range(0, len(rows), self.batch_size):
+                    self._write(rows[i:i + self.batch_size])
+            except Exception:
+                logger.exception("audit flush of %d events failed, will retry", len(rows))
+                with self._lock:
+                    self._buffer[:0] = rows[i:]
+                    overflow = len(self._buffer) - self.max_buffer
+                    if overflow > 0:
+                        del self._buffer[:overflow]
+                        self.dropped += overflow
+                        logger.error("audit buffer full, dropped %d oldest events", overflow)
+                return i
+            return len(rows)
+
+    def close(self):
+        """Stop the thread and write what is left (registered with atexit)."""
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None and self._pid == os.getpid():
+            self._thread.join(timeout=5)
+        self.flush()
+
+
+writer = AuditWriter()
+atexit.register(writer.close)
+
+
+def record(action: str, actor_id: int = None, details=None):
+    writer.record(action, actor_id=actor_id, details=details)
+
+
+# --------------------------- Retention ---------------------------
+def _month_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, 1)
+
+
+def _next_month(start: datetime) -> datetime:
+    return datetime(start.year + start.month // 12, start.month % 12 + 1, 1)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{PARTITION_PREFIX}{month:%Y%m}"
+
+
+def _partition_table(source, name):
+    """Same columns as audit_logs (no foreign keys: archived actors may be gone), indexed by time."""
+    table = Table(name, MetaData(), *[
+        Column(c.name, c.type, primary_key=c.primary_key, nullable=c.nullable) for c in source.columns
+    ])
+    Index(f"ix_{name}_created_at", table.c.created_at)
+    return table
+
+
+def partitions(engine) -> list:
+    """Names of the existing monthly partition tables, oldest first."""
+    return sorted(t for t in inspect(engine).get_table_names()
+                  if t.startswith(PARTITION_PREFIX) and t[len(PARTITION_PREFIX):].isdigit())
+
+
+def apply_retention(engine, table, hot_days: int = 31, retention_days: int = 365, now: datetime = None):
+    """
+    Move closed months out of the hot table into their partitions and drop
+    expired partitions. Idempotent; returns counts for the job result.
+    """
+    now = now or datetime.utcnow()
+    hot_cutoff = _month_start(now - timedelta(days=hot_days))
+    expire_before = now - timedelta(days=retention_days) if retention_days is not None else None
+    archived, expired = 0, 0
+
+    while True:
+        with engine.begin() as conn:
+            oldest = conn.scalar(select(func.min(table.c.created_at)).where(table.c.created_at < hot_cutoff))
+            if oldest is None:
+                break
+            start = _month_start(oldest)
+            end = _next_month(start)  # <= hot_cutoff, a month start
+            in_month = (table.c.created_at >= start) & (table.c.created_at < end)
+            if expire_before is not None and end <= expire_before:
+                expired += conn.execute(delete(table).where(in_month)).rowcount
+                continue
+            part = _partition_table(table, partition_name(start))
+            part.create(conn, checkfirst=True)
+            columns = [c.name for c in table.columns]
+            conn.execute(insert(part).from_select(columns, select(*table.columns).where(in_month)))
+            archived += conn.execute(delete(table).where(in_month)).rowcount
+
+    dropped = []
+    if expire_before is not None:
+        for name in partitions(engine):
+            month = datetime.strptime(name[len(PARTITION_PREFIX):], "%Y%m")
+            if _next_month(month) <= expire_before:
+                with engine.begin() as conn:
+                    Table(name, MetaData()).drop(conn)
+                dropped.append(name)
+    if archived or expired or dropped:
+        logger.info("audit retention: %d archived, %d expired, dropped %s", archived, expired, dropped)
+    return {"archived": archived, "expired": expired, "dropped_partitions": dropped}
+
+
+def init_audit(app):
+    from .database import db
+    from .models.models import AuditLog
+
+    with app.app_context():
+        engine = db.engine
+    writer.configure(
+        engine,
+        AuditLog.__table__,
+        async_mode=app.config.get("AUDIT_ASYNC", True),
+        batch_size=app.config.get("AUDIT_BATCH_SIZE", 200),
+        interval=app.config.get("AUDIT_FLUSH_INTERVAL", 2.0),
+        max_buffer=app.config.get("AUDIT_MAX_BUFFER", 10_000),
+    )
+    return writer
@@ -0,0 +1,331 @@
+"""
+Application-level read-through cache for Smart Expense Tracker.
+
+Two tiers:
+- a local in-memory LRU tier (per process, short TTL), and
+- an optional shared tier behind the small `SharedBackend` interface
+  (`InMemorySharedBackend` is the local stand-in; `RedisBackend` is used when
+  CACHE_SHARED_BACKEND is a redis:// URL and the `redis` package is installed).
+
+Reads go local -> shared -> loader. Writes invalidate both tiers, and
+`invalidate_on_commit()` repeats the invalidation once the DB transaction
+commits so a concurrent reader cannot re-populate a pre-commit value.
+
+Config keys:
+- CACHE_ENABLED          turn the whole cache off (every get calls the loader)
+- CACHE_MAX_ENTRIES      local LRU size (default 10_000)
+- CACHE_LOCAL_TTL        local tier TTL in seconds (default 10); bounds staleness
+                         across workers when a shared backend is configured. Entries
+                         set with a shorter ttl expire with it; without a shared
+                         backend the local tier keeps the caller's ttl as given
+- CACHE_LOCAL_EXCLUDE    key prefixes never kept in a per-process tier (default ("user:",)):
+                         auth checks read users.token_generation / is_active /
+                         data_version and must see another worker's change at once,
+                         so these keys live in a real shared tier only. The "memory"
+                         backend is per process too, so with it (or without a shared
+                         backend) they are not cached at all
+- CACHE_DEFAULT_TTL      shared tier TTL in seconds (default 300)
+- CACHE_SHARED_BACKEND   None | "memory" | "redis://host:port/db"
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class CacheStats:
+    """Simple counters, readable via `as_dict()` (exposed on /api/admin/cache)."""
+
+    FIELDS = ("hits", "misses", "sets", "invalidations", "evictions", "expired")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            for f in self.FIELDS:
+                setattr(self, f, 0)
+
+    def incr(self, field, n=1):
+        with self._lock:
+            setattr(self, field, getattr(self, field) + n)
+
+    def as_dict(self):
+        data = {f: getattr(self, f) for f in self.FIELDS}
+        lookups = data["hits"] + data["misses"]
+        data["hit_ratio"] = round(data["hits"] / lookups, 4) if lookups else None
+        return data
+
+
+class LocalCache:
+    """Thread-safe LRU dict with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 10_000, ttl: float = 10):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = CacheStats()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.stats.incr("misses")
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.stats.incr("expired")
+                self.stats.incr("misses")
+                return None
+            self._data.move_to_end(key)
+            self.stats.incr("hits")
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + (ttl or self.ttl))
+            self._data.move_to_end(key)
+            self.stats.incr("sets")
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                if self._data.pop(key, None) is not None:
+                    self.stats.incr("invalidations")
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# --------------------------- Shared tier ---------------------------
+class SharedBackend:
+    """
+    Minimal interface for a shared (cross-process) cache store.
+    Values are opaque bytes; the Cache class handles (de)serialization.
+    `process_local` backends are not seen by other processes.
+    """
+
+    process_local = False
+
+    def get(self, key: str):
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: int):
+        raise NotImplementedError
+
+    def delete(self, *keys: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class InMemorySharedBackend(SharedBackend):
+    """
+    Local stand-in for a shared store (dev, tests, single-box deployments).
+    Behaves like Redis GET/SETEX/DEL, but lives inside this process.
+    """
+
+    process_local = True
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.time():
+                del self._data[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._data[key] = (value, time.time() + ttl)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisBackend(SharedBackend):
+    """Shared tier on Redis. `redis` is an optional dependency."""
+
+    def __init__(self, url: str, prefix: str = "set:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError("CACHE_SHARED_BACKEND is a redis URL but the 'redis' package is not installed") from e
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl):
+        self.client.setex(self.prefix + key, int(ttl), value)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + k for k in keys])
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + "*"):
+            self.client.delete(key)
+
+
+def make_shared_backend(spec):
+    if not spec:
+        return None
+    if isinstance(spec, SharedBackend):
+        return spec
+    if spec == "memory":
+        return InMemorySharedBackend()
+    if spec.startswith("redis://") or spec.startswith("rediss://"):
+        return RedisBackend(spec)
+    raise ValueError(f"Unknown CACHE_SHARED_BACKEND '{spec}'")
+
+
+# --------------------------- Two-tier cache ---------------------------
+class Cache:
+    def __init__(self):
+        self.enabled = True
+        self.local = LocalCache()
+        self.shared = None
+        self.shared_stats = CacheStats()
+        self.default_ttl = 300
+        self.local_exclude = ()
+
+    def configure(self, config):
+        self.enabled = config.get("CACHE_ENABLED", True)
+        self.local = LocalCache(config.get("CACHE_MAX_ENTRIES", 10_000), config.get("CACHE_LOCAL_TTL", 10))
+        self.shared = make_shared_backend(config.get("CACHE_SHARED_BACKEND"))
+        self.shared_stats = CacheStats()
+        self.default_ttl = config.get("CACHE_DEFAULT_TTL", 300)
+        self.local_exclude = tuple(config.get("CACHE_LOCAL_EXCLUDE", ("user:",)))
+
+    def _local_ok(self, key):
+        return not key.startswith(self.local_exclude)
+
+    def _shared_ok(self, key):
+        return self.shared is not None and not (self.shared.process_local and key.startswith(self.local_exclude))
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        local_ok = self._local_ok(key)
+        value = self.local.get(key) if local_ok else None
+        if value is not None or not self._shared_ok(key):
+            return value
+        raw = self.shared.get(key)
+        if raw is None:
+            self.shared_stats.incr("misses")
+            return None
+        self.shared_stats.incr("hits")
+        value, expires = pickle.loads(raw)
+        remaining = expires - time.time()
+        if local_ok and remaining > 0:
+            # never outlive the shared entry (e.g. a short sticky-primary flag)
+            self.local.set(key, value, min(remaining, self.local.ttl))
+        return value
+
+    def set(self, key, value, ttl: int = None):
+        if not self.enabled or value is None:
+            return
+        if self._local_ok(key):
+            # capped at the local TTL only when there is a shared tier to refill from
+            self.local.set(key, value, min(ttl or self.local.ttl, self.local.ttl) if self.shared is not None else ttl)
+        if self._shared_ok(key):
+            ttl = ttl or self.default_ttl
+            # the expiry travels with the value, so a local copy of a shared hit expires with it
+            payload = pickle.dumps((value, time.time() + ttl), protocol=pickle.HIGHEST_PROTOCOL)
+            self.shared.set(key, payload, ttl)
+            self.shared_stats.incr("sets")
+
+    def get_or_load(self, key, loader, ttl: int = None):
+        """Read-through: return the cached value or call `loader()` and cache its (non-None) result."""
+        value = self.get(key)
+        if value is None:
+            value = loader()
+            self.set(key, value, ttl)
+        return value
+
+    def delete(self, *keys):
+        self.local.delete(*keys)
+        if self.shared is not None and keys:
+            self.shared.delete(*keys)
+            self.shared_stats.incr("invalidations", len(keys))
+
+    def clear(self):
+        self.local.clear()
+        if self.shared is not None:
+            self.shared.clear()
+
+    def stats(self):
+        data = {"enabled": self.enabled, "local": self.local.stats.as_dict(), "local_entries": len(self.local)}
+        if self.shared is not None:
+            data["shared"] = {"backend": type(self.shared).__name__, **self.shared_stats.as_dict()}
+        return data
+
+
+cache = Cache()
+
+
+def init_cache(app):
+    """Configure the global cache from app config."""
+    cache.configure(app.config)
+    app.extensions["cache"] = cache
+    return cache
+
+
+# --------------------------- Invalidation on commit ---------------------------
+_PENDING_KEY = "cache_invalidate"
+
+
+def invalidate_on_commit(session, *keys):
+    """
+    Drop `keys` now, and again right after `session` commits (or rolls back),
+    closing the window where another request re-caches the old row.
+    """
+    cache.delete(*keys)
+    if session is not None:
+        session.info.setdefault(_PENDING_KEY, set()).update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _flush_pending_invalidations(session):
+    keys = session.info.pop(_PENDING_KEY, None)
+    if keys:
+        cache.delete(*keys)
+
+
+# --------------------------- Key helpers ---------------------------
+def user_key(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def category_key(user_id, name) -> str:
+    return f"category:{user_id if user_id is not None else 'global'}:{name}"
@@ -0,0 +1,144 @@
+"""
+Transaction auto-categorizer: multinomial Naive Bayes over vendor / note / amount tokens.
+
+Features per transaction (`features()`):
+- vendor words ("v:amazon"), with the vendor normalized like the merchant dictionary,
+- note words ("n:groceries"),
+- the amount's magnitude bucket ("a:7" = 2^7 .. 2^8), since rent and coffee differ by scale.
+
+Naive Bayes keeps nothing but counts (documents per label, tokens per label),
+so training is additive: `partial_fit()` on a batch of new rows gives exactly
+the model a full pass over old + new rows would give. That is what makes the
+incremental retraining in services/training_service.py cheap: each version
+reads the previous artifact and only streams rows created since its watermark.
+Edits to rows already learned are not retracted; the pipeline measures that
+drift and retrains from scratch when it grows.
+
+Artifacts are gzip'd JSON; `load_model()` caches them per process by path
+(paths are versioned, so a cached artifact never goes stale).
+"""
+
+import gzip
+import json
+import math
+import os
+import tempfile
+import threading
+from collections import Counter
+from application.merchants import normalize_vendor
+
+FORMAT_VERSION = 1
+
+
+def _words(text):
+    return [w for w in normalize_vendor(text).split() if len(w) > 1 and not w.isdigit()]
+
+
+def features(vendor, note, amount) -> list:
+    tokens = [f"v:{w}" for w in _words(vendor)]
+    tokens += [f"n:{w}" for w in _words(note)]
+    if amount:
+        tokens.append(f"a:{int(math.log2(abs(float(amount)) + 1))}")
+    return tokens
+
+
+class NaiveBayesCategorizer:
+    def __init__(self, alpha: float = 1.0):
+        self.alpha = alpha
+        self.label_docs = Counter()    # label -> training rows
+        self.token_counts = {}         # label -> Counter(token -> occurrences)
+        self.token_totals = Counter()  # label -> sum of its token counts
+        self.vocabulary = set()
+
+    @property
+    def rows(self) -> int:
+        return sum(self.label_docs.values())
+
+    def partial_fit(self, samples):
+        """samples: iterable of (tokens, label). Returns the number of rows learned."""
+        n = 0
+        for tokens, label in samples:
+            self.label_docs[label] += 1
+            counts = self.token_counts.setdefault(label, Counter())
+            counts.update(tokens)
+            self.token_totals[label] += len(tokens)
+            self.vocabulary.update(tokens)
+            n += 1
+        return n
+
+    def scores(self, tokens, labels=None) -> dict:
+        """Unnormalized log posteriors per label (restricted to `labels` if given)."""
+        total_docs = self.rows
+        if not total_docs:
+            return {}
+        vocab = len(self.vocabulary) or 1
+        result = {}
+        for label, docs in self.label_docs.items():
+            if labels is not None and label not in labels:
+                continue
+            counts = self.token_counts.get(label, {})
+            denom = self.token_totals[label] + self.alpha * vocab
+            score = math.log(docs / total_docs)
+            for token in tokens:
+                score += math.log((counts.get(token, 0) + self.alpha) / denom)
+            result[label] = score
+        return result
+
+    def predict(self, tokens, labels=None):
+        scores = self.scores(tokens, labels)
+        return max(scores, key=scores.get) if scores else None
+
+    # --------------------------- Persistence ---------------------------
+    def to_dict(self) -> dict:
+        return {
+            "format": FORMAT_VERSION,
+            "alpha": self.alpha,
+            "label_docs": dict(self.label_docs),
+            "token_counts": {label: dict(c) for label, c in self.token_counts.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        if data.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported categorizer artifact format {data.get('format')!r}")
+        model = cls(alpha=data["alpha"])
+        model.label_docs = Counter(data["label_docs"])
+        for label, counts in data["token_counts"].items():
+            model.token_counts[label] = Counter(counts)
+            model.token_totals[label] = sum(counts.values())
+            model.vocabulary.update(counts)
+        return model
+
+    def save(self, path):
+        """Write atomically (temp file + rename): readers never see a partial artifact."""
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as out:
+            out.write(json.dumps(self.to_dict(), separators=(",", ":")).encode())
+        os.replace(tmp_path, path)
+        return path
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+_CACHE_SIZE = 256
+
+
+def read_model(path) -> NaiveBayesCategorizer:
+    """A private copy, safe to keep training."""
+    with gzip.open(path, "rb") as f:
+        return NaiveBayesCategorizer.from_dict(json.loads(f.read()))
+
+
+def load_model(path) -> NaiveBayesCategorizer:
+    """Shared, cached copy for predictions: never train it."""
+    with _cache_lock:
+        model = _cache.get(path)
+    if model is not None:
+        return model
+    model = read_model(path)
+    with _cache_lock:
+        if len(_cache) >= _CACHE_SIZE:
+            _cache.pop(next(iter(_cache)))
+        _cache[path] = model
+    return model
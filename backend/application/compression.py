@@ -0,0 +1,67 @@
+"""
+Response compression for API payloads.
+
+Negotiates `br` (when the optional `brotli` package is installed) or `gzip`
+from the request's Accept-Encoding and compresses responses above
+`COMPRESS_MIN_SIZE` bytes. Small bodies are left alone: below ~1 KB the
+framing overhead outweighs the savings.
+
+Config keys:
+- COMPRESS_MIN_SIZE   minimum body size in bytes (default 1024)
+- COMPRESS_LEVEL      gzip level 1-9 (default 6)
+- COMPRESS_BR_QUALITY brotli quality 0-11 (default 4, tuned for speed)
+- COMPRESS_MIMETYPES  content types eligible for compression
+"""
+
+import gzip
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+DEFAULT_MIMETYPES = {"application/json", "text/html", "text/plain", "text/csv", "text/css", "application/javascript"}
+
+
+def _supported_encodings():
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def compress_body(body: bytes, encoding: str, config) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=config.get("COMPRESS_BR_QUALITY", 4))
+    return gzip.compress(body, compresslevel=config.get("COMPRESS_LEVEL", 6))
+
+
+def init_compression(app):
+    """Register an after_request hook that compresses eligible responses."""
+    min_size = app.config.get("COMPRESS_MIN_SIZE", 1024)
+    mimetypes = set(app.config.get("COMPRESS_MIMETYPES", DEFAULT_MIMETYPES))
+
+    @app.after_request
+    def compress_response(response):
+        response.vary.add("Accept-Encoding")
+
+        if (
+            response.direct_passthrough  # streamed / send_file responses
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or "Content-Encoding" in response.headers
+            or response.mimetype not in mimetypes
+        ):
+            return response
+
+        encoding = request.accept_encodings.best_match(_supported_encodings())
+        if not encoding:
+            return response
+
+        body = response.get_data()
+        if len(body) < min_size:
+            return response
+
+        response.set_data(compress_body(body, encoding, app.config))
+        response.headers["Content-Encoding"] = encoding
+        return response
+
+    return app
@@ -17,6 +17,10 @@ class Config:
     # Folder paths for uploads and templates
     UPLOAD_FOLDER = 'static/uploads'
 
+    # Columnar analytics exports (Parquet / Arrow IPC)
+    EXPORT_FOLDER = os.path.join(basedir, "..", "..", "data", "exports")
+    EXPORT_BATCH_SIZE = 50_000
+
     # Max upload size (250 MB)
     MAX_CONTENT_LENGTH = 250 * 1024 * 1024
 
@@ -36,6 +40,128 @@ class Config:
     MAIL_USE_TLS = True
 
 
+    # API payload encoding / compression
+    JSON_ENCODER = os.getenv("JSON_ENCODER", "auto")  # auto | orjson | json
+    COMPRESS_MIN_SIZE = 1024
+    COMPRESS_LEVEL = 6
+    COMPRESS_BR_QUALITY = 4
+
+
+    # Read-through cache (see application/cache.py)
+    CACHE_ENABLED = True
+    CACHE_MAX_ENTRIES = 10_000
+    CACHE_LOCAL_TTL = 10
+    CACHE_LOCAL_EXCLUDE = ("user:",)  # auth state: shared tier only, never stale per process
+    CACHE_DEFAULT_TTL = 300
+    CACHE_SHARED_BACKEND = os.getenv("CACHE_SHARED_BACKEND")  # None | "memory" | "redis://..."
+
+
+    # Request / SQL instrumentation (see application/instrumentation.py)
+    METRICS_ENABLED = True
+    SLOW_QUERY_MS = 100
+    SLOW_REQUEST_MS = 500
+
+
+    # Health probes
+    HEALTH_CACHE_SECONDS = 5.0  # one DB probe per process per 5 s, however often the LB polls
+    HEALTH_DB_TIMEOUT = 2.0
+    HEALTH_MAX_POOL_SATURATION = 1.0
+    HEALTH_REQUIRE_MIGRATIONS = False
+
+
+    # Password hashing (werkzeug method string); outdated hashes are upgraded on login
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    PASSWORD_HASH_QUEUE = 16
+    PASSWORD_HASH_QUEUE_TIMEOUT = 2.0
+
+
+    # Auth endpoint throttling (see application/ratelimit.py)
+    RATELIMIT_ENABLED = os.getenv("RATELIMIT_ENABLED", "true").lower() == "true"
+    RATELIMIT_STORE = os.getenv("RATELIMIT_STORE", "memory")  # memory | shared
+    RATELIMIT_TRUST_PROXY = False
+    RATELIMIT_RULES = {}  # {rule_name: "N/minute"}, overrides ratelimit.DEFAULT_RULES
+
+
+    # Read replicas (see application/database.py); comma-separated URIs
+    SQLALCHEMY_REPLICA_URIS = [u for u in os.getenv("SQLALCHEMY_REPLICA_URIS", "").split(",") if u]
+    REPLICA_STICKY_SECONDS = 5  # > worst replica lag: a user reads the primary this long after a write
+
+
+    # Per-user sharding of transactions / categories (see application/sharding.py); comma-separated SQLite URIs
+    SHARD_URIS = [u for u in os.getenv("SHARD_URIS", "").split(",") if u]
+
+
+    # Admin user listing (/api/users)
+    USER_PAGE_SIZE = 50
+    USER_MAX_PAGE_SIZE = 500
+
+
+    # Incremental sync (/api/transactions/changes)
+    SYNC_PAGE_SIZE = 500
+    SYNC_MAX_PAGE_SIZE = 2000
+    SYNC_SETTLE_SECONDS = 5  # watermark trails "now" by this much, covering in-flight commits (also ML training)
+
+
+    # Background jobs (see application/jobs.py, run `python worker.py`)
+    JOB_WORKER_PROCESSES = int(os.getenv("JOB_WORKER_PROCESSES", 2))
+    JOB_POLL_INTERVAL = 1.0
+    JOB_RETRY_BASE_DELAY = 10
+    JOB_STALE_AFTER = 3600
+    JOB_CONCURRENCY = {}  # {job_type: max running}, overrides handler defaults
+    BACKUP_FOLDER = os.path.join(basedir, "..", "..", "data", "backups")
+    USER_DELETE_CHUNK_SIZE = 5_000  # rows per DELETE (and commit) when purging a user
+
+
+    # Socket.IO push of transaction changes (see application/realtime.py)
+    REALTIME_ENABLED = os.getenv("REALTIME_ENABLED", "true").lower() == "true"
+    REALTIME_MESSAGE_QUEUE = os.getenv("REALTIME_MESSAGE_QUEUE")  # e.g. redis://localhost:6379/1
+    REALTIME_ASYNC_MODE = os.getenv("REALTIME_ASYNC_MODE")  # None = auto-detect
+    REALTIME_CORS_ORIGINS = ["http://localhost:5173"]
+    REALTIME_MAX_DELTAS = 100
+
+
+    # Merchant dictionary (see application/merchants.py)
+    MERCHANT_RELOAD_SECONDS = 60
+    MERCHANT_MEMO_SIZE = 100_000
+    MERCHANT_BACKFILL_CHUNK_SIZE = 10_000
+
+
+    # Bulk import and duplicate detection (see application/services/import_service.py)
+    IMPORT_MAX_ROWS = 50_000          # rows per POST /api/transactions/import
+    IMPORT_BATCH_SIZE = 5_000         # rows per INSERT (and commit)
+    DUPLICATE_WINDOW_DAYS = 3         # same amount within this many days is a near duplicate
+
+
+    # Receipt attachments (see application/storage.py); kept out of static/, files are private
+    RECEIPT_FOLDER = os.path.join(basedir, "..", "..", "data", "receipts")
+    RECEIPT_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "webp", "pdf"}
+    RECEIPT_MAX_BYTES = 20 * 1024 * 1024
+    RECEIPT_CHUNK_SIZE = 64 * 1024
+    RECEIPT_THUMBNAIL_SIZE = 320       # longest side, pixels
+    RECEIPT_CACHE_MAX_AGE = 365 * 24 * 3600
+
+
+    # Categorizer training (see application/services/training_service.py)
+    ML_MODEL_FOLDER = os.path.join(basedir, "..", "..", "data", "models")
+    ML_TRAIN_CHUNK_SIZE = 20_000      # rows streamed per round trip
+    ML_TRAIN_PROCESSES = 2            # pool for per-user layers; <= 1 trains them inline
+    ML_MIN_USER_ROWS = 50             # categorized rows before a user gets a personal layer
+    ML_FULL_RETRAIN_EVERY = 10        # incremental versions between full retrains
+    ML_MAX_EDITED_FRACTION = 0.05     # learned rows edited since the last full run that force one
+    ML_KEEP_VERSIONS = 3              # versions (rows + artifacts) kept per model and owner
+    ML_PERSONAL_WEIGHT = 0.6          # share of the personal layer in suggestions
+
+
+    # Audit log writer and retention (see application/audit.py)
+    AUDIT_ASYNC = True
+    AUDIT_BATCH_SIZE = 200
+    AUDIT_FLUSH_INTERVAL = 2.0
+    AUDIT_MAX_BUFFER = 10_000
+    AUDIT_HOT_DAYS = 31
+    AUDIT_RETENTION_DAYS = 365
+
+
     #Frontend Base
     FRONT_END_BASE = os.getenv("FRONTEND_BASE","")
 
@@ -52,7 +178,11 @@ class LocalDevelopmentConfig(Config):
 
     # Local SQLite directory - optional, uncomment if you want to use SQLite
     SQLITE_DB_DIR = os.path.join(basedir, "..", "..", "data")
-    SQLALCHEMY_DATABASE_URI = "sqlite:///" + os.path.join(SQLITE_DB_DIR, "database.sqlite3")
+    # DATABASE_URL lets scripts (benchmarks, load tests) point the app at a scratch database
+    SQLALCHEMY_DATABASE_URI = os.getenv(
+        "DATABASE_URL",
+        "sqlite:///" + os.path.join(SQLITE_DB_DIR, "database.sqlite3")
+    )
 
     # Example MySQL URI for local dev - replace with your own or set via env var
     # SQLALCHEMY_DATABASE_URI = os.getenv(
@@ -61,6 +191,9 @@ class LocalDevelopmentConfig(Config):
     # )
     
 
+    # Cheaper KDF for local development; production keeps the base default
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt:16384:8:1")
+
     # Secret key for sessions and security - override via env var in real use
     SECRET_KEY = os.getenv("SECRET_KEY", 'a-super-secret-key')
 
@@ -6,16 +6,194 @@ Handles:
 - Flask app integration via init_app(app)
 - Alembic migrations setup (auto-detects migration folder)
 - Session utilities for scripts (seed, CLI, etc.)
+- Read-replica routing for db.session (RoutingSession)
+- Optional per-user sharding of transactions / categories (application/sharding.py)
+
+Replica routing:
+SQLALCHEMY_REPLICA_URIS lists read-only copies of the primary (SQLite file
+replicas kept up to date externally, or a second server). A statement goes to
+a replica only when all of these hold:
+- it runs inside a GET / HEAD request, after token_required resolved the user
+  (so the auth checks themselves always see the primary),
+- it is a SELECT outside a flush,
+- the user is not "sticky": every commit that changes a user's data marks that
+  user for REPLICA_STICKY_SECONDS in the cache, so they read their own writes.
+  Set it above the worst expected replica lag; with several workers use a
+  shared cache tier (CACHE_SHARED_BACKEND) so the mark is seen by all of them.
+Everything else, including CLI scripts and worker.py jobs, uses the primary.
+`use_primary()` forces the primary for a block of code. A request sticks to
+one replica for all its reads, so a version stamp and the rows it describes
+come from the same copy (`reads_from_replica()` tells handlers that compute
+ETags whether that copy is a replica).
 """
 
+import itertools
 import os
+import threading
+from contextlib import contextmanager
+from flask import g, request, has_request_context
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import create_engine
-from sqlalchemy.orm import scoped_session, sessionmaker
+from flask_sqlalchemy.session import Session as FlaskSession
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, scoped_session, sessionmaker
 from flask_migrate import Migrate
+from .cache import cache
+from .sharding import (shards, touches_shards, current_shard, shard_for_instance, shard_for_lazy_load,
+                       shard_for_row_id, init_sharding)
+
+READ_METHODS = ("GET", "HEAD")
+
+
+class ReplicaRouter:
+    """Round-robin over the configured replica engines."""
+
+    def __init__(self):
+        self.engines = []
+        self.sticky_seconds = 5
+        self._cycle = None
+        self._lock = threading.Lock()
+
+    def configure(self, uris, sticky_seconds, engine_options=None):
+        self.engines = [create_engine(uri, **(engine_options or {})) for uri in uris]
+        self.sticky_seconds = sticky_seconds
+        self._cycle = itertools.cycle(self.engines) if self.engines else None
+
+    def pick(self):
+        with self._lock:
+            return next(self._cycle)
+
+
+router = ReplicaRouter()
+
+
+def sticky_key(user_id) -> str:
+    return f"rw:{user_id}"
+
+
+def _replica_allowed(clause):
+    if not router.engines or not has_request_context() or request.method not in READ_METHODS:
+        return False
+    if g.get("_db_force_primary"):
+        return False
+    if clause is not None and getattr(clause, "is_dml", False):
+        return False
+    user = getattr(request, "user", None)
+    if user is None:
+        return False
+    if not cache.enabled:
+        return False  # stickiness lives in the cache; without it, stay on the primary
+    return cache.get(sticky_key(user.id)) is None
+
+
+def _request_replica():
+    """The replica this request reads from, picked on its first replica read."""
+    engine = g.get("_db_replica")
+    if engine is None:
+        engine = g._db_replica = router.pick()
+    return engine
+
+
+def reads_from_replica() -> bool:
+    """Whether SELECTs on primary tables in the current request go to a replica."""
+    return _replica_allowed(None)
+
+
+class RoutingSession(FlaskSession):
+    """
+    Flask-SQLAlchemy session that sends sharded tables to their shard and
+    eligible reads to a replica engine; everything else uses the primary.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if shards.enabled:
+            # per-instance connections during flush (note: disables ORM bulk INSERT, use Core tables)
+            self.connection_callable = self._flush_connection
+
+    def _flush_connection(self, mapper=None, instance=None, **kwargs):
+        bind_arguments = {"mapper": mapper}
+        if instance is not None and touches_shards(mapper):
+            bind_arguments["shard"] = shard_for_instance(instance)
+        return self.connection(bind_arguments=bind_arguments)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, shard=None, **kwargs):
+        if bind is None and shards.enabled:
+            if shard is not None:
+                return shards.engines[shard]
+            if touches_shards(mapper, clause):
+                return shards.engines[current_shard()]
+        if bind is None and not self._flushing and _replica_allowed(clause):
+            return _request_replica()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _route_to_shard(orm_context):
+    """Pin ORM statements on sharded tables to one shard and tag loaded rows with it."""
+    if not shards.enabled or "shard" in orm_context.bind_arguments:
+        return
+    if not touches_shards(orm_context.bind_mapper, orm_context.statement):
+        return
+    shard = None
+    if orm_context.is_select:
+        shard = orm_context.load_options._identity_token  # refresh of an already-tagged row
+        refresh_state = orm_context.load_options._refresh_state
+        if shard is None and refresh_state is not None and refresh_state.key is not None:
+            shard = shard_for_row_id(refresh_state.key[1][0])  # untagged row (RETURNING, cache snapshot)
+        if shard is None and orm_context.lazy_loaded_from is not None:
+            shard = shard_for_lazy_load(orm_context.lazy_loaded_from)
+    elif orm_context.is_update or orm_context.is_delete:
+        shard = orm_context.update_delete_options._identity_token
+    shard = shard or current_shard()
+    orm_context.bind_arguments["shard"] = shard
+    orm_context.update_execution_options(identity_token=shard)
+
+
+@contextmanager
+def use_primary():
+    """Route every statement of the enclosed block (in this request) to the primary."""
+    previous = g.get("_db_force_primary") if has_request_context() else None
+    if has_request_context():
+        g._db_force_primary = True
+    try:
+        yield
+    finally:
+        if has_request_context():
+            g._db_force_primary = previous
+
+
+# --------------------------- Read-your-writes ---------------------------
+_WRITERS_KEY = "replica_sticky_users"
+
+
+def mark_written(session, user_id):
+    """Make `user_id` read from the primary for a while once `session` commits."""
+    if router.engines and session is not None and user_id is not None:
+        session.info.setdefault(_WRITERS_KEY, set()).add(user_id)
+
+
+@event.listens_for(Session, "after_flush")
+def _mark_acting_user(session, flush_context):
+    # whoever issued the write (admins included) reads their own writes too
+    if router.engines and has_request_context() and getattr(request, "user", None) is not None:
+        mark_written(session, request.user.id)
+
+
+@event.listens_for(Session, "after_commit")
+def _set_sticky(session):
+    users = session.info.pop(_WRITERS_KEY, None)
+    if users:
+        for user_id in users:
+            cache.set(sticky_key(user_id), True, ttl=router.sticky_seconds)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_sticky(session):
+    session.info.pop(_WRITERS_KEY, None)
+
 
 # global db object used throughout the app
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 engine = None
 SessionLocal = None
 migrate = None
@@ -35,6 +213,17 @@ def init_app(app):
     db_uri = app.config.get("SQLALCHEMY_DATABASE_URI")
     engine = create_engine(db_uri, future=True)
 
+    # Read replicas (empty list = everything on the primary)
+    router.configure(
+        app.config.get("SQLALCHEMY_REPLICA_URIS") or [],
+        app.config.get("REPLICA_STICKY_SECONDS", 5),
+        app.config.get("SQLALCHEMY_REPLICA_ENGINE_OPTIONS"),
+    )
+
+    # Shards for transactions / categories (empty list = single database)
+    from .models.models import Transaction, Category, TransactionTag
+    init_sharding(app, [Category.__table__, Transaction.__table__, TransactionTag.__table__])
+
     # Create a scoped session factory for use outside Flask contexts (CLI, seed, etc.)
     SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine))
 
@@ -0,0 +1,68 @@
+"""
+Transaction fingerprints and duplicate detection.
+
+A fingerprint identifies "the same spend" independently of ids and free-text
+noise: a 128-bit BLAKE2b hash of
+
+    user_id | amount rounded to cents | calendar day | normalized vendor
+
+stored in the indexed `transactions.fingerprint` column (set on write by a
+flush hook in models.py; Core bulk inserts call `transaction_fingerprint()`).
+
+Two checks, neither of them pairwise:
+- exact duplicates: fingerprint equality, i.e. hash-set / dict membership, O(n);
+- near duplicates (same amount within `window_days`, different day or vendor):
+  one sort by (amount, day), then a sweep that only compares each record with
+  the following records of the same amount inside the window,
+  O(n log n + pairs reported).
+"""
+
+import hashlib
+from collections import defaultdict
+from application.merchants import normalize_vendor
+
+
+def amount_cents(amount) -> int:
+    return int(round(float(amount) * 100))
+
+
+def transaction_fingerprint(user_id, amount, date, vendor) -> str:
+    """Hex fingerprint of (user, amount in cents, day, normalized vendor); None if amount or date is missing."""
+    if amount is None or date is None:
+        return None
+    day = date.date() if hasattr(date, "date") else date
+    key = f"{user_id}|{amount_cents(amount)}|{day.isoformat()}|{normalize_vendor(vendor)}"
+    return hashlib.blake2b(key.encode(), digest_size=16).hexdigest()
+
+
+def exact_duplicate_groups(records):
+    """
+    records: iterable of (key, fingerprint). Returns [[key, key, ...], ...] for
+    every fingerprint seen more than once, keys in input order.
+    """
+    groups = defaultdict(list)
+    for key, fingerprint in records:
+        if fingerprint is not None:
+            groups[fingerprint].append(key)
+    return [keys for keys in groups.values() if len(keys) > 1]
+
+
+def near_duplicate_pairs(records, window_days: int = 3, wanted=None):
+    """
+    records: iterable of (key, amount_cents, day_ordinal, fingerprint).
+    Returns [(key_a, key_b), ...]: same amount, at most `window_days` apart,
+    different fingerprints (exact duplicates are reported separately).
+    `wanted(key_a, key_b)` optionally filters pairs (e.g. only pairs touching
+    newly imported rows).
+    """
+    ordered = sorted(records, key=lambda r: (r[1], r[2]))
+    pairs = []
+    n = len(ordered)
+    for i, (key, cents, day, fingerprint) in enumerate(ordered):
+        j = i + 1
+        while j < n and ordered[j][1] == cents and ordered[j][2] - day <= window_days:
+            other_key, _, _, other_fingerprint = ordered[j]
+            if other_fingerprint != fingerprint and (wanted is None or wanted(key, other_key)):
+                pairs.append((key, other_key))
+            j += 1
+    return pairs
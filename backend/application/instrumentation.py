@@ -0,0 +1,206 @@
+"""
+Request latency and DB query instrumentation.
+
+- per-endpoint latency histograms and status counters (Flask before/after_request)
+- SQL query count and time per request (SQLAlchemy engine events, all engines)
+- slow-query / slow-request logging with the offending statement
+- Prometheus text exposition at /metrics
+- a `Server-Timing` header so the browser devtools show app vs DB time
+
+Config keys:
+- METRICS_ENABLED   register the middleware and /metrics (default True)
+- SLOW_QUERY_MS     log statements slower than this (default 100)
+- SLOW_REQUEST_MS   log requests slower than this (default 500)
+"""
+
+import logging
+import threading
+import time
+from flask import g, request, has_request_context, Response
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("application.instrumentation")
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 250)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense (le = upper bound)."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, n in zip(list(self.buckets) + ["+Inf"], self.counts):
+            total += n
+            yield bound, total
+
+
+class MetricsRegistry:
+    """Process-local metric store. One instance per worker; scrape each worker."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.latency = {}         # (endpoint, method) -> Histogram (seconds)
+            self.queries = {}         # (endpoint, method) -> Histogram (queries per request)
+            self.requests = {}        # (endpoint, method, status) -> count
+            self.db_time = {}         # (endpoint, method) -> seconds spent in SQL
+            self.slow_queries = 0
+            self.slow_requests = 0
+
+    def observe_request(self, endpoint, method, status, seconds, query_count, query_seconds):
+        key = (endpoint, method)
+        with self._lock:
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.queries.setdefault(key, Histogram(QUERY_COUNT_BUCKETS)).observe(query_count)
+            self.requests[key + (status,)] = self.requests.get(key + (status,), 0) + 1
+            self.db_time[key] = self.db_time.get(key, 0.0) + query_seconds
+
+    def incr_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def incr_slow_request(self):
+        with self._lock:
+            self.slow_requests += 1
+
+    def render_prometheus(self) -> str:
+        lines = []
+
+        def labels(**kw):
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in kw.items()) + "}"
+
+        def histogram(name, help_text, data):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for (endpoint, method), h in sorted(data.items()):
+                for bound, total in h.cumulative():
+                    lines.append(f"{name}_bucket{labels(endpoint=endpoint, method=method, le=bound)} {total}")
+                lines.append(f"{name}_sum{labels(endpoint=endpoint, method=method)} {h.sum:.6f}")
+                lines.append(f"{name}_count{labels(endpoint=endpoint, method=method)} {h.count}")
+
+        with self._lock:
+            histogram("http_request_duration_seconds", "Request latency by endpoint.", self.latency)
+            histogram("db_queries_per_request", "SQL statements executed per request.", self.queries)
+
+            lines.append("# HELP http_requests_total Requests by endpoint and status.")
+            lines.append("# TYPE http_requests_total counter")
+            for (endpoint, method, status), n in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{labels(endpoint=endpoint, method=method, status=status)} {n}")
+
+            lines.append("# HELP db_query_duration_seconds_total Time spent in SQL by endpoint.")
+            lines.append("# TYPE db_query_duration_seconds_total counter")
+            for (endpoint, method), secs in sorted(self.db_time.items()):
+                lines.append(f"db_query_duration_seconds_total{labels(endpoint=endpoint, method=method)} {secs:.6f}")
+
+            lines.append("# HELP db_slow_queries_total Statements slower than SLOW_QUERY_MS.")
+            lines.append("# TYPE db_slow_queries_total counter")
+            lines.append(f"db_slow_queries_total {self.slow_queries}")
+            lines.append("# HELP http_slow_requests_total Requests slower than SLOW_REQUEST_MS.")
+            lines.append("# TYPE http_slow_requests_total counter")
+            lines.append(f"http_slow_requests_total {self.slow_requests}")
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+metrics = MetricsRegistry()
+_settings = {"slow_query_s": 0.1}
+
+
+# --------------------------- SQL events ---------------------------
+# Listening on the Engine class covers every engine (primary, replicas, scripts).
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("query_start")
+    if not starts:
+        return
+    elapsed = time.perf_counter() - starts.pop()
+
+    in_request = has_request_context() and hasattr(g, "_metrics_start")
+    if in_request:
+        g._sql_count += 1
+        g._sql_time += elapsed
+
+    if elapsed >= _settings["slow_query_s"]:
+        metrics.incr_slow_query()
+        # parameters are left out on purpose: they can carry password hashes / tokens
+        logger.warning(
+            "slow query %.1f ms [%s %s]: %s",
+            elapsed * 1000,
+            request.method if in_request else "-",
+            _endpoint_label() if in_request else "-",
+            " ".join(statement.split())[:2000],
+        )
+
+
+# --------------------------- Flask hooks ---------------------------
+def _endpoint_label():
+    rule = request.url_rule
+    return rule.rule if rule is not None else "unmatched"
+
+
+def init_instrumentation(app):
+    """Register request hooks and the /metrics endpoint."""
+    if not app.config.get("METRICS_ENABLED", True):
+        return app
+
+    _settings["slow_query_s"] = app.config.get("SLOW_QUERY_MS", 100) / 1000.0
+    slow_request_s = app.config.get("SLOW_REQUEST_MS", 500) / 1000.0
+
+    @app.before_request
+    def _start_timer():
+        g._metrics_start = time.perf_counter()
+        g._sql_count = 0
+        g._sql_time = 0.0
+
+    @app.after_request
+    def _record_request(response):
+        start = getattr(g, "_metrics_start", None)
+        if start is None:
+            return response
+        elapsed = time.perf_counter() - start
+        endpoint = _endpoint_label()
+        metrics.observe_request(endpoint, request.method, response.status_code, elapsed, g._sql_count, g._sql_time)
+
+        response.headers["Server-Timing"] = (
+            f'app;dur={elapsed * 1000:.1f}, db;dur={g._sql_time * 1000:.1f};desc="{g._sql_count} queries"'
+        )
+        if elapsed >= slow_request_s:
+            metrics.incr_slow_request()
+            logger.warning("slow request %.1f ms %s %s (%d queries, %.1f ms in SQL)",
+                           elapsed * 1000, request.method, endpoint, g._sql_count, g._sql_time * 1000)
+        return response
+
+    @app.route("/metrics")
+    def prometheus_metrics():
+        return Response(metrics.render_prometheus(), mimetype="text/plain; version=0.0.4")
+
+    return app
@@ -0,0 +1,326 @@
+"""
+DB-backed background job queue.
+
+Endpoints call `enqueue(...)` and answer 202 with the job id right away; a
+separate `worker.py` process claims queued rows from the `jobs` table and runs
+them on a process pool. Clients poll GET /api/jobs/<id> for status / progress.
+
+- handlers are registered per job type with @job_handler("type", concurrency=, max_attempts=)
+  and receive a JobContext (payload, progress reporting)
+- claiming is a conditional UPDATE (status 'queued' -> 'running'), so several
+  worker processes / hosts never run the same job twice; the same statement
+  enforces the per-type concurrency limit
+- a failed attempt goes back to 'queued' with exponential backoff until
+  max_attempts, then ends 'failed'
+- liveness is `updated_at`: progress() and the worker's heartbeat() bump it, and
+  requeue_stale() only takes back jobs whose heartbeat stopped. Finishing an
+  attempt is again a conditional UPDATE on (status, locked_by, attempts), so an
+  attempt that was taken back cannot overwrite the outcome of its successor
+- every finished job (succeeded or failed) writes an AuditLog row
+
+Config keys:
+- JOB_WORKER_PROCESSES   pool size of one worker.py (default 2)
+- JOB_POLL_INTERVAL      seconds between polls when idle (default 1.0)
+- JOB_RETRY_BASE_DELAY   seconds before the first retry, doubled per attempt (default 10)
+- JOB_STALE_AFTER        'running' jobs without a heartbeat for this long are requeued (default 3600)
+- JOB_CONCURRENCY        {job_type: max running jobs} overrides of the handler defaults
+"""
+
+import json
+import logging
+import traceback
+from datetime import datetime, timedelta
+from flask import current_app, has_app_context
+from sqlalchemy import update, select, func, and_
+from sqlalchemy.exc import OperationalError
+from application.database import db
+
+logger = logging.getLogger("application.jobs")
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+
+
+class JobSpec:
+    def __init__(self, name, fn, concurrency, max_attempts):
+        self.name = name
+        self.fn = fn
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+
+HANDLERS = {}
+
+
+def job_handler(name: str, concurrency: int = 1, max_attempts: int = 3):
+    """Register `fn(ctx)` as the handler for jobs of type `name`; its return value becomes job.result."""
+    def decorator(fn):
+        HANDLERS[name] = JobSpec(name, fn, concurrency, max_attempts)
+        return fn
+    return decorator
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def concurrency_limit(job_type: str) -> int:
+    overrides = _config("JOB_CONCURRENCY", {}) or {}
+    return overrides.get(job_type, HANDLERS[job_type].concurrency)
+
+
+# --------------------------- Producer side ---------------------------
+def enqueue(job_type: str, payload: dict = None, user_id: int = None,
+            max_attempts: int = None, run_after: datetime = None, commit: bool = True):
+    """Insert a queued job and return it. Raises ValueError for unknown job types."""
+    from .models.models import Job
+
+    if job_type not in HANDLERS:
+        raise ValueError(f"Unknown job type '{job_type}'")
+    job = Job(
+        type=job_type,
+        status=QUEUED,
+        user_id=user_id,
+        payload=payload or {},
+        max_attempts=max_attempts or HANDLERS[job_type].max_attempts,
+        run_after=run_after or datetime.utcnow(),
+    )
+    db.session.add(job)
+    if commit:
+        db.session.commit()
+    else:
+        db.session.flush()
+    return job
+
+
+# --------------------------- Worker side ---------------------------
+class JobContext:
+    """What a handler sees: the payload plus a way to report progress."""
+
+    def __init__(self, job):
+        self.job_id = job.id
+        self.type = job.type
+        self.user_id = job.user_id
+        self.payload = dict(job.payload or {})
+        self.attempt = job.attempts
+        self.locked_by = job.locked_by
+
+    def progress(self, fraction: float, message: str = None):
+        """
+        Record progress in [0, 1] on its own short transaction, so pollers see it mid-run.
+        Progress is advisory: if the database is locked the update is skipped, the job goes on.
+        """
+        from .models.models import Job
+
+        fraction = min(max(float(fraction), 0.0), 1.0)
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(
+                    update(Job.__table__)
+                    .where(Job.__table__.c.id == self.job_id, Job.__table__.c.status == RUNNING,
+                           Job.__table__.c.locked_by == self.locked_by, Job.__table__.c.attempts == self.attempt)
+                    .values(progress=fraction, progress_message=message[:255] if message else None,
+                            updated_at=datetime.utcnow())
+                )
+        except OperationalError:
+            logger.debug("progress update for job %s skipped (database locked)", self.job_id)
+
+
+def claim_next(worker_id: str, exclude_types=()):
+    """
+    Atomically move one runnable job to 'running' and return its id (or None).
+    The per-type concurrency limit is part of the UPDATE's WHERE clause.
+    """
+    from .models.models import Job
+
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    stmt = (
+        select(jobs.c.id, jobs.c.type)
+        .where(jobs.c.status == QUEUED, jobs.c.run_after <= now)
+        .order_by(jobs.c.run_after, jobs.c.id)
+        .limit(20)
+    )
+    for job_id, job_type in db.session.execute(stmt).all():
+        if job_type in exclude_types:
+            continue
+        if job_type not in HANDLERS:
+            logger.error("job %s has unknown type %r, skipping", job_id, job_type)
+            continue
+        running = (
+            select(func.count()).select_from(jobs)
+            .where(jobs.c.type == job_type, jobs.c.status == RUNNING)
+            .scalar_subquery()
+        )
+        claimed = db.session.execute(
+            update(jobs)
+            .where(and_(jobs.c.id == job_id, jobs.c.status == QUEUED, running < concurrency_limit(job_type)))
+            .values(status=RUNNING, locked_by=worker_id, started_at=now, updated_at=now,
+                    attempts=jobs.c.attempts + 1, progress=0.0, progress_message=None)
+        )
+        db.session.commit()
+        if claimed.rowcount == 1:
+            return job_id
+    db.session.rollback()
+    return None
+
+
+def _audit(job, status):
+    from .models.models import AuditLog
+
+    details = {"job_id": job.id, "attempts": job.attempts}
+    if status == SUCCEEDED:
+        details["result"] = job.result
+    else:
+        details["error"] = job.error.strip().splitlines()[-1] if job.error else None
+    db.session.add(AuditLog(actor_id=job.user_id, action=f"job.{job.type}.{status}",
+                            details=json.dumps(details, default=str)))
+
+
+def run_job(job_id: int):
+    """Execute a claimed job inside the current app context and record the outcome."""
+    from .models.models import Job
+
+    job = db.session.get(Job, job_id)
+    if job is None or job.status != RUNNING:
+        return None
+    spec = HANDLERS[job.type]
+    ctx = JobContext(job)
+    db.session.commit()  # release the read before the handler starts its own work
+
+    try:
+        result = spec.fn(ctx)
+    except Exception:
+        db.session.rollback()
+        error = traceback.format_exc()
+        logger.exception("job %s (%s) attempt %s failed", job_id, ctx.type, ctx.attempt)
+        return _record_failure(job_id, error, locked_by=ctx.locked_by, attempts=ctx.attempt)
+
+    jobs = Job.__table__
+    now = datetime.utcnow()
+    finished = db.session.execute(
+        update(jobs)
+        .where(jobs.c.id == job_id, jobs.c.status == RUNNING,
+               jobs.c.locked_by == ctx.locked_by, jobs.c.attempts == ctx.attempt)
+        .values(status=SUCCEEDED, result=result, error=None, progress=1.0,
+                finished_at=now, updated_at=now, locked_by=None)
+    )
+    if finished.rowcount != 1:
+        db.session.rollback()
+        logger.warning("job %s attempt %s was taken back while running; its result is discarded",
+                       job_id, ctx.attempt)
+        return None
+    job = db.session.get(Job, job_id, populate_existing=True)
+    _audit(job, SUCCEEDED)
+    db.session.commit()
+    return SUCCEEDED
+
+
+def _record_failure(job_id: int, error: str, locked_by=None, attempts=None, stale_before=None):
+    """
+    End a running attempt: back to 'queued' with backoff, or 'failed' when out of
+    attempts. Conditional on the job still being that attempt (and, for stale
+    jobs, still without a heartbeat since `stale_before`); returns None otherwise.
+    """
+    from .models.models import Job
+
+    jobs = Job.__table__
+    job = db.session.get(Job, job_id, populate_existing=True)
+    if job is None or job.status != RUNNING:
+        db.session.rollback()
+        return None
+    now = datetime.utcnow()
+    values = {"error": error[-4000:], "locked_by": None, "updated_at": now}
+    if job.attempts < job.max_attempts:
+        delay = _config("JOB_RETRY_BASE_DELAY", 10) * 2 ** (job.attempts - 1)
+        values.update(status=QUEUED, run_after=now + timedelta(seconds=delay))
+    else:
+        values.update(status=FAILED, finished_at=now)
+    conditions = [jobs.c.id == job_id, jobs.c.status == RUNNING,
+                  jobs.c.locked_by == (job.locked_by if locked_by is None else locked_by),
+                  jobs.c.attempts == (job.attempts if attempts is None else attempts)]
+    if stale_before is not None:
+        conditions.append(jobs.c.updated_at < stale_before)
+    if db.session.execute(update(jobs).where(*conditions).values(**values)).rowcount != 1:
+        db.session.rollback()
+        return None
+    if values["status"] == FAILED:
+        _audit(db.session.get(Job, job_id, populate_existing=True), FAILED)
+    db.session.commit()
+    return values["status"]
+
+
+def heartbeat(job_ids, worker_id: str):
+    """Mark jobs this worker is still running as alive (handlers that never call progress())."""
+    from .models.models import Job
+
+    if not job_ids:
+        return 0
+    jobs = Job.__table__
+    alive = db.session.execute(
+        update(jobs)
+        .where(jobs.c.id.in_(list(job_ids)), jobs.c.status == RUNNING, jobs.c.locked_by == worker_id)
+        .values(updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+    return alive.rowcount
+
+
+def requeue_stale(max_age_seconds: float):
+    """
+    Jobs in 'running' without a heartbeat for `max_age_seconds` (worker killed
+    mid-job) go back to the queue, or fail when out of attempts.
+    """
+    from .models.models import Job
+
+    cutoff = datetime.utcnow() - timedelta(seconds=max_age_seconds)
+    stale = db.session.execute(
+        select(Job.id, Job.locked_by).where(Job.status == RUNNING, Job.updated_at < cutoff)
+    ).all()
+    requeued = 0
+    for job_id, locked_by in stale:
+        error = f"worker {locked_by} sent no heartbeat for {max_age_seconds:.0f}s"
+        requeued += _record_failure(job_id, error, stale_before=cutoff) is not None
+    return requeued
+
+
+def record_crash(job_id: int, error: str, locked_by: str = None):
+    """Used by the worker when a pool process dies while running `job_id`."""
+    return _record_failure(job_id, error, locked_by=locked_by)
+
+
+def enqueue_if_due(job_type: str, every_seconds: float, payload: dict = None):
+    """
+    Periodic housekeeping: enqueue `job_type` unless one was created within the
+    last `every_seconds`. Returns the new job or None.
+    """
+    from .models.models import Job
+
+    since = datetime.utcnow() - timedelta(seconds=every_seconds)
+    recent = db.session.scalar(
+        select(func.count()).select_from(Job.__table__)
+        .where(Job.__table__.c.type == job_type, Job.__table__.c.created_at >= since)
+    )
+    if recent:
+        db.session.rollback()
+        return None
+    return enqueue(job_type, payload)
+
+
+def cancel(job) -> bool:
+    """Cancel a job that has not started yet; running jobs are left to finish."""
+    from .models.models import Job
+
+    cancelled = db.session.execute(
+        update(Job.__table__)
+        .where(Job.__table__.c.id == job.id, Job.__table__.c.status == QUEUED)
+        .values(status=CANCELLED, finished_at=datetime.utcnow(), updated_at=datetime.utcnow())
+    )
+    db.session.commit()
+    db.session.expire(job)
+    return cancelled.rowcount == 1
+
+
+def init_jobs(app):
+    """Load the handler registry so enqueue() can validate job types in the web process too."""
+    from . import tasks  # noqa: F401  (registers handlers)
+    return HANDLERS
@@ -0,0 +1,253 @@
+"""
+Merchant dictionary: maps free-text vendors to canonical merchants.
+
+Vendors are normalized (lower case, punctuation -> spaces, whitespace
+collapsed) and matched against the normalized alias patterns of the
+`merchant_aliases` table with a compiled character trie:
+
+    "AMAZON PAY*123"  -> "amazon pay 123"  -> alias "amazon pay" -> Amazon
+    "amzn mktp"       -> "amzn mktp"       -> alias "amzn"       -> Amazon
+    "POS UBER TRIP"   -> "pos uber trip"   -> alias "uber"       -> Uber
+
+Matching starts at every word boundary, left to right; the first position
+with a hit wins and, at that position, the longest alias that ends on a word
+boundary. Results are memoized per raw vendor string, so a bulk import of
+repeating vendors costs one dict lookup per row.
+
+Transaction inserts / vendor updates get `merchant_id` from a before-flush
+hook in models.py; Core bulk inserts call `resolve_merchant_id()` /
+`resolve_merchant_ids()` themselves. After a dictionary change the
+`normalize_vendors` job re-resolves existing rows.
+
+The matcher is built once per process and rebuilt when the dictionary
+changes: right after the commit in the process that changed it, and within
+MERCHANT_RELOAD_SECONDS in the others (a cheap count / max(updated_at) probe).
+
+Config keys:
+- MERCHANT_RELOAD_SECONDS   how often other processes probe for dictionary changes (default 60)
+- MERCHANT_MEMO_SIZE        memoized vendor strings per process (default 100000)
+"""
+
+import logging
+import string
+import threading
+import time
+from sqlalchemy import event, select, func
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("application.merchants")
+
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation})
+_END = None  # trie key marking "an alias ends here"; never a character
+
+# initial dictionary, loaded by seed_default_merchants() (seed.py)
+DEFAULT_MERCHANTS = {
+    "Amazon": ["amazon", "amzn", "amazon pay", "amazon in"],
+    "Flipkart": ["flipkart", "fkrt"],
+    "Myntra": ["myntra"],
+    "Ajio": ["ajio"],
+    "Decathlon": ["decathlon"],
+    "BigBasket": ["bigbasket", "big basket", "bb now"],
+    "DMart": ["dmart", "d mart", "avenue supermarts"],
+    "Reliance Fresh": ["reliance fresh", "reliance retail"],
+    "Blinkit": ["blinkit", "grofers"],
+    "Zepto": ["zepto", "kiranakart"],
+    "Swiggy": ["swiggy", "instamart"],
+    "Zomato": ["zomato"],
+    "Dominos": ["dominos", "domino s", "jubilant foodworks"],
+    "Starbucks": ["starbucks", "tata starbucks"],
+    "Uber": ["uber", "uber india"],
+    "Ola": ["ola", "olacabs", "ani technologies"],
+    "Rapido": ["rapido", "roppen"],
+    "IRCTC": ["irctc"],
+    "IndiGo": ["indigo", "interglobe aviation"],
+    "Airtel": ["airtel", "bharti airtel"],
+    "Jio": ["jio", "reliance jio"],
+    "BESCOM": ["bescom"],
+    "Tata Power": ["tata power"],
+    "ACT Fibernet": ["act fibernet", "atria convergence"],
+    "Netflix": ["netflix"],
+    "Spotify": ["spotify"],
+    "BookMyShow": ["bookmyshow", "bigtree entertainment"],
+    "PVR": ["pvr", "pvr inox"],
+    "Steam": ["steam", "steampowered", "valve"],
+    "Apollo Pharmacy": ["apollo pharmacy", "apollo"],
+    "1mg": ["1mg", "tata 1mg"],
+    "Practo": ["practo"],
+    "Cult.fit": ["cult fit", "cultfit", "curefit"],
+}
+
+
+def normalize_vendor(text) -> str:
+    """Lower case, punctuation to spaces, whitespace collapsed: the form aliases are stored and matched in."""
+    if not text:
+        return ""
+    return " ".join(text.lower().translate(_PUNCTUATION).split())
+
+
+class MerchantMatcher:
+    """Immutable compiled trie over (normalized pattern -> merchant id)."""
+
+    def __init__(self, aliases, memo_size: int = 100_000):
+        self._root = {}
+        for pattern, merchant_id in aliases:
+            node = self._root
+            for ch in normalize_vendor(pattern):
+                node = node.setdefault(ch, {})
+            node[_END] = merchant_id
+        self._memo = {}
+        self._memo_size = memo_size
+        self.size = len(aliases)
+
+    def _scan(self, text):
+        root, n, start = self._root, len(text), 0
+        while start < n:
+            node, best, i = root, None, start
+            while i < n:
+                node = node.get(text[i])
+                if node is None:
+                    break
+                i += 1
+                if _END in node and (i == n or text[i] == " "):
+                    best = node[_END]
+            if best is not None:
+                return best
+            start = text.find(" ", start) + 1
+            if start == 0:
+                return None
+        return None
+
+    def match(self, vendor):
+        """Merchant id for a raw vendor string, or None."""
+        if not vendor:
+            return None
+        try:
+            return self._memo[vendor]
+        except KeyError:
+            pass
+        merchant_id = self._scan(normalize_vendor(vendor))
+        if len(self._memo) < self._memo_size:
+            self._memo[vendor] = merchant_id
+        return merchant_id
+
+
+class _Dictionary:
+    """Per-process holder of the current matcher; reloads when the alias table changes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.engine = None
+        self.reload_seconds = 60
+        self.memo_size = 100_000
+        self.matcher = None
+        self._signature = None
+        self._checked_at = 0.0
+
+    def configure(self, engine, reload_seconds=60, memo_size=100_000):
+        self.engine = engine
+        self.reload_seconds = reload_seconds
+        self.memo_size = memo_size
+        self.invalidate()
+
+    def invalidate(self):
+        """Rebuild on next use (call after changing merchants / aliases in this process)."""
+        self.matcher = None
+        self._checked_at = 0.0
+
+    def _probe(self, conn):
+        from .models.models import MerchantAlias
+
+        aliases = MerchantAlias.__table__
+        return tuple(conn.execute(select(func.count(), func.max(aliases.c.updated_at))).one())
+
+    def current(self):
+        if self.engine is None:
+            return None
+        now = time.monotonic()
+        if self.matcher is not None and now - self._checked_at < self.reload_seconds:
+            return self.matcher
+        with self._lock:
+            if self.matcher is not None and now - self._checked_at < self.reload_seconds:
+                return self.matcher
+            from .models.models import MerchantAlias
+
+            aliases = MerchantAlias.__table__
+            # own connection: this may run inside a flush of the caller's session
+            with self.engine.connect() as conn:
+                signature = self._probe(conn)
+                if self.matcher is None or signature != self._signature:
+                    rows = conn.execute(select(aliases.c.pattern, aliases.c.merchant_id)).all()
+                    self.matcher = MerchantMatcher(rows, self.memo_size)
+                    self._signature = signature
+                    logger.info("merchant matcher built from %d aliases", len(rows))
+            self._checked_at = now
+            return self.matcher
+
+
+dictionary = _Dictionary()
+
+_CHANGED_KEY = "merchant_dictionary_changed"
+
+
+def mark_changed(session):
+    """Called from the MerchantAlias flush hooks (models.py); the matcher is rebuilt after commit."""
+    if session is not None:
+        session.info[_CHANGED_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session):
+    if session.info.pop(_CHANGED_KEY, False):
+        dictionary.invalidate()
+
+
+@event.listens_for(Session, "after_rollback")
+def _forget_changes(session):
+    session.info.pop(_CHANGED_KEY, None)
+
+
+def resolve_merchant_id(vendor):
+    matcher = dictionary.current()
+    return matcher.match(vendor) if matcher is not None else None
+
+
+def resolve_merchant_ids(vendors):
+    """Bulk form for Core inserts: one matcher lookup for the whole batch."""
+    matcher = dictionary.current()
+    if matcher is None:
+        return [None] * len(vendors)
+    return [matcher.match(v) for v in vendors]
+
+
+def add_merchant(session, name, aliases):
+    """Create a merchant with its alias patterns (normalized); the matcher is rebuilt once the caller commits."""
+    from .models.models import Merchant, MerchantAlias
+
+    merchant = Merchant(name=name)
+    merchant.aliases = [MerchantAlias(pattern=p) for p in dict.fromkeys(map(normalize_vendor, aliases)) if p]
+    session.add(merchant)
+    return merchant
+
+
+def seed_default_merchants(session):
+    """Load DEFAULT_MERCHANTS, skipping merchants that already exist. Returns the number added."""
+    from .models.models import Merchant
+
+    existing = set(session.scalars(select(Merchant.name)))
+    added = [add_merchant(session, name, aliases)
+             for name, aliases in DEFAULT_MERCHANTS.items() if name not in existing]
+    session.flush()
+    return len(added)
+
+
+def init_merchants(app):
+    from .database import db
+
+    with app.app_context():
+        engine = db.engine
+    dictionary.configure(
+        engine,
+        reload_seconds=app.config.get("MERCHANT_RELOAD_SECONDS", 60),
+        memo_size=app.config.get("MERCHANT_MEMO_SIZE", 100_000),
+    )
+    return dictionary
@@ -4,12 +4,52 @@ Shared between APIs and CLI scripts.
 """
 
 from datetime import datetime
+from sqlalchemy import inspect, insert, select, update, func, literal
 from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import make_transient_to_detached
 from application.database import db
-from backend.application.models.models import User, Transaction, Category
+from application.cache import cache, user_key, category_key
+from application.sharding import shards, use_shard, for_each_shard, SHARD_ID_RANGE
+from .models import User, Transaction, Category
+
+
+# --------------------------- Cache Helpers ---------------------------
+def _detached_copy(obj):
+    """
+    Column-only copy of a persistent instance, safe to keep in the cache.
+    Relationships are left unloaded and lazy-load once re-attached.
+    """
+    mapper = inspect(obj).mapper
+    copy = mapper.class_(**{attr.key: getattr(obj, attr.key) for attr in mapper.column_attrs})
+    make_transient_to_detached(copy)
+    return copy
+
+
+def _attach(snapshot):
+    """Re-attach a cached snapshot to the current session without a SELECT."""
+    return db.session.merge(snapshot, load=False) if snapshot is not None else None
 
 
 # --------------------------- User Helpers ---------------------------
+def get_user(user_id: int):
+    """
+    Return a user by id, served from the cache when possible (used by every auth check).
+    `user:` keys skip every per-process tier (CACHE_LOCAL_EXCLUDE), the "memory" shared
+    stand-in included: a revocation or deactivation written by another worker must be
+    seen on the next request.
+    """
+    if user_id is None:
+        return None
+
+    def load():
+        user = db.session.get(User, user_id)
+        return _detached_copy(user) if user else None
+
+    return _attach(cache.get_or_load(user_key(user_id), load))
+
+
 def get_user_by_email(email: str):
     return User.query.filter_by(email=email).first()
 
@@ -27,19 +67,179 @@ def create_user(name: str, email: str, password: str, role: str = "user", curren
         raise RuntimeError(f"Error creating user: {e}")
 
 
+def user_transaction_stats(user_ids):
+    """
+    {user_id: {"transaction_count", "total_amount", "last_transaction_at"}} for
+    a page of users, from one grouped query (one per shard when sharded).
+    Users without transactions are absent from the result.
+    """
+    if not user_ids:
+        return {}
+    stmt = (
+        select(Transaction.user_id, func.count(Transaction.id), func.sum(Transaction.amount), func.max(Transaction.date))
+        .where(Transaction.user_id.in_(user_ids), Transaction.is_deleted.is_(False))
+        .group_by(Transaction.user_id)
+    )
+    stats = {}
+    for rows in for_each_shard(lambda session: session.execute(stmt).all()):
+        for user_id, count, total, last in rows:
+            stats[user_id] = {
+                "transaction_count": count,
+                "total_amount": float(total or 0),
+                "last_transaction_at": last.isoformat() if last else None,
+            }
+    return stats
+
+
 # --------------------------- Category Helpers ---------------------------
+_UPSERT_INSERTS = {"sqlite": sqlite_insert, "postgresql": pg_insert}
+
+
+def get_or_create_categories(names, user_id: int = None, color: str = None, commit: bool = True):
+    """
+    Resolve a batch of category names for one owner, creating the missing ones.
+    Returns {name: Category}. With sharding on, per-user categories live on the
+    owner's shard and global ones are replicated to every shard.
+    """
+    if shards.enabled and user_id is None:
+        return _get_or_create_global_categories_sharded(names, color, commit)
+    with use_shard(user_id):
+        return _get_or_create_categories(names, user_id, color, commit)
+
+
+def _get_or_create_categories(names, user_id: int = None, color: str = None, commit: bool = True):
+    """
+    Cache misses are resolved with a single `INSERT ... ON CONFLICT DO NOTHING
+    RETURNING` against ix_category_user_name, so concurrent importers cannot
+    race each other into an IntegrityError. Names that already existed (the
+    conflicting rows, which RETURNING skips) are fetched with one follow-up
+    SELECT ... IN. Used by bulk import and ML categorization.
+
+    Global categories (user_id NULL) cannot use the upsert path: NULLs never
+    conflict in a unique index, so those fall back to select-then-insert.
+    """
+    wanted = list(dict.fromkeys(n for n in names if n))
+    found = {}
+    for name in wanted:
+        cached = cache.get(category_key(user_id, name))
+        if cached is not None:
+            found[name] = _attach(cached)
+    missing = [n for n in wanted if n not in found]
+    if not missing:
+        return found
+
+    dialect = db.session.get_bind(mapper=inspect(Category)).dialect.name
+    try:
+        if user_id is not None and dialect in _UPSERT_INSERTS:
+            now = datetime.utcnow()
+            stmt = (
+                _UPSERT_INSERTS[dialect](Category)
+                .values([
+                    {"name": n, "user_id": user_id, "color": color, "created_at": now, "updated_at": now}
+                    for n in missing
+                ])
+                .on_conflict_do_nothing(index_elements=["user_id", "name"])
+                .returning(Category)
+            )
+            for cat in db.session.scalars(stmt):
+                found[cat.name] = cat
+        else:
+            for cat in Category.query.filter(Category.user_id == user_id, Category.name.in_(missing)):
+                found[cat.name] = cat
+            new_cats = [Category(name=n, user_id=user_id, color=color) for n in missing if n not in found]
+            db.session.add_all(new_cats)
+            db.session.flush()
+            found.update((c.name, c) for c in new_cats)
+
+        conflicted = [n for n in missing if n not in found]
+        if conflicted:
+            for cat in Category.query.filter(Category.user_id == user_id, Category.name.in_(conflicted)):
+                found[cat.name] = cat
+
+        # snapshot before commit expires the instances (avoids one refresh SELECT per row)
+        snapshots = {name: _detached_copy(found[name]) for name in missing}
+        if commit:
+            db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise RuntimeError(f"Error resolving categories: {e}")
+
+    for name, snapshot in snapshots.items():
+        cache.set(category_key(user_id, name), snapshot)
+    return found
+
+
+def insert_global_categories(rows):
+    """
+    Sharded mode: create global category rows ({"name", "color", ...}) on every
+    shard under the same ids, taken below SHARD_ID_RANGE. Returns their ids, in
+    `rows` order (the existing id for a name that is already there).
+
+    shard0 allocates: each row is a single INSERT ... SELECT max(id) + 1 that is
+    skipped when the name exists, so it runs under SQLite's write lock and two
+    concurrent creators can neither pick the same id nor duplicate a name. Once
+    shard0 committed, its rows are copied to the other shards with INSERT OR
+    IGNORE keyed on the id, which also completes a copy an earlier run left
+    unfinished. Every shard commits on its own, outside the caller's session.
+    """
+    cats = Category.__table__
+    now = datetime.utcnow()
+    next_id = (select(func.coalesce(func.max(cats.c.id), 0) + 1)
+               .where(cats.c.id < SHARD_ID_RANGE).scalar_subquery())
+    names = []
+    with shards.engines[shards.names[0]].begin() as conn:
+        for row in rows:
+            values = {"created_at": now, "updated_at": now, **row, "user_id": None}
+            values.pop("id", None)
+            names.append(values["name"])
+            taken = select(cats.c.id).where(cats.c.user_id.is_(None), cats.c.name == values["name"]).exists()
+            conn.execute(insert(cats).from_select(
+                ["id", *values],
+                select(next_id, *(literal(v, cats.c[k].type) for k, v in values.items())).where(~taken),
+            ))
+        created = conn.execute(select(cats).where(cats.c.user_id.is_(None), cats.c.name.in_(names))).mappings().all()
+    for name in shards.names[1:]:
+        with shards.engines[name].begin() as conn:
+            conn.execute(sqlite_insert(cats).on_conflict_do_nothing(), [dict(r) for r in created])
+    ids = {r["name"]: r["id"] for r in created}
+    return [ids[name] for name in names]
+
+
+def _get_or_create_global_categories_sharded(names, color=None, commit=True):
+    wanted = list(dict.fromkeys(n for n in names if n))
+    try:
+        # also for names shard0 already has: completes copies an interrupted run left out
+        insert_global_categories([{"name": n, "color": color} for n in wanted])
+        with use_shard(name=shards.names[0]):
+            found = {c.name: c for c in Category.query.filter(Category.user_id.is_(None), Category.name.in_(wanted))}
+            if commit:
+                db.session.commit()
+    except SQLAlchemyError as e:
+        db.session.rollback()
+        raise RuntimeError(f"Error resolving categories: {e}")
+    return found
+
+
 def get_or_create_category(name: str, user_id: int = None, color: str = None):
     """Return an existing category or create it."""
-    cat = Category.query.filter_by(name=name, user_id=user_id).first()
-    if cat:
-        return cat
-    cat = Category(name=name, user_id=user_id, color=color)
-    db.session.add(cat)
-    db.session.commit()
-    return cat
+    if not isinstance(name, str) or not name:
+        raise ValueError("category name must be a non-empty string")
+    return get_or_create_categories([name], user_id=user_id, color=color)[name]
 
 
 # --------------------------- Transaction Helpers ---------------------------
+def bump_data_versions(user_ids):
+    """Core writes to transactions skip the ORM hooks: bump the owners' ETag versions by hand."""
+    if not user_ids:
+        return
+    users = User.__table__
+    db.session.execute(update(users).where(users.c.id.in_(user_ids))
+                       .values(data_version=users.c.data_version + 1, updated_at=users.c.updated_at))
+    db.session.commit()
+    for user_id in user_ids:
+        cache.delete(user_key(user_id))
+
+
 def add_transaction(user_id: int, amount: float, note: str = "", category_id: int = None,
                     vendor: str = None, date: datetime = None, is_recurring: bool = False,
                     recurrence_rule: str = None, metadata: dict = None):
@@ -54,7 +254,7 @@ def add_transaction(user_id: int, amount: float, note: str = "", category_id: in
             date=date or datetime.utcnow(),
             is_recurring=is_recurring,
             recurrence_rule=recurrence_rule,
-            metadata=metadata,
+            meta_data=metadata,
         )
         db.session.add(txn)
         db.session.commit()
@@ -73,12 +273,16 @@ def get_user_transactions(user_id: int, start_date=None, end_date=None, include_
         query = query.filter(Transaction.date >= start_date)
     if end_date:
         query = query.filter(Transaction.date <= end_date)
-    return query.order_by(Transaction.date.desc()).all()
+    with use_shard(user_id):
+        return query.order_by(Transaction.date.desc()).all()
 
 
 def delete_transaction(txn_id: int, soft_delete=True):
     """Soft-delete or permanently delete a transaction."""
-    txn = Transaction.query.get(txn_id)
+    if shards.enabled and shards.name_for_id(txn_id) is None:
+        return None
+    with use_shard(row_id=txn_id):
+        txn = Transaction.query.get(txn_id)
     if not txn:
         return None
     try:
@@ -7,18 +7,31 @@ initializes it before use.
 Models:
 - User
 - Category
+- Merchant / MerchantAlias (canonical vendors, see application/merchants.py)
 - Transaction
+- TransactionTag (indexed copy of meta_data["tags"], see application/tags.py)
+- Receipt (files attached to transactions, see application/storage.py)
 - MLModel (metadata for saved ML pipelines)
 - AuditLog (simple audit trail; optional)
-- RefreshToken (if you want to implement refresh tokens later)
+- RefreshToken (rotating refresh tokens grouped in families)
+- Job (background job queue, see application/jobs.py)
 """
 
 from datetime import datetime, timedelta
 from typing import Optional
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import object_session
 from sqlalchemy.dialects.sqlite import JSON as JSONType  # falls back to TEXT if not available
 from werkzeug.security import generate_password_hash, check_password_hash
-from application.database import db
+from application.database import db, mark_written
+from application.sharding import shards
+from application.cache import cache, invalidate_on_commit, user_key, category_key
+from application.passwords import hash_password, verify_password, needs_rehash, schedule_rehash
+from application.realtime import publish_on_commit, transaction_delta
+from application.merchants import resolve_merchant_id, mark_changed as mark_merchants_changed
+from application.dedup import transaction_fingerprint
+from application.tags import tag_rows
 import secrets
 
 # small helpers / mixins -----------------------------------------------------
@@ -38,6 +51,21 @@ class SoftDeleteMixin:
     deleted_at = db.Column(db.DateTime, nullable=True)
 
 
+def _rehash_writer(engine, user_id, old_hash):
+    """Callback storing an upgraded hash; runs on a KDF worker thread, outside any session."""
+    def store(new_hash):
+        users = User.__table__
+        with engine.begin() as conn:
+            # compare-and-swap: don't clobber a password changed meanwhile
+            conn.execute(
+                users.update()
+                .where(users.c.id == user_id, users.c.password_hash == old_hash)
+                .values(password_hash=new_hash, updated_at=users.c.updated_at)
+            )
+        cache.delete(user_key(user_id))
+    return store
+
+
 # models --------------------------------------------------------------------
 class User(db.Model, TimestampMixin):
     __tablename__ = "users"
@@ -51,6 +79,10 @@ class User(db.Model, TimestampMixin):
     role = db.Column(db.String(32), default="user", nullable=False, index=True)
     # prefer country/currency prefs later
     currency = db.Column(db.String(8), default="INR", nullable=False)
+    # bumped on every write to the user's transactions; feeds ETags for list/summary endpoints
+    data_version = db.Column(db.Integer, default=0, server_default="0", nullable=False)
+    # embedded in every JWT ("gen"); bumping it revokes all outstanding tokens at once
+    token_generation = db.Column(db.Integer, default=0, server_default="0", nullable=False)
 
     # relationships
     transactions = db.relationship(
@@ -62,11 +94,18 @@ class User(db.Model, TimestampMixin):
     ml_models = db.relationship("MLModel", back_populates="owner", lazy="dynamic")
 
     def set_password(self, password: str) -> None:
-        """Store a salted password hash."""
-        self.password_hash = generate_password_hash(password)
+        """Store a salted password hash (cost from PASSWORD_HASH_METHOD)."""
+        self.password_hash = hash_password(password)
 
     def check_password(self, password: str) -> bool:
-        return check_password_hash(self.password_hash, password)
+        """
+        Verify on the KDF pool. Hashes made with outdated parameters are
+        upgraded in the background after a successful check.
+        """
+        ok = verify_password(self.password_hash, password)
+        if ok and needs_rehash(self.password_hash):
+            schedule_rehash(password, _rehash_writer(db.engine, self.id, self.password_hash))
+        return ok
 
     def to_dict(self, public: bool = True):
         data = {
@@ -119,11 +158,57 @@ class Category(db.Model, TimestampMixin):
         return f"<Category id={self.id} name={self.name} owner={owner}>"
 
 
+class Merchant(db.Model, TimestampMixin):
+    """
+    Canonical merchant. Free-text vendors are mapped to one on write through
+    its aliases (see application/merchants.py), so "AMAZON PAY*123" and
+    "amzn mktp" group and filter as the same merchant.
+    """
+    __tablename__ = "merchants"
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(120), nullable=False, unique=True)
+
+    aliases = db.relationship("MerchantAlias", back_populates="merchant", cascade="all, delete-orphan",
+                              order_by="MerchantAlias.pattern")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "aliases": [a.pattern for a in self.aliases],
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f"<Merchant id={self.id} name={self.name}>"
+
+
+class MerchantAlias(db.Model, TimestampMixin):
+    """A normalized vendor prefix ("amazon pay", "amzn") that identifies a merchant."""
+    __tablename__ = "merchant_aliases"
+
+    id = db.Column(db.Integer, primary_key=True)
+    merchant_id = db.Column(db.Integer, db.ForeignKey("merchants.id"), nullable=False, index=True)
+    pattern = db.Column(db.String(120), nullable=False, unique=True)
+
+    merchant = db.relationship("Merchant", back_populates="aliases")
+
+    def __repr__(self):
+        return f"<MerchantAlias {self.pattern!r} -> {self.merchant_id}>"
+
+
 class Transaction(db.Model, TimestampMixin, SoftDeleteMixin):
     __tablename__ = "transactions"
     __table_args__ = (
         db.Index("ix_txn_user_date", "user_id", "date"),
         db.Index("ix_txn_user_category", "user_id", "category_id"),
+        # keyset scans for /api/transactions/changes
+        db.Index("ix_txn_user_updated", "user_id", "updated_at", "id"),
+        # per-user merchant filters / aggregation
+        db.Index("ix_txn_user_merchant", "user_id", "merchant_id"),
+        # exact-duplicate lookups on import (application/dedup.py)
+        db.Index("ix_txn_user_fingerprint", "user_id", "fingerprint"),
     )
 
     id = db.Column(db.Integer, primary_key=True)
@@ -134,6 +219,8 @@ class Transaction(db.Model, TimestampMixin, SoftDeleteMixin):
     category_id = db.Column(db.Integer, db.ForeignKey("categories.id"), nullable=True, index=True)
     note = db.Column(db.String(512), nullable=True)
     vendor = db.Column(db.String(255), nullable=True)
+    # canonical merchant resolved from `vendor` on write; null when no alias matches
+    merchant_id = db.Column(db.Integer, db.ForeignKey("merchants.id"), nullable=True, index=True)
     # date of the transaction (user-specified). Keep timezone naive UTC assumption for now.
     date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     is_recurring = db.Column(db.Boolean, default=False, nullable=False, index=True)
@@ -141,6 +228,8 @@ class Transaction(db.Model, TimestampMixin, SoftDeleteMixin):
     recurrence_rule = db.Column(db.String(255), nullable=True)
     # any extra metadata (tags, raw parsed ML suggestions, source="web"|"cli")
     meta_data = db.Column(JSONType, nullable=True)
+    # hash of (user, amount, day, normalized vendor), set on write; see application/dedup.py
+    fingerprint = db.Column(db.String(32), nullable=True)
 
     # relationships
     user = db.relationship("User", back_populates="transactions")
@@ -156,6 +245,7 @@ class Transaction(db.Model, TimestampMixin, SoftDeleteMixin):
             "category": self.category.name if self.category else None,
             "note": self.note,
             "vendor": self.vendor,
+            "merchant_id": self.merchant_id,
             "date": self.date.isoformat() if self.date else None,
             "is_recurring": self.is_recurring,
             "recurrence_rule": self.recurrence_rule,
@@ -172,6 +262,154 @@ class Transaction(db.Model, TimestampMixin, SoftDeleteMixin):
         return f"<Transaction id={self.id} user={self.user_id} amount={self.amount} date={self.date.date()}>"
 
 
+class TransactionTag(db.Model):
+    """
+    One row per (transaction, tag), mirrored from meta_data["tags"] on write
+    (see application/tags.py). Lives next to its transaction when sharded.
+    """
+    __tablename__ = "transaction_tags"
+    __table_args__ = (
+        db.UniqueConstraint("transaction_id", "tag", name="uq_transaction_tag"),
+        # tag= filter and tag totals for one user: index-only scans
+        db.Index("ix_txn_tags_user_tag", "user_id", "tag", "transaction_id"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    transaction_id = db.Column(db.Integer, db.ForeignKey("transactions.id"), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    tag = db.Column(db.String(64), nullable=False)
+
+
+@event.listens_for(MerchantAlias, "after_insert")
+@event.listens_for(MerchantAlias, "after_update")
+@event.listens_for(MerchantAlias, "after_delete")
+def _merchant_dictionary_changed(mapper, connection, target):
+    mark_merchants_changed(object_session(target))
+
+
+@event.listens_for(Transaction, "before_insert")
+@event.listens_for(Transaction, "before_update")
+def _resolve_merchant(mapper, connection, target):
+    """Map a new / changed vendor to its canonical merchant, unless the caller set merchant_id itself."""
+    state = inspect(target)
+    if state.attrs.vendor.history.has_changes() and not state.attrs.merchant_id.history.has_changes():
+        target.merchant_id = resolve_merchant_id(target.vendor)
+
+
+@event.listens_for(Transaction, "before_insert")
+@event.listens_for(Transaction, "before_update")
+def _set_fingerprint(mapper, connection, target):
+    state = inspect(target)
+    if state.key is None or any(state.attrs[name].history.has_changes()
+                                for name in ("user_id", "amount", "date", "vendor")):
+        target.fingerprint = transaction_fingerprint(target.user_id, target.amount, target.date, target.vendor)
+
+
+def _sync_tags(op):
+    """Rewrite the transaction's tag rows in the same flush (and, when sharded, on the same shard)."""
+    def listener(mapper, connection, target):
+        tags = TransactionTag.__table__
+        if op == "updated":
+            state = inspect(target)
+            if not (state.attrs.meta_data.history.has_changes() or state.attrs.user_id.history.has_changes()):
+                return
+        if op != "created":
+            connection.execute(tags.delete().where(tags.c.transaction_id == target.id))
+        if op != "deleted":
+            rows = tag_rows(target.id, target.user_id, target.meta_data)
+            if rows:
+                connection.execute(tags.insert(), rows)
+    return listener
+
+
+# tag rows go before their transaction: they reference it
+for _event_name, _op in (("after_insert", "created"), ("after_update", "updated"), ("before_delete", "deleted")):
+    event.listen(Transaction, _event_name, _sync_tags(_op))
+
+
+@event.listens_for(Transaction, "after_insert")
+@event.listens_for(Transaction, "after_update")
+@event.listens_for(Transaction, "after_delete")
+def _bump_user_data_version(mapper, connection, target):
+    """
+    Bump the owner's data_version inside the same flush, so any write path
+    (API, model_utils, CLI) invalidates cached ETags for that user.
+    """
+    users = User.__table__
+    if shards.enabled:
+        # this flush connection points at the transaction's shard; users live on the primary
+        connection = object_session(target).connection(bind_arguments={"mapper": User})
+    connection.execute(
+        users.update()
+        .where(users.c.id == target.user_id)
+        # keep updated_at untouched: it describes the profile, not the user's transactions
+        .values(data_version=users.c.data_version + 1, updated_at=users.c.updated_at)
+    )
+    invalidate_on_commit(object_session(target), user_key(target.user_id))
+    # the owner must read this change back even when someone else (admin, job) made it
+    mark_written(object_session(target), target.user_id)
+
+
+def _publish_transaction_change(op):
+    """Queue a small delta for the owner's sockets; sent by application/realtime.py after commit."""
+    def listener(mapper, connection, target):
+        publish_on_commit(object_session(target), target.user_id, transaction_delta(target, op))
+    return listener
+
+
+for _event_name, _op in (("after_insert", "created"), ("after_update", "updated"), ("after_delete", "deleted")):
+    event.listen(Transaction, _event_name, _publish_transaction_change(_op))
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _invalidate_cached_user(mapper, connection, target):
+    invalidate_on_commit(object_session(target), user_key(target.id))
+
+
+@event.listens_for(Category, "after_update")
+@event.listens_for(Category, "after_delete")
+def _invalidate_cached_category(mapper, connection, target):
+    # a rename must also drop the entry cached under the old name / owner
+    state = inspect(target)
+    names = {target.name, *state.attrs.name.history.deleted}
+    owners = {target.user_id, *state.attrs.user_id.history.deleted}
+    invalidate_on_commit(object_session(target), *[category_key(o, n) for o in owners for n in names])
+
+
+class Receipt(db.Model, TimestampMixin):
+    """
+    A file attached to a transaction. The bytes live in the content-addressed
+    store (application/storage.py) under `sha256`; several receipts may share one file.
+    """
+    __tablename__ = "receipts"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    # no foreign key: with sharding on, the transaction lives in a shard database
+    transaction_id = db.Column(db.Integer, nullable=False, index=True)
+    sha256 = db.Column(db.String(64), nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(64), nullable=False)
+    filename = db.Column(db.String(255), nullable=True)
+    # pending | ready | failed | none (not an image)
+    thumbnail_status = db.Column(db.String(16), nullable=False, default="pending")
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "transaction_id": self.transaction_id,
+            "sha256": self.sha256,
+            "size": self.size,
+            "content_type": self.content_type,
+            "filename": self.filename,
+            "thumbnail_status": self.thumbnail_status,
+            "url": f"/api/receipts/{self.id}/file",
+            "thumbnail_url": f"/api/receipts/{self.id}/thumbnail" if self.thumbnail_status == "ready" else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+
 class MLModel(db.Model, TimestampMixin):
     """
     Metadata record for ML model artifacts used by the app (e.g. auto-categorizer).
@@ -233,21 +471,79 @@ class AuditLog(db.Model):
     def __repr__(self):
         return f"<AuditLog id={self.id} action={self.action} actor={self.actor_id}>"
 
-# Optional: RefreshToken model (useful if you implement refresh flow)
 class RefreshToken(db.Model, TimestampMixin):
+    """
+    Issued refresh tokens (one row per jti). Every refresh rotates the token:
+    the presented row gets `used_at`, a new row joins the same `family_id`.
+    Presenting an already-used token means it leaked, so the whole family is revoked.
+    """
     __tablename__ = "refresh_tokens"
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False, index=True)
+    # the token's jti (the JWT itself is never stored)
     token = db.Column(db.String(512), nullable=False, unique=True, index=True)
+    family_id = db.Column(db.String(64), nullable=True, index=True)
     revoked = db.Column(db.Boolean, default=False, nullable=False, index=True)
+    used_at = db.Column(db.DateTime, nullable=True)
     expires_at = db.Column(db.DateTime, nullable=True)
 
     user = db.relationship("User", lazy="joined")
 
     def __repr__(self):
-        return f"<RefreshToken id={self.id} user={self.user_id} revoked={self.revoked}>"
+        return f"<RefreshToken id={self.id} user={self.user_id} family={self.family_id} revoked={self.revoked}>"
+
+
+
+class Job(db.Model, TimestampMixin):
+    """
+    Background job queue row. Endpoints enqueue, `worker.py` claims and runs.
+    status: queued -> running -> succeeded | failed (retries go back to queued);
+    queued jobs can also be cancelled
+    """
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # the worker's claim query: oldest runnable queued jobs
+        db.Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
 
+    id = db.Column(db.Integer, primary_key=True)
+    type = db.Column(db.String(64), nullable=False, index=True)
+    status = db.Column(db.String(16), nullable=False, default="queued")
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True, index=True)
+    payload = db.Column(JSONType, nullable=True)
+    result = db.Column(JSONType, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    progress_message = db.Column(db.String(255), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_by = db.Column(db.String(128), nullable=True)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "type": self.type,
+            "status": self.status,
+            "user_id": self.user_id,
+            "payload": self.payload,
+            "result": self.result,
+            "error": self.error,
+            "progress": self.progress,
+            "progress_message": self.progress_message,
+            "attempts": self.attempts,
+            "max_attempts": self.max_attempts,
+            "run_after": self.run_after.isoformat() if self.run_after else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    def __repr__(self):
+        return f"<Job id={self.id} type={self.type} status={self.status}>"
 
 
 class TokenBlocklist(db.Model):
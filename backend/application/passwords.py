@@ -0,0 +1,125 @@
+"""
+Password hashing with per-environment cost and a bounded KDF worker pool.
+
+- PASSWORD_HASH_METHOD picks the werkzeug method string per environment
+  (e.g. "scrypt:32768:8:1" in production, something cheaper in development).
+- Hashes made with other parameters still verify, and are transparently
+  re-hashed after a successful login (in the background, off the request).
+- Hashing and verification run on a small thread pool (PASSWORD_HASH_WORKERS).
+  hashlib's scrypt / pbkdf2 release the GIL, so a login storm is capped at N
+  concurrent KDFs while other requests on the same worker keep being served.
+  When the pool's queue is full for PASSWORD_HASH_QUEUE_TIMEOUT seconds the
+  request fails fast with 503 + Retry-After instead of piling up.
+"""
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app, has_app_context
+from werkzeug.exceptions import ServiceUnavailable
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"  # werkzeug's own default
+
+logger = logging.getLogger("application.passwords")
+
+
+class HashPoolBusy(ServiceUnavailable):
+    """Raised when the KDF pool is saturated; Flask-RESTful renders it as a 503."""
+
+    description = "Server busy, please retry shortly."
+
+    def __init__(self):
+        super().__init__(retry_after=1)
+
+
+class _HashPool:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.executor = None
+        self.slots = None
+        self.workers = 0
+
+    def configure(self, workers: int, queue_size: int):
+        with self._lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False)
+            self.workers = workers
+            self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="kdf")
+            # running + waiting jobs; beyond this callers get HashPoolBusy
+            self.slots = threading.BoundedSemaphore(workers + queue_size)
+
+    def run(self, fn, *args, timeout: float = 2.0):
+        if self.executor is None:
+            self.configure(2, 16)
+        if not self.slots.acquire(timeout=timeout):
+            raise HashPoolBusy()
+        try:
+            future = self.executor.submit(fn, *args)
+        except RuntimeError:
+            self.slots.release()
+            raise
+        future.add_done_callback(lambda _: self.slots.release())
+        return future
+
+
+pool = _HashPool()
+_normalized = {}
+
+
+def _config(key, default):
+    return current_app.config.get(key, default) if has_app_context() else default
+
+
+def configured_method() -> str:
+    return _config("PASSWORD_HASH_METHOD", DEFAULT_METHOD)
+
+
+def _normalize(method: str) -> str:
+    """werkzeug expands defaults ("scrypt" -> "scrypt:32768:8:1"); compare expanded forms."""
+    if method not in _normalized:
+        _normalized[method] = generate_password_hash("x", method=method).split("$", 1)[0]
+    return _normalized[method]
+
+
+def needs_rehash(pw_hash: str) -> bool:
+    return pw_hash.split("$", 1)[0] != _normalize(configured_method())
+
+
+def hash_password(password: str) -> str:
+    method = configured_method()
+    timeout = _config("PASSWORD_HASH_QUEUE_TIMEOUT", 2.0)
+    return pool.run(generate_password_hash, password, method, timeout=timeout).result()
+
+
+def verify_password(pw_hash: str, password: str) -> bool:
+    timeout = _config("PASSWORD_HASH_QUEUE_TIMEOUT", 2.0)
+    return pool.run(check_password_hash, pw_hash, password, timeout=timeout).result()
+
+
+def schedule_rehash(password: str, store):
+    """
+    Hash `password` with the current parameters on the pool and hand the result
+    to `store(new_hash)` on that worker thread. Skipped (not failed) when busy:
+    the next login will try again.
+    """
+    method = configured_method()
+
+    def job():
+        try:
+            store(generate_password_hash(password, method=method))
+        except Exception:
+            logger.exception("background password rehash failed")
+
+    try:
+        return pool.run(job, timeout=0)
+    except HashPoolBusy:
+        return None
+
+
+def init_passwords(app):
+    """Size the KDF pool from config."""
+    pool.configure(app.config.get("PASSWORD_HASH_WORKERS", 2), app.config.get("PASSWORD_HASH_QUEUE", 16))
+    # warm the method cache so the first login doesn't pay for it
+    _normalize(app.config.get("PASSWORD_HASH_METHOD", DEFAULT_METHOD))
+    return pool
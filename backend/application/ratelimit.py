@@ -0,0 +1,204 @@
+"""
+Token-bucket rate limiting for expensive / abusable endpoints (login, password reset).
+
+Each named rule ("login_ip", "login_account", ...) maps to a config string such
+as "10/minute" (bucket capacity 10, refilled at 10 tokens per minute) and a key
+function (client IP, or the account email from the JSON body). The check runs
+in a decorator, before the handler touches the KDF pool or the database.
+
+Stores:
+- InMemoryBucketStore: per-process buckets (default).
+- SharedBucketStore: buckets kept in a cache SharedBackend (application/cache.py),
+  so all workers share one budget. With the in-memory stand-in it behaves like a
+  shared store inside one process; with Redis, the read-modify-write is not atomic
+  and can over-admit by a few requests under heavy contention, acceptable for abuse throttling.
+
+Config keys:
+- RATELIMIT_ENABLED        default True
+- RATELIMIT_STORE          "memory" (default) | "shared" (uses CACHE_SHARED_BACKEND)
+- RATELIMIT_TRUST_PROXY    take the client IP from X-Forwarded-For (default False)
+- RATELIMIT_RULES          {rule_name: "N/second|minute|hour|day"}, overrides of DEFAULT_RULES
+"""
+
+import itertools
+import pickle
+import threading
+import time
+from functools import wraps
+from flask import request, jsonify, current_app
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+DEFAULT_RULES = {
+    "login_ip": "20/minute",
+    "login_account": "5/minute",
+    "register_ip": "10/hour",
+    "refresh_ip": "60/minute",
+    "reset_ip": "5/minute",
+    "reset_account": "3/hour",
+}
+
+
+def parse_rule(spec: str):
+    """'10/minute' -> (capacity=10, refill_per_second=10/60)."""
+    count, _, period = spec.partition("/")
+    count = int(count)
+    if period not in PERIODS or count <= 0:
+        raise ValueError(f"Invalid rate limit '{spec}', expected e.g. '10/minute'")
+    return count, count / PERIODS[period]
+
+
+def _refill(tokens, last, now, capacity, rate):
+    return min(capacity, tokens + (now - last) * rate)
+
+
+class InMemoryBucketStore:
+    """
+    Buckets in a dict, kept in least-recently-used order. When it grows past
+    `max_keys`, buckets that are full again (under their own rule) are pruned;
+    if that is not enough, the least recently used ones go, down to 90% of
+    `max_keys`, so a flood of new keys costs one scan per 10% of `max_keys`.
+    """
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.max_keys = max_keys
+
+    def take(self, key, capacity, rate, cost=1):
+        """Return (allowed, retry_after_seconds, remaining_tokens)."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, last, _, _ = self._buckets.pop(key, (capacity, now, capacity, rate))
+            tokens = _refill(tokens, last, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            self._buckets[key] = (tokens, now, capacity, rate)
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, retry_after, int(tokens)
+
+    def _prune(self, now):
+        for k, (tokens, last, capacity, rate) in list(self._buckets.items()):
+            if _refill(tokens, last, now, capacity, rate) >= capacity:
+                del self._buckets[k]
+        excess = len(self._buckets) - self.max_keys * 9 // 10
+        if excess > 0:
+            for k in list(itertools.islice(self._buckets, excess)):
+                del self._buckets[k]
+
+    def reset(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+class SharedBucketStore:
+    """Buckets stored in a cache SharedBackend (in-memory stand-in or Redis)."""
+
+    def __init__(self, backend, prefix: str = "rl:"):
+        self.backend = backend
+        self.prefix = prefix
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate, cost=1):
+        now = time.time()
+        full_after = int(capacity / rate) + 1
+        with self._lock:
+            raw = self.backend.get(self.prefix + key)
+            tokens, last = pickle.loads(raw) if raw else (capacity, now)
+            tokens = _refill(tokens, last, now, capacity, rate)
+            allowed = tokens >= cost
+            if allowed:
+                tokens -= cost
+            # the entry expires once the bucket would be full again anyway
+            self.backend.set(self.prefix + key, pickle.dumps((tokens, now)), full_after)
+        retry_after = 0 if allowed else (cost - tokens) / rate
+        return allowed, retry_after, int(tokens)
+
+    def reset(self):
+        self.backend.clear()
+
+
+# --------------------------- Key functions ---------------------------
+def client_ip():
+    if current_app.config.get("RATELIMIT_TRUST_PROXY") and request.access_route:
+        return request.access_route[0]
+    return request.remote_addr or "unknown"
+
+
+def account_email():
+    data = request.get_json(silent=True) or {}
+    email = (data.get("email") or "").strip().lower()
+    return email or None
+
+
+KEY_FUNCS = {
+    "ip": client_ip,
+    "account": account_email,
+}
+
+
+# --------------------------- Limiter ---------------------------
+class RateLimiter:
+    def __init__(self):
+        self.store = InMemoryBucketStore()
+        self.enabled = True
+        self.rules = {}
+
+    def configure(self, config):
+        from .cache import cache
+
+        self.enabled = config.get("RATELIMIT_ENABLED", True)
+        rules = {**DEFAULT_RULES, **config.get("RATELIMIT_RULES", {})}
+        self.rules = {name: parse_rule(spec) for name, spec in rules.items()}
+        if config.get("RATELIMIT_STORE", "memory") == "shared":
+            if cache.shared is None:
+                raise RuntimeError("RATELIMIT_STORE='shared' requires CACHE_SHARED_BACKEND to be configured")
+            self.store = SharedBucketStore(cache.shared)
+        else:
+            self.store = InMemoryBucketStore()
+
+    def check(self, rule_names):
+        """Consume one token from every applicable bucket; return a 429 response or None."""
+        if not self.enabled:
+            return None
+        for name in rule_names:
+            capacity, rate = self.rules[name]
+            key_kind = name.rsplit("_", 1)[-1]
+            key = KEY_FUNCS[key_kind]()
+            if key is None:
+                continue
+            allowed, retry_after, _ = self.store.take(f"{name}:{key}", capacity, rate)
+            if not allowed:
+                retry = max(int(retry_after + 0.999), 1)
+                resp = jsonify({"message": "Too many requests, slow down.", "retry_after": retry})
+                resp.status_code = 429
+                resp.headers["Retry-After"] = str(retry)
+                return resp
+        return None
+
+
+limiter = RateLimiter()
+
+
+def init_ratelimit(app):
+    limiter.configure(app.config)
+    return limiter
+
+
+def rate_limited(*rule_names):
+    """
+    Decorator applying named token-bucket rules, e.g.
+    @rate_limited("login_ip", "login_account"). Rule suffix picks the key: _ip / _account.
+    """
+    def decorator(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            limited = limiter.check(rule_names)
+            if limited is not None:
+                return limited
+            return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,158 @@
+"""
+Real-time push of transaction changes over Socket.IO (Flask-SocketIO).
+
+Clients connect with their access token and are put in the room `user:<id>`
+(admins also join `admins`). Every Transaction insert / update / delete, from
+any write path (API, model_utils helpers, CLI), is recorded during the flush as
+a small delta and emitted to the owner's room once the session commits, so the
+dashboard patches its list instead of polling /api/transactions. Rolled back
+changes are never sent.
+
+    socket = io(API_BASE, { auth: { token: accessToken } })
+    socket.on("transactions", ({ changes, resync }) => ...)
+
+Each change is {"op": "created"|"updated"|"deleted", "id": ..., "transaction": {changed fields}}.
+A commit touching more than REALTIME_MAX_DELTAS rows of one user sends
+{"resync": true} instead; the client refetches (with its ETag) once.
+
+Several web workers, or writes from CLI / worker.py processes, need a shared
+message queue (REALTIME_MESSAGE_QUEUE, e.g. redis://...) so an emit from one
+process reaches sockets held by another; with several gunicorn workers the
+load balancer must also use sticky sessions.
+
+Config keys:
+- REALTIME_ENABLED        default True
+- REALTIME_MESSAGE_QUEUE  Socket.IO message queue URL (default None: single process)
+- REALTIME_ASYNC_MODE     "threading" | "eventlet" | "gevent" (default: auto-detect)
+- REALTIME_MAX_DELTAS     deltas per user per commit before falling back to resync (default 100)
+"""
+
+import logging
+from datetime import datetime, date
+from flask import request
+from flask_socketio import SocketIO, join_room
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger("application.realtime")
+
+socketio = SocketIO()
+_settings = {"enabled": False, "max_deltas": 100}
+
+ADMIN_ROOM = "admins"
+EVENT = "transactions"
+# columns worth pushing; large / internal ones (meta_data) are fetched on demand
+DELTA_FIELDS = ("user_id", "amount", "currency", "category_id", "note", "vendor", "merchant_id", "date",
+                "is_recurring", "recurrence_rule", "updated_at")
+
+
+def user_room(user_id) -> str:
+    return f"user:{user_id}"
+
+
+def _jsonable(value):
+    return value.isoformat() if isinstance(value, (datetime, date)) else value
+
+
+# --------------------------- Delta collection ---------------------------
+_PENDING_KEY = "realtime_deltas"
+
+
+def transaction_delta(target, op: str):
+    """Build the delta for one flushed Transaction; updates only carry the changed columns."""
+    if op == "updated":
+        state = inspect(target)
+        if state.attrs.is_deleted.history.added == [True]:
+            return {"op": "deleted", "id": target.id}
+        changed = [f for f in DELTA_FIELDS if state.attrs[f].history.has_changes()]
+        if not changed:
+            return None
+        fields = {f: _jsonable(getattr(target, f)) for f in set(changed) | {"updated_at"}}
+        return {"op": "updated", "id": target.id, "transaction": fields}
+    if op == "deleted":
+        return {"op": "deleted", "id": target.id}
+    return {"op": "created", "id": target.id,
+            "transaction": {f: _jsonable(getattr(target, f)) for f in DELTA_FIELDS}}
+
+
+def inserted_delta(row_id, values: dict):
+    """"created" delta for a row written with a Core INSERT (no ORM flush hook sees those)."""
+    return {"op": "created", "id": row_id,
+            "transaction": {f: _jsonable(values.get(f)) for f in DELTA_FIELDS}}
+
+
+def publish_on_commit(session, user_id, delta):
+    """Queue `delta` for `user:<user_id>`; it is emitted only if `session` commits."""
+    if not _settings["enabled"] or session is None or delta is None:
+        return
+    session.info.setdefault(_PENDING_KEY, {}).setdefault(user_id, []).append(delta)
+
+
+@event.listens_for(Session, "after_commit")
+def _emit_pending(session):
+    pending = session.info.pop(_PENDING_KEY, None)
+    if not pending:
+        return
+    for user_id, deltas in pending.items():
+        if len(deltas) > _settings["max_deltas"]:
+            payload = {"user_id": user_id, "resync": True}
+        else:
+            payload = {"user_id": user_id, "changes": deltas}
+        try:
+            # one emit to both rooms: an admin watching their own data gets it once
+            socketio.emit(EVENT, payload, to=[user_room(user_id), ADMIN_ROOM])
+        except Exception:
+            # the commit already happened; a lost push only means the client refetches later
+            logger.exception("realtime emit for user %s failed", user_id)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_pending(session):
+    session.info.pop(_PENDING_KEY, None)
+
+
+# --------------------------- Socket handlers ---------------------------
+def _authenticate(auth):
+    """Same checks as token_required, for the Socket.IO handshake. Returns the user or None."""
+    from .api.auth.auth_utils import decode_token, is_jti_revoked
+    from .models.model_utils import get_user
+
+    token = (auth or {}).get("token") or request.args.get("token")
+    if not token:
+        return None
+    try:
+        payload = decode_token(token)
+    except Exception:
+        return None
+    if payload.get("type", "access") != "access" or is_jti_revoked(payload.get("jti")):
+        return None
+    user = get_user(payload.get("user_id"))
+    if not user or not user.is_active or payload.get("gen", 0) != (user.token_generation or 0):
+        return None
+    return user
+
+
+@socketio.on("connect")
+def _on_connect(auth=None):
+    user = _authenticate(auth)
+    if user is None:
+        return False  # refuse the handshake
+    join_room(user_room(user.id))
+    if user.role == "admin":
+        join_room(ADMIN_ROOM)
+    return True
+
+
+def init_realtime(app):
+    """Attach Socket.IO to the app (served by `socketio.run(app)` or an eventlet/gevent gunicorn)."""
+    _settings["enabled"] = app.config.get("REALTIME_ENABLED", True)
+    _settings["max_deltas"] = app.config.get("REALTIME_MAX_DELTAS", 100)
+    if not _settings["enabled"]:
+        return None
+    socketio.init_app(
+        app,
+        message_queue=app.config.get("REALTIME_MESSAGE_QUEUE"),
+        async_mode=app.config.get("REALTIME_ASYNC_MODE"),
+        cors_allowed_origins=app.config.get("REALTIME_CORS_ORIGINS", ["http://localhost:5173"]),
+    )
+    return socketio
@@ -0,0 +1,214 @@
+"""
+Columnar (Parquet / Arrow IPC) export of transaction history for analytics.
+
+Rows are streamed from the DB cursor in batches (`yield_per`) ordered by
+(user_id, date), so only one batch is held in memory at a time. Output is
+hive-partitioned by user and month:
+
+    <out_dir>/user=7/month=2024-05/part-0.parquet
+
+which `pandas.read_parquet(out_dir)` / `pyarrow.dataset` pick up directly.
+The directory key is `user` rather than `user_id` so it does not clash with
+the `user_id` column stored inside every file. Arrow IPC files
+(".arrow", the Feather v2 format) can be memory-mapped for zero-copy loads.
+
+`pyarrow` is an optional dependency; it is imported on first use.
+
+With sharding on (application/sharding.py) the shards are read one after
+another; every user lives in exactly one shard, so partitions still never
+reappear.
+"""
+
+import os
+import json
+from datetime import datetime
+from sqlalchemy import select, func
+from application.sharding import for_each_shard, shard_sessions
+from ..models.models import Transaction, Category
+
+FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+# (column name, arrow type name) in export order
+COLUMNS = [
+    ("id", "int64"),
+    ("user_id", "int64"),
+    ("amount", "float64"),
+    ("currency", "string"),
+    ("category_id", "int64"),
+    ("category", "string"),
+    ("vendor", "string"),
+    ("note", "string"),
+    ("date", "timestamp"),
+    ("is_recurring", "bool"),
+    ("recurrence_rule", "string"),
+    ("meta_data", "string"),  # JSON text; nested schemas vary per row
+    ("created_at", "timestamp"),
+    ("updated_at", "timestamp"),
+    ("is_deleted", "bool"),
+]
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        import pyarrow.ipc
+    except ImportError as e:
+        raise RuntimeError("Columnar export requires pyarrow (pip install pyarrow)") from e
+    return pyarrow
+
+
+def arrow_schema(pa):
+    types = {
+        "int64": pa.int64(),
+        "float64": pa.float64(),
+        "string": pa.string(),
+        "bool": pa.bool_(),
+        "timestamp": pa.timestamp("us"),
+    }
+    fields = [pa.field(name, types[t]) for name, t in COLUMNS]
+    # low-cardinality text compresses far better dictionary-encoded
+    fields[3] = pa.field("currency", pa.dictionary(pa.int32(), pa.string()))
+    return pa.schema(fields)
+
+
+def _export_query(user_id=None, start_date=None, end_date=None, include_deleted=False):
+    stmt = (
+        select(
+            Transaction.id,
+            Transaction.user_id,
+            Transaction.amount,
+            Transaction.currency,
+            Transaction.category_id,
+            Category.name,
+            Transaction.vendor,
+            Transaction.note,
+            Transaction.date,
+            Transaction.is_recurring,
+            Transaction.recurrence_rule,
+            Transaction.meta_data,
+            Transaction.created_at,
+            Transaction.updated_at,
+            Transaction.is_deleted,
+        )
+        .outerjoin(Category, Transaction.category_id == Category.id)
+        # matches ix_txn_user_date, so the DB streams rows in partition order
+        .order_by(Transaction.user_id, Transaction.date)
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    if not include_deleted:
+        stmt = stmt.where(Transaction.is_deleted.is_(False))
+    if start_date:
+        stmt = stmt.where(Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.date <= end_date)
+    return stmt
+
+
+def count_transactions(user_id=None, start_date=None, end_date=None, include_deleted=False, session=None):
+    """Row count of an export, used to turn rows written into a progress fraction."""
+    stmt = _export_query(user_id, start_date, end_date, include_deleted).order_by(None)
+    count = select(func.count()).select_from(stmt.subquery())
+    if session is not None:
+        return session.scalar(count)
+    return sum(for_each_shard(lambda s: s.scalar(count)))
+
+
+def _partition_key(row):
+    return row[1], row[8].strftime("%Y-%m")
+
+
+def _runs(rows):
+    """Split a batch into contiguous runs sharing a partition key."""
+    start = 0
+    for i in range(1, len(rows) + 1):
+        if i == len(rows) or _partition_key(rows[i]) != _partition_key(rows[start]):
+            yield _partition_key(rows[start]), rows[start:i]
+            start = i
+
+
+class _PartitionWriter:
+    """Keeps exactly one file open: input is sorted, so a partition never reappears."""
+
+    def __init__(self, pa, out_dir, fmt, schema):
+        self.pa, self.out_dir, self.fmt, self.schema = pa, out_dir, fmt, schema
+        self.key = None
+        self.writer = None
+        self.sink = None
+        self.files = []
+
+    def _open(self, key):
+        user_id, month = key
+        part_dir = os.path.join(self.out_dir, f"user={user_id}", f"month={month}")
+        os.makedirs(part_dir, exist_ok=True)
+        path = os.path.join(part_dir, "part-0" + FORMATS[self.fmt])
+        if self.fmt == "parquet":
+            self.writer = self.pa.parquet.ParquetWriter(path, self.schema, compression="zstd")
+        else:
+            self.sink = self.pa.OSFile(path, "wb")
+            self.writer = self.pa.ipc.new_file(self.sink, self.schema)
+        self.key = key
+        self.files.append({"path": os.path.relpath(path, self.out_dir), "user_id": user_id, "month": month, "rows": 0})
+
+    def write(self, key, rows):
+        if key != self.key:
+            self.close()
+            self._open(key)
+        cols = list(zip(*rows))
+        data = {name: list(values) for (name, _), values in zip(COLUMNS, cols)}
+        data["meta_data"] = [json.dumps(m) if m is not None else None for m in data["meta_data"]]
+        self.writer.write_table(self.pa.Table.from_pydict(data, schema=self.schema))
+        self.files[-1]["rows"] += len(rows)
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+        self.writer = self.sink = self.key = None
+
+
+def export_transactions_columnar(out_dir: str, fmt: str = "parquet", user_id: int = None,
+                                 start_date: datetime = None, end_date: datetime = None,
+                                 include_deleted: bool = False, batch_size: int = 50_000,
+                                 session=None, on_batch=None):
+    """
+    Stream transactions into partitioned columnar files under `out_dir`.
+    Returns a manifest dict (also written to `<out_dir>/_manifest.json`).
+    `on_batch(rows_written)` is called after every batch (job progress reporting).
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format '{fmt}'. Use one of: {', '.join(FORMATS)}")
+    pa = _require_pyarrow()
+    schema = arrow_schema(pa)
+    os.makedirs(out_dir, exist_ok=True)
+
+    stmt = _export_query(user_id, start_date, end_date, include_deleted).execution_options(yield_per=batch_size)
+    writer = _PartitionWriter(pa, out_dir, fmt, schema)
+    total = 0
+    try:
+        for source in ([session] if session is not None else shard_sessions()):
+            result = source.execute(stmt)
+            try:
+                for batch in result.partitions():
+                    for key, rows in _runs(batch):
+                        writer.write(key, rows)
+                    total += len(batch)
+                    if on_batch is not None:
+                        on_batch(total)
+            finally:
+                result.close()
+    finally:
+        writer.close()
+
+    manifest = {
+        "format": fmt,
+        "rows": total,
+        "partitioning": ["user", "month"],
+        "files": writer.files,
+        "created_at": datetime.utcnow().isoformat(),
+    }
+    with open(os.path.join(out_dir, "_manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
@@ -0,0 +1,242 @@
+"""
+Bulk transaction import with duplicate detection, and the duplicate scan.
+
+Importing an overlapping bank statement must not double-count spending. Every
+row is fingerprinted (application/dedup.py) and compared with the owner's
+existing rows in the statement's date range plus `window_days` on each side,
+loaded with one indexed (user_id, date) query:
+
+- exact duplicates (same fingerprint as an existing row) are skipped unless
+  `skip_duplicates=False`; a dict lookup per row. Matching is by multiplicity:
+  each existing row absorbs one imported copy, so two identical coffees on a
+  statement both import, and re-importing that statement skips both,
+- near duplicates (same amount within `window_days`, different day or vendor)
+  are imported but reported, found with one sorted sweep.
+
+Rows are written with Core INSERTs in batches of `batch_size` (one commit
+each), which also works on sharded deployments where ORM bulk inserts do not.
+Categories are resolved by name in one round trip (the user's own first, then
+global ones; missing names become user categories) and merchant ids through
+`resolve_merchant_ids()`. Each committed batch is pushed to the owner's sockets
+(application/realtime.py), as one resync when it is large. A retried import
+skips the rows an interrupted run already committed, since those are now exact
+duplicates.
+"""
+
+import logging
+import math
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, update, bindparam, func, or_
+from application.database import db, mark_written
+from application.dedup import (transaction_fingerprint, amount_cents, exact_duplicate_groups,
+                               near_duplicate_pairs)
+from application.merchants import resolve_merchant_ids
+from application.realtime import publish_on_commit, inserted_delta
+from application.sharding import use_shard, shard_sessions, for_each_shard
+from application.tags import tag_rows
+from ..models.models import Transaction, Category, User, TransactionTag
+from ..models.model_utils import get_or_create_categories, bump_data_versions
+
+logger = logging.getLogger("application.services.import")
+
+DEFAULT_BATCH_SIZE = 5_000
+DEFAULT_WINDOW_DAYS = 3
+
+
+def _parse_row(raw):
+    """Validate one input row; raises ValueError with a message for the response."""
+    if not isinstance(raw, dict):
+        raise ValueError("row must be an object")
+    try:
+        amount = float(raw.get("amount"))
+    except (TypeError, ValueError):
+        raise ValueError("amount must be a number")
+    if not math.isfinite(amount * 100):  # nan / inf, or too large to fingerprint in cents
+        raise ValueError("amount must be a finite number")
+    if not raw.get("date"):
+        raise ValueError("date is required")
+    try:
+        date = datetime.fromisoformat(str(raw["date"]))
+    except ValueError:
+        raise ValueError("date must be ISO 8601 (YYYY-MM-DD)")
+    if date.tzinfo is not None:
+        # stored dates are naive UTC; mixing aware and naive values breaks comparisons
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    vendor = raw.get("vendor") or None
+    return {
+        "amount": amount,
+        "date": date,
+        "vendor": vendor[:255] if vendor else None,
+        "note": (raw.get("note") or None) and str(raw["note"])[:512],
+        "currency": raw.get("currency") or None,
+        "category": (raw.get("category") or "").strip() or None,
+        "tags": raw.get("tags") if isinstance(raw.get("tags"), list) else None,
+    }
+
+
+def _resolve_categories(user_id, names):
+    """{name: category id}: the user's own category, else a global one, else a new user category."""
+    if not names:
+        return {}
+    with use_shard(user_id):
+        rows = db.session.execute(
+            select(Category.id, Category.name, Category.user_id)
+            .where(Category.name.in_(names), or_(Category.user_id == user_id, Category.user_id.is_(None)))
+        ).all()
+    found = {}
+    for row in sorted(rows, key=lambda r: r.user_id is None):  # own categories first
+        found.setdefault(row.name, row.id)
+    missing = [n for n in names if n not in found]
+    if missing:
+        found.update((name, cat.id) for name, cat in get_or_create_categories(missing, user_id=user_id).items())
+    return found
+
+
+def _existing_rows(user_id, start, end):
+    """(id, amount, date, fingerprint) of the user's live rows with start <= date < end."""
+    txns = Transaction.__table__
+    with use_shard(user_id):
+        rows = db.session.execute(
+            select(txns.c.id, txns.c.amount, txns.c.date, txns.c.vendor, txns.c.fingerprint)
+            .where(txns.c.user_id == user_id, txns.c.is_deleted.is_(False),
+                   txns.c.date >= start, txns.c.date < end)
+        ).all()
+    # rows written before the fingerprint column existed are hashed here
+    return [(r.id, r.amount, r.date, r.fingerprint or transaction_fingerprint(user_id, r.amount, r.date, r.vendor))
+            for r in rows]
+
+
+def import_transactions(user_id: int, rows, skip_duplicates: bool = True,
+                        window_days: int = DEFAULT_WINDOW_DAYS, batch_size: int = DEFAULT_BATCH_SIZE):
+    """
+    Import `rows` ({"amount", "date", "vendor", "note", "currency", "category", "tags"})
+    for `user_id`. Returns a report:
+        {"imported", "ids", "errors": [{"row", "error"}],
+         "duplicates": [{"row", "duplicate_of": id}],
+         "near_duplicates": [[new id, other id], ...]}
+    Row indexes refer to positions in `rows`. Raises LookupError for an unknown user.
+    """
+    errors, parsed = [], []
+    for index, raw in enumerate(rows):
+        try:
+            parsed.append((index, _parse_row(raw)))
+        except ValueError as e:
+            errors.append({"row": index, "error": str(e)})
+    report = {"imported": 0, "ids": [], "errors": errors, "duplicates": [], "near_duplicates": []}
+    if not parsed:
+        return report
+
+    user = db.session.get(User, user_id)
+    if user is None:
+        raise LookupError(f"user {user_id} does not exist")
+    categories = _resolve_categories(user_id, list(dict.fromkeys(p["category"] for _, p in parsed if p["category"])))
+    merchant_ids = resolve_merchant_ids([p["vendor"] for _, p in parsed])
+
+    window = timedelta(days=window_days)
+    start = min(p["date"] for _, p in parsed).replace(hour=0, minute=0, second=0, microsecond=0) - window
+    end = max(p["date"] for _, p in parsed) + window + timedelta(days=1)
+    existing = _existing_rows(user_id, start, end)
+    unmatched = defaultdict(list)  # fingerprint -> existing ids not yet matched by an imported row
+    for row_id, _, _, fingerprint in sorted(existing, key=lambda r: r[0], reverse=True):
+        unmatched[fingerprint].append(row_id)
+
+    now = datetime.utcnow()
+    pending = []
+    for (index, p), merchant_id in zip(parsed, merchant_ids):
+        fingerprint = transaction_fingerprint(user_id, p["amount"], p["date"], p["vendor"])
+        if skip_duplicates and unmatched.get(fingerprint):
+            report["duplicates"].append({"row": index, "duplicate_of": unmatched[fingerprint].pop()})
+            continue
+        pending.append({
+            "user_id": user_id,
+            "amount": p["amount"],
+            "currency": p["currency"] or user.currency or "INR",
+            "category_id": categories.get(p["category"]),
+            "note": p["note"],
+            "vendor": p["vendor"],
+            "merchant_id": merchant_id,
+            "date": p["date"],
+            "is_recurring": False,
+            "meta_data": {"source": "import", **({"tags": p["tags"]} if p["tags"] else {})},
+            "fingerprint": fingerprint,
+            "created_at": now,
+            "updated_at": now,
+        })
+
+    txns = Transaction.__table__
+    stmt = insert(txns).returning(txns.c.id, sort_by_parameter_order=True)
+    ids = []
+    with use_shard(user_id):
+        for i in range(0, len(pending), batch_size):
+            batch = pending[i:i + batch_size]
+            batch_ids = list(db.session.scalars(stmt, batch))
+            # Core inserts skip the ORM hook that mirrors meta_data tags
+            tags = [tag for row_id, row in zip(batch_ids, batch) for tag in tag_rows(row_id, user_id, row["meta_data"])]
+            if tags:
+                db.session.execute(insert(TransactionTag.__table__), tags)
+            # Core inserts skip the realtime hook too; a large batch goes out as one resync
+            for row_id, row in zip(batch_ids, batch):
+                publish_on_commit(db.session, user_id, inserted_delta(row_id, row))
+            db.session.commit()
+            ids.extend(batch_ids)
+    if ids:
+        mark_written(db.session, user_id)
+        bump_data_versions([user_id])
+
+    new_ids = set(ids)
+    records = [(row_id, amount_cents(amount), date.toordinal(), fingerprint)
+               for row_id, amount, date, fingerprint in existing]
+    records += [(row_id, amount_cents(row["amount"]), row["date"].toordinal(), row["fingerprint"])
+                for row_id, row in zip(ids, pending)]
+    pairs = near_duplicate_pairs(records, window_days, wanted=lambda a, b: a in new_ids or b in new_ids)
+    report["near_duplicates"] = [sorted((a, b), key=lambda k: k not in new_ids) for a, b in pairs]
+    report["imported"], report["ids"] = len(ids), ids
+    logger.info("import for user %s: %d imported, %d duplicates skipped, %d near duplicates, %d errors",
+                user_id, len(ids), len(report["duplicates"]), len(pairs), len(errors))
+    return report
+
+
+def find_duplicates(user_id: int, window_days: int = DEFAULT_WINDOW_DAYS, start_date=None, end_date=None):
+    """
+    Duplicate scan over the user's live transactions:
+    {"exact": [[id, id, ...], ...], "near": [[id, id], ...]}.
+    """
+    start = start_date or datetime.min
+    end = end_date or datetime.max
+    rows = _existing_rows(user_id, start, end)
+    exact = exact_duplicate_groups((row_id, fingerprint) for row_id, _, _, fingerprint in rows)
+    near = near_duplicate_pairs(
+        [(row_id, amount_cents(amount), date.toordinal(), fingerprint) for row_id, amount, date, fingerprint in rows],
+        window_days,
+    )
+    return {"exact": exact, "near": [list(pair) for pair in near]}
+
+
+def backfill_fingerprints(chunk_size: int = 10_000, on_progress=None):
+    """Fingerprint rows written before the column existed, in keyset chunks; returns the number updated."""
+    txns = Transaction.__table__
+    missing = txns.c.fingerprint.is_(None)
+    total = sum(for_each_shard(lambda session: session.scalar(select(func.count()).select_from(txns).where(missing))))
+    # keep updated_at: a derived column is not an edit (/changes sync, incremental training)
+    stmt = (update(txns).where(txns.c.id == bindparam("row_id"))
+            .values(fingerprint=bindparam("fp"), updated_at=txns.c.updated_at))
+    done = 0
+    for session in shard_sessions():
+        last_id = 0
+        while True:
+            rows = session.execute(
+                select(txns.c.id, txns.c.user_id, txns.c.amount, txns.c.date, txns.c.vendor)
+                .where(missing, txns.c.id > last_id).order_by(txns.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            session.connection().execute(stmt, [
+                {"row_id": r.id, "fp": transaction_fingerprint(r.user_id, r.amount, r.date, r.vendor)} for r in rows
+            ])
+            session.commit()
+            done += len(rows)
+            if on_progress is not None:
+                on_progress(done, total)
+    return done
@@ -0,0 +1,75 @@
+"""
+Re-resolving `transactions.merchant_id` after the merchant dictionary changes.
+
+New and edited transactions are resolved on write (application/merchants.py);
+rows written before an alias existed keep their old merchant_id until the
+`normalize_vendors` job runs this backfill. It walks the table in id order
+(keyset chunks, one commit each) and only updates rows whose merchant changes,
+with one UPDATE per (chunk, merchant).
+"""
+
+import logging
+from collections import defaultdict
+from sqlalchemy import select, update, func
+from application.merchants import dictionary
+from application.sharding import shard_sessions, for_each_shard
+from ..models.models import Transaction
+from ..models.model_utils import bump_data_versions
+
+logger = logging.getLogger("application.services.merchants")
+
+DEFAULT_CHUNK_SIZE = 10_000
+
+
+def detach_merchant(merchant_id: int):
+    """Clear merchant_id on every transaction of a merchant about to be deleted; returns the row count."""
+    txns = Transaction.__table__
+    detached, owners = 0, set()
+    for session in shard_sessions():
+        owners.update(session.scalars(select(txns.c.user_id.distinct()).where(txns.c.merchant_id == merchant_id)))
+        detached += session.execute(
+            update(txns).where(txns.c.merchant_id == merchant_id).values(merchant_id=None)
+        ).rowcount
+        session.commit()
+    bump_data_versions(owners)
+    return detached
+
+
+def renormalize_transactions(chunk_size: int = DEFAULT_CHUNK_SIZE, on_progress=None):
+    """Re-match every transaction's vendor; returns {"scanned", "updated"}."""
+    # this process may hold a matcher built less than MERCHANT_RELOAD_SECONDS ago,
+    # i.e. before the alias change that queued this job: always rebuild
+    dictionary.invalidate()
+    matcher = dictionary.current()
+    if matcher is None:
+        raise RuntimeError("merchant dictionary is not configured (init_merchants)")
+    txns = Transaction.__table__
+    scanned = updated = 0
+    total = sum(for_each_shard(lambda session: session.scalar(select(func.count()).select_from(txns))))
+
+    for session in shard_sessions():
+        last_id = 0
+        while True:
+            rows = session.execute(
+                select(txns.c.id, txns.c.user_id, txns.c.vendor, txns.c.merchant_id)
+                .where(txns.c.id > last_id).order_by(txns.c.id).limit(chunk_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+            changes, owners = defaultdict(list), set()
+            for row in rows:
+                merchant_id = matcher.match(row.vendor)
+                if merchant_id != row.merchant_id:
+                    changes[merchant_id].append(row.id)
+                    owners.add(row.user_id)
+            for merchant_id, ids in changes.items():
+                session.execute(update(txns).where(txns.c.id.in_(ids)).values(merchant_id=merchant_id))
+            session.commit()
+            bump_data_versions(owners)
+            scanned += len(rows)
+            updated += sum(len(ids) for ids in changes.values())
+            if on_progress is not None:
+                on_progress(scanned, total)
+    logger.info("merchant backfill: %d rows scanned, %d updated", scanned, updated)
+    return {"scanned": scanned, "updated": updated}
@@ -0,0 +1,152 @@
+"""
+Receipt attachments: streamed upload into the content-addressed store,
+thumbnails rendered by the worker, reference-counted deletion.
+
+Upload path (request thread): sniff the file type from the first chunk (the
+client's Content-Type and file name are not trusted), stream the rest to disk
+through `receipts.upload()`, insert the Receipt row and, for images
+without a thumbnail yet, enqueue a `receipt_thumbnail` job. Decoding and
+resizing images happens in worker.py's process pool, never in the request.
+
+Thumbnails are derived from the content, so they are content-addressed too:
+a re-uploaded image is "ready" immediately.
+
+`Pillow` is an optional dependency, imported by the thumbnail job only.
+"""
+
+import io
+import logging
+from sqlalchemy import select, delete, update
+from application.database import db
+from application.storage import receipts
+from application.jobs import enqueue
+from ..models.models import Receipt
+
+logger = logging.getLogger("application.services.receipts")
+
+THUMBNAIL_SUFFIX = ".thumb.jpg"
+
+# (magic prefix, content type, file extensions)
+_SIGNATURES = [
+    (b"\x89PNG\r\n\x1a\n", "image/png", {"png"}),
+    (b"\xff\xd8\xff", "image/jpeg", {"jpg", "jpeg"}),
+    (b"GIF87a", "image/gif", {"gif"}),
+    (b"GIF89a", "image/gif", {"gif"}),
+    (b"%PDF-", "application/pdf", {"pdf"}),
+]
+
+
+def sniff_content_type(head: bytes):
+    """(content type, extensions) recognised from the first bytes of a file, or (None, set())."""
+    for magic, content_type, extensions in _SIGNATURES:
+        if head.startswith(magic):
+            return content_type, extensions
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp", {"webp"}
+    return None, set()
+
+
+def save_receipt(user_id: int, transaction_id: int, stream, filename: str = None,
+                 allowed_extensions=None, max_bytes: int = None):
+    """
+    Store an uploaded receipt for a transaction. Returns (receipt, created);
+    uploading the same file to the same transaction again returns the existing row.
+    Raises ValueError for unsupported files, storage.UploadTooLarge past max_bytes.
+    """
+    head = stream.read(receipts.chunk_size)
+    content_type, extensions = sniff_content_type(head)
+    if allowed_extensions is not None:
+        extensions &= set(allowed_extensions)
+    if not extensions:
+        raise ValueError("unsupported file type")
+    if filename and "." in filename and filename.rsplit(".", 1)[1].lower() not in extensions:
+        raise ValueError(f"file name does not match its content ({content_type})")
+
+    # the row is committed inside upload(): a concurrent delete of the file's
+    # last reference cannot leave this receipt pointing at nothing
+    with receipts.upload(stream, max_bytes=max_bytes, first_chunk=head) as (digest, size, created):
+        existing = Receipt.query.filter_by(transaction_id=transaction_id, sha256=digest).first()
+        if existing is not None:
+            return existing, False
+
+        if not content_type.startswith("image/"):
+            status = "none"
+        elif receipts.exists(digest, THUMBNAIL_SUFFIX):
+            status = "ready"
+        else:
+            status = "pending"
+        receipt = Receipt(user_id=user_id, transaction_id=transaction_id, sha256=digest, size=size,
+                          content_type=content_type, filename=(filename or None) and filename[:255],
+                          thumbnail_status=status)
+        # one job per file: a pending receipt with the same content already has one queued
+        if status == "pending" and not Receipt.query.filter_by(sha256=digest, thumbnail_status="pending").first():
+            enqueue("receipt_thumbnail", {"sha256": digest}, user_id=user_id, commit=False)
+        db.session.add(receipt)
+        db.session.commit()
+    logger.info("receipt %s for transaction %s: %d bytes, %s", digest[:12], transaction_id, size,
+                "stored" if created else "deduplicated")
+    return receipt, True
+
+
+def delete_receipts(rows):
+    """Delete Receipt rows and every stored file no other receipt references. Returns the count."""
+    if not rows:
+        return 0
+    digests = {r.sha256 for r in rows}
+    table = Receipt.__table__
+    db.session.execute(delete(table).where(table.c.id.in_([r.id for r in rows])))
+    db.session.commit()
+    still_used = set(db.session.scalars(select(table.c.sha256).where(table.c.sha256.in_(digests))))
+    db.session.commit()
+    for digest in digests - still_used:
+        # re-checked with the file moved aside: an upload may have referenced it meanwhile
+        receipts.delete(digest, THUMBNAIL_SUFFIX, keep_if=lambda d=digest: _referenced(d))
+    return len(rows)
+
+
+def _referenced(digest):
+    table = Receipt.__table__
+    found = db.session.scalar(select(table.c.id).where(table.c.sha256 == digest).limit(1)) is not None
+    db.session.commit()  # end the read: the next check must see newly committed rows
+    return found
+
+
+def _require_pillow():
+    try:
+        from PIL import Image
+    except ImportError as e:
+        raise RuntimeError("Receipt thumbnails require Pillow (pip install Pillow)") from e
+    return Image
+
+
+def render_thumbnail(digest: str, max_side: int = 320, quality: int = 80) -> int:
+    """Write the JPEG thumbnail of stored image `digest`; returns its size in bytes."""
+    Image = _require_pillow()
+    with Image.open(receipts.path(digest)) as img:
+        # JPEG: let the decoder downscale by a power of two instead of decoding full size
+        img.draft("RGB", (max_side, max_side))
+        img.thumbnail((max_side, max_side))
+        thumb = img if img.mode in ("RGB", "L") else img.convert("RGB")
+        buf = io.BytesIO()
+        thumb.save(buf, "JPEG", quality=quality, optimize=True)
+    receipts.write_derived(digest, THUMBNAIL_SUFFIX, buf.getvalue())
+    return buf.tell()
+
+
+def generate_thumbnail(digest: str, max_side: int = 320):
+    """Render the thumbnail and update every receipt sharing the file. Returns the job result."""
+    try:
+        size = render_thumbnail(digest, max_side) if not receipts.exists(digest, THUMBNAIL_SUFFIX) else None
+        status, result = "ready", {"sha256": digest, "status": "ready", "bytes": size}
+    except FileNotFoundError:
+        # every receipt with this content was deleted before the job ran
+        return {"sha256": digest, "status": "gone"}
+    except Exception as e:
+        # unreadable image or Pillow missing: retrying will not help
+        logger.warning("thumbnail for %s failed: %s", digest[:12], e)
+        status, result = "failed", {"sha256": digest, "status": "failed", "error": str(e)}
+    table = Receipt.__table__
+    db.session.execute(update(table).where(table.c.sha256 == digest, table.c.thumbnail_status == "pending")
+                       .values(thumbnail_status=status))
+    db.session.commit()
+    return result
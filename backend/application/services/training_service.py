@@ -0,0 +1,377 @@
+"""
+Training pipeline for the transaction categorizer (application/categorizer.py).
+
+One run (the `train_categorizer` job, enqueued daily by worker.py) produces:
+- a new version of the global model ("categorizer", labels = category names),
+- new versions of the per-user personalization layers ("categorizer-user",
+  owner_id = user, labels = that user's category ids) for users with new rows.
+Each version is an MLModel row; meta_data records the mode, the watermark of
+the last row learned, row counts, edit drift and metrics.
+
+Scaling:
+- rows are streamed from the database in ML_TRAIN_CHUNK_SIZE chunks (server-side
+  `yield_per`, one shard after another), never loaded whole;
+- incremental runs read the previous artifact and only stream rows *created*
+  past its (created_at, id) watermark, so no row is ever learned twice. A run
+  only reads rows created before its start minus SYNC_SETTLE_SECONDS: a row
+  flushed just before that may commit after the run has read past it, and
+  would then land behind the watermark for good.
+  Edits to rows a version already learned (category, note, amount, soft delete)
+  cannot be retracted from the counts: they are drift. Each run counts the rows
+  edited since the previous run (`trained_at`); once the edits since the last
+  full run exceed ML_MAX_EDITED_FRACTION of the model's rows, or every
+  ML_FULL_RETRAIN_EVERY incremental versions, or with full=True, the model is
+  rebuilt from scratch;
+- per-user layers are independent, so they are trained on a process pool
+  (ML_TRAIN_PROCESSES, spawned processes with their own app and engine).
+  Workers only write artifact files; the MLModel rows are inserted by the caller.
+
+Metric: prequential accuracy. Every 10th row is predicted by the model as it
+stood before learning that row ("test, then train"), which needs no held-out
+data and also works for incremental updates.
+"""
+
+import logging
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from sqlalchemy import select, func, and_, or_
+from application.database import db
+from application.categorizer import NaiveBayesCategorizer, features, read_model, load_model
+from application.sharding import use_shard, shard_sessions, for_each_shard
+from ..models.models import Transaction, Category, MLModel
+
+logger = logging.getLogger("application.services.training")
+
+GLOBAL_MODEL = "categorizer"
+USER_MODEL = "categorizer-user"
+EVAL_EVERY = 10
+
+
+def _versions(name, owner_id=None):
+    owner = MLModel.owner_id.is_(None) if owner_id is None else MLModel.owner_id == owner_id
+    return MLModel.query.filter(MLModel.name == name, owner).order_by(MLModel.id.desc())
+
+
+def latest_model(name, owner_id=None):
+    return _versions(name, owner_id).first()
+
+
+def _learned_before(since):
+    """Rows at or below a (created_at, id) watermark."""
+    ts, last_id = since
+    return or_(Transaction.created_at < ts, and_(Transaction.created_at == ts, Transaction.id <= last_id))
+
+
+def _labeled_rows(user_id=None, since=None, until=None):
+    """
+    Categorized, live transactions, optionally for one user, created past a
+    (created_at, id) watermark and created before `until`.
+    """
+    stmt = (
+        select(Transaction.id, Transaction.user_id, Transaction.vendor, Transaction.note, Transaction.amount,
+               Transaction.created_at, Transaction.category_id, Category.name)
+        .join(Category, Transaction.category_id == Category.id)
+        .where(Transaction.is_deleted.is_(False))
+    )
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    if since is not None:
+        stmt = stmt.where(~_learned_before(since))
+    if until is not None:
+        stmt = stmt.where(Transaction.created_at < until)
+    return stmt
+
+
+def _edited_rows(since, trained_at, user_id=None):
+    """Count of rows a version learned (at or below `since`) that were edited after its run started."""
+    stmt = (select(func.count()).select_from(Transaction)
+            .where(_learned_before(since), Transaction.updated_at > trained_at))
+    if user_id is not None:
+        stmt = stmt.where(Transaction.user_id == user_id)
+    return stmt
+
+
+def _stream(stmt, sessions, chunk_size):
+    for session in sessions:
+        result = session.execute(stmt.execution_options(yield_per=chunk_size))
+        try:
+            yield from result.partitions()
+        finally:
+            result.close()
+
+
+def _fit_stream(model, batches, label_of, on_batch=None):
+    """partial_fit over the streamed chunks with prequential evaluation; returns run statistics."""
+    learned = evaluated = correct = 0
+    watermark = None
+    users = Counter()
+    for batch in batches:
+        for row in batch:
+            tokens = features(row.vendor, row.note, row.amount)
+            label = label_of(row)
+            if row.id % EVAL_EVERY == 0 and model.rows:
+                evaluated += 1
+                correct += model.predict(tokens) == label
+            learned += model.partial_fit([(tokens, label)])
+            if watermark is None or (row.created_at, row.id) > watermark:
+                watermark = (row.created_at, row.id)
+            users[row.user_id] += 1
+        if on_batch is not None:
+            on_batch(learned)
+    return {
+        "rows": learned,
+        "watermark": watermark,
+        "users": users,
+        "metrics": {"prequential_accuracy": round(correct / evaluated, 4) if evaluated else None,
+                    "evaluated": evaluated},
+    }
+
+
+def _plan(path, meta, full, full_every, max_edited, count_edited):
+    """
+    (model to continue, watermark, versions since the last full run, edits since
+    the last full run) for the next version. `count_edited(since, trained_at)`
+    counts the previous version's rows edited after it was trained.
+    """
+    meta = meta or {}
+    incremental = (not full and path and os.path.isfile(path) and meta.get("trained_through")
+                   and meta.get("trained_at") and meta.get("incremental_since_full", 0) < full_every)
+    if incremental:
+        since = (datetime.fromisoformat(meta["trained_through"]), meta["last_id"])
+        edited = meta.get("edited_since_full", 0) + count_edited(since, datetime.fromisoformat(meta["trained_at"]))
+        if edited <= max_edited * meta.get("rows_total", 0):
+            return read_model(path), since, meta.get("incremental_since_full", 0) + 1, edited
+    return NaiveBayesCategorizer(), None, 0, 0
+
+
+def _next_version(previous):
+    return f"v{int(previous.version.lstrip('v')) + 1}" if previous else "v1"
+
+
+def _artifact_path(folder, name, owner_id, version):
+    parts = [folder, name] + ([str(owner_id)] if owner_id is not None else []) + [f"{version}.json.gz"]
+    return os.path.abspath(os.path.join(*parts))
+
+
+def _version_meta(model, stats, since, increments, edited, parent_version, trained_at, seconds):
+    ts, last_id = stats["watermark"] or (since or (None, 0))
+    return {
+        "mode": "incremental" if since else "full",
+        "parent_version": parent_version if since else None,
+        "incremental_since_full": increments,
+        "edited_since_full": edited,
+        "trained_at": trained_at.isoformat(),
+        "trained_through": ts.isoformat() if ts else None,
+        "last_id": last_id,
+        "rows_new": stats["rows"],
+        "rows_total": model.rows,
+        "classes": len(model.label_docs),
+        "metrics": stats["metrics"],
+        "train_seconds": round(seconds, 2),
+    }
+
+
+# --------------------------- Per-user layers (pool processes) ---------------------------
+_app = None
+
+
+def _init_pool_process():
+    """Each pool process builds its own app (and engine), like worker.py's job processes."""
+    global _app
+    from app import app
+    _app = app
+
+
+def _train_user_layer(task):
+    """Runs in a pool process (or inline). Writes the artifact, returns its MLModel fields or None."""
+    if _app is not None:
+        with _app.app_context():
+            return _train_user_layer_in_context(task)
+    return _train_user_layer_in_context(task)
+
+
+def _train_user_layer_in_context(task):
+    started, trained_at = time.monotonic(), datetime.utcnow()
+    user_id = task["user_id"]
+    with use_shard(user_id):
+        model, since, increments, edited = _plan(
+            task["previous_path"], task["previous_meta"], task["full"], task["full_every"], task["max_edited"],
+            lambda since, at: db.session.scalar(_edited_rows(since, at, user_id)),
+        )
+        rows = _labeled_rows(user_id, since, task["settled"])
+        stats = _fit_stream(model, _stream(rows, [db.session], task["chunk_size"]),
+                            lambda row: str(row.category_id))
+        db.session.rollback()  # end the read transaction before the process idles
+    if stats["rows"] == 0 or model.rows < task["min_rows"]:
+        return None
+    model.save(task["path"])
+    stats.pop("users")
+    return {"user_id": user_id, "version": task["version"], "path": task["path"],
+            "meta": _version_meta(model, stats, since, increments, edited, task["parent_version"], trained_at,
+                                  time.monotonic() - started)}
+
+
+def _user_tasks(user_ids, full, chunk_size, min_rows, full_every, max_edited, settled, folder):
+    tasks = []
+    for user_id in sorted(user_ids):
+        previous = latest_model(USER_MODEL, user_id)
+        version = _next_version(previous)
+        tasks.append({
+            "user_id": user_id,
+            "previous_path": previous.artifact_path if previous else None,
+            "previous_meta": previous.meta_data if previous else None,
+            "parent_version": previous.version if previous else None,
+            "full": full,
+            "full_every": full_every,
+            "max_edited": max_edited,
+            "settled": settled,
+            "version": version,
+            "path": _artifact_path(folder, USER_MODEL, user_id, version),
+            "chunk_size": chunk_size,
+            "min_rows": min_rows,
+        })
+    return tasks
+
+
+def _run_tasks(tasks, processes, on_done=None):
+    if processes <= 1 or len(tasks) <= 1:
+        results = []
+        for task in tasks:
+            results.append(_train_user_layer(task))
+            if on_done is not None:
+                on_done(len(results))
+        return results
+    # spawn, not fork: a forked child would share the parent's SQLite connections
+    with ProcessPoolExecutor(max_workers=min(processes, len(tasks)),
+                             mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_pool_process) as pool:
+        results = []
+        for result in pool.map(_train_user_layer, tasks):
+            results.append(result)
+            if on_done is not None:
+                on_done(len(results))
+        return results
+
+
+def _users_with_rows(min_rows):
+    """Users with at least `min_rows` categorized transactions (candidates for a first / full layer)."""
+    def counts(session):
+        return session.execute(
+            select(Transaction.user_id).where(Transaction.is_deleted.is_(False), Transaction.category_id.isnot(None))
+            .group_by(Transaction.user_id).having(func.count() >= min_rows)
+        ).scalars().all()
+    return {user_id for part in for_each_shard(counts) for user_id in part}
+
+
+def _prune(name, owner_ids, keep):
+    """Keep the newest `keep` versions per (name, owner); older rows and their artifacts go."""
+    for owner_id in owner_ids:
+        for row in _versions(name, owner_id).offset(keep).all():
+            if row.artifact_path and os.path.isfile(row.artifact_path):
+                os.remove(row.artifact_path)
+            db.session.delete(row)
+    db.session.commit()
+
+
+# --------------------------- Entry point ---------------------------
+def train_categorizer(folder, full: bool = False, chunk_size: int = 20_000, processes: int = 2,
+                      min_user_rows: int = 50, full_every: int = 10, max_edited: float = 0.05,
+                      settle_seconds: float = 5, keep_versions: int = 3, on_progress=None):
+    """
+    Train the next global version and the affected per-user layers.
+    `on_progress(fraction, message)` reports the two phases. Returns the job result.
+    """
+    report = lambda frac, msg: on_progress(frac, msg) if on_progress is not None else None
+    started, trained_at = time.monotonic(), datetime.utcnow()
+    settled = trained_at - timedelta(seconds=settle_seconds)
+
+    previous = latest_model(GLOBAL_MODEL)
+    model, since, increments, edited = _plan(
+        previous and previous.artifact_path, previous and previous.meta_data, full, full_every, max_edited,
+        lambda since, at: sum(for_each_shard(lambda s: s.scalar(_edited_rows(since, at)))),
+    )
+    stmt = _labeled_rows(since=since, until=settled)
+    total = sum(for_each_shard(lambda s: s.scalar(select(func.count()).select_from(stmt.subquery()))))
+    report(0.0, f"global model: {total} rows ({'incremental' if since else 'full'})")
+    stats = _fit_stream(model, _stream(stmt, shard_sessions(), chunk_size), lambda row: row.name,
+                        lambda done: report(0.5 * done / total if total else 0.5, f"global model: {done}/{total} rows"))
+
+    result = {"global": None, "users": {"trained": 0, "unchanged": 0}}
+    if stats["rows"]:
+        version = _next_version(previous)
+        path = model.save(_artifact_path(folder, GLOBAL_MODEL, None, version))
+        meta = _version_meta(model, stats, since, increments, edited, previous and previous.version, trained_at,
+                             time.monotonic() - started)
+        db.session.add(MLModel(name=GLOBAL_MODEL, version=version, artifact_path=path, meta_data=meta,
+                               description="Transaction categorizer (global, labels are category names)"))
+        db.session.commit()
+        result["global"] = {"version": version, **{k: meta[k] for k in ("mode", "rows_new", "rows_total", "metrics")}}
+
+    # incremental: only users with new rows; full: everyone with enough data
+    user_ids = _users_with_rows(min_user_rows) if not since else set(stats["users"])
+    tasks = _user_tasks(user_ids, full or not since, chunk_size, min_user_rows, full_every, max_edited, settled,
+                        folder)
+    report(0.5, f"user layers: {len(tasks)} users")
+    results = _run_tasks(tasks, processes,
+                         lambda done: report(0.5 + 0.5 * done / len(tasks), f"user layers: {done}/{len(tasks)}"))
+    for trained in filter(None, results):
+        db.session.add(MLModel(name=USER_MODEL, version=trained["version"], owner_id=trained["user_id"],
+                               artifact_path=trained["path"], meta_data=trained["meta"],
+                               description="Transaction categorizer personalization layer (labels are category ids)"))
+    db.session.commit()
+    result["users"]["trained"] = sum(1 for r in results if r)
+    result["users"]["unchanged"] = len(results) - result["users"]["trained"]
+
+    _prune(GLOBAL_MODEL, [None], keep_versions)
+    _prune(USER_MODEL, [r["user_id"] for r in results if r], keep_versions)
+    result["seconds"] = round(time.monotonic() - started, 2)
+    logger.info("categorizer training: %s", result)
+    return result
+
+
+# --------------------------- Predictions ---------------------------
+def _probabilities(scores):
+    if not scores:
+        return {}
+    top = max(scores.values())
+    weights = {label: 2.718281828459045 ** (score - top) for label, score in scores.items()}
+    total = sum(weights.values())
+    return {label: w / total for label, w in weights.items()}
+
+
+def suggest_categories(user_id: int, vendor=None, note=None, amount=None, limit: int = 3,
+                       personal_weight: float = 0.6):
+    """
+    Ranked [{"category_id", "category", "probability"}] among the user's categories
+    (own + global): the global model's and the user's layer's probabilities, mixed.
+    """
+    with use_shard(user_id):
+        categories = db.session.execute(
+            select(Category.id, Category.name, Category.user_id)
+            .where(or_(Category.user_id == user_id, Category.user_id.is_(None)))
+        ).all()
+    if not categories:
+        return []
+    by_name = {}
+    for row in sorted(categories, key=lambda r: r.user_id is None):  # own categories shadow global ones
+        by_name.setdefault(row.name, row.id)
+    names = {cid: name for name, cid in by_name.items()}
+    tokens = features(vendor, note, amount)
+
+    mixed = Counter()
+    global_row, user_row = latest_model(GLOBAL_MODEL), latest_model(USER_MODEL, user_id)
+    weight = personal_weight if user_row else 0.0
+    if global_row and (1 - weight) > 0:
+        probs = _probabilities(load_model(global_row.artifact_path).scores(tokens, labels=set(by_name)))
+        for name, p in probs.items():
+            mixed[by_name[name]] += (1 - weight) * p
+    if user_row:
+        probs = _probabilities(load_model(user_row.artifact_path).scores(tokens, labels={str(c) for c in names}))
+        for label, p in probs.items():
+            mixed[int(label)] += weight * p
+    return [{"category_id": cid, "category": names[cid], "probability": round(p, 4)}
+            for cid, p in mixed.most_common(limit)]
@@ -0,0 +1,121 @@
+"""
+Deletion of a user and everything they own, in small set-based chunks.
+
+`db.session.delete(user)` cascades through the ORM: every transaction and
+category is loaded and deleted one row at a time inside one long write
+transaction, which holds the SQLite write lock for minutes on a heavy user.
+Here each table is emptied with `DELETE ... WHERE id IN (<chunk of ids>)`,
+committing after every chunk so other writers get the lock in between.
+
+The API deactivates the account (is_active = False, all tokens revoked) and
+enqueues the `delete_user` job, which calls `purge_user`. Purging is
+idempotent: a retried job continues where the previous attempt stopped.
+
+What happens to rows referencing the user:
+- transactions (and their tags), categories, receipts (and their files, when unreferenced),
+  ML models, refresh / blocklist / reset tokens: deleted
+- audit log entries and jobs: kept, with the reference set to NULL
+"""
+
+import os
+import logging
+from sqlalchemy import select, delete, update, func
+from application.database import db
+from application.cache import cache, user_key, category_key
+from application.sharding import use_shard
+from .receipt_service import delete_receipts
+from ..models.models import (User, Transaction, TransactionTag, Category, MLModel, RefreshToken,
+                             TokenBlocklist, PasswordResetToken, AuditLog, Job, Receipt)
+
+logger = logging.getLogger("application.services.user_deletion")
+
+DEFAULT_CHUNK_SIZE = 5_000
+
+
+def _delete_in_chunks(table, owner_column, user_id, chunk_size, on_chunk=None):
+    """Delete the rows of `table` owned by `user_id`, one committed chunk at a time."""
+    deleted = 0
+    while True:
+        ids = db.session.scalars(
+            select(table.c.id).where(owner_column == user_id).limit(chunk_size)
+        ).all()
+        if not ids:
+            return deleted
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+        if on_chunk is not None:
+            on_chunk(len(ids))
+
+
+def _detach_in_chunks(table, owner_column, user_id, chunk_size):
+    """Set the reference to `user_id` to NULL, one committed chunk at a time."""
+    detached = 0
+    while True:
+        ids = db.session.scalars(
+            select(table.c.id).where(owner_column == user_id).limit(chunk_size)
+        ).all()
+        if not ids:
+            return detached
+        db.session.execute(update(table).where(table.c.id.in_(ids)).values({owner_column.key: None}))
+        db.session.commit()
+        detached += len(ids)
+
+
+def count_owned_rows(user_id: int) -> int:
+    """Transactions + categories still to delete (drives the job's progress)."""
+    with use_shard(user_id):
+        return sum(
+            db.session.scalar(select(func.count()).select_from(table).where(table.c.user_id == user_id))
+            for table in (Transaction.__table__, Category.__table__)
+        )
+
+
+def purge_user(user_id: int, chunk_size: int = DEFAULT_CHUNK_SIZE, on_progress=None):
+    """
+    Delete `user_id` and its data. Returns per-table counts.
+    `on_progress(rows_done)` is called after every transaction / category chunk.
+    """
+    counts = {}
+    done = 0
+
+    def advance(n):
+        nonlocal done
+        done += n
+        if on_progress is not None:
+            on_progress(done)
+
+    txns, cats, tags = Transaction.__table__, Category.__table__, TransactionTag.__table__
+    with use_shard(user_id):
+        counts["transaction_tags"] = _delete_in_chunks(tags, tags.c.user_id, user_id, chunk_size)
+        counts["transactions"] = _delete_in_chunks(txns, txns.c.user_id, user_id, chunk_size, advance)
+        names = db.session.scalars(select(cats.c.name).where(cats.c.user_id == user_id)).all()
+        counts["categories"] = _delete_in_chunks(cats, cats.c.user_id, user_id, chunk_size, advance)
+    for name in names:
+        cache.delete(category_key(user_id, name))
+
+    counts["receipts"] = 0
+    while True:
+        batch = Receipt.query.filter_by(user_id=user_id).limit(chunk_size).all()
+        if not batch:
+            break
+        counts["receipts"] += delete_receipts(batch)
+
+    models = MLModel.__table__
+    for path in db.session.scalars(select(models.c.artifact_path).where(models.c.owner_id == user_id)):
+        if path and os.path.isfile(path):
+            os.remove(path)
+    counts["ml_models"] = _delete_in_chunks(models, models.c.owner_id, user_id, chunk_size)
+
+    for table in (RefreshToken.__table__, TokenBlocklist.__table__, PasswordResetToken.__table__):
+        counts[table.name] = _delete_in_chunks(table, table.c.user_id, user_id, chunk_size)
+    counts["audit_logs_detached"] = _detach_in_chunks(AuditLog.__table__, AuditLog.__table__.c.actor_id,
+                                                      user_id, chunk_size)
+    counts["jobs_detached"] = _detach_in_chunks(Job.__table__, Job.__table__.c.user_id, user_id, chunk_size)
+
+    users = User.__table__
+    counts["users"] = db.session.execute(delete(users).where(users.c.id == user_id)).rowcount
+    db.session.commit()
+    cache.delete(user_key(user_id))
+    logger.info("purged user %s: %s", user_id, counts)
+    return counts
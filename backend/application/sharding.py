@@ -0,0 +1,262 @@
+"""
+Optional per-user sharding of transactions and categories across SQLite files.
+
+With SHARD_URIS set (N database URIs), `transactions`, `categories` and
+`transaction_tags` rows live in shard `user_id % N`; users, tokens, jobs, audit
+logs etc. stay on the primary.
+Writers to different shards no longer contend on one SQLite file lock.
+
+Routing happens in the session layer (RoutingSession in application/database.py):
+- flushes go to the shard of each instance (its user_id),
+- loaded rows remember their shard (identity token), so refreshes and lazy
+  loads return to it,
+- other statements on sharded tables go to the shard picked by `use_shard(...)`,
+  or else to the authenticated user's shard; without either they fail loudly
+  (ShardRoutingError) instead of silently reading the wrong file,
+- admin / global reads use `for_each_shard()` (parallel, one session per shard)
+  and merge the results.
+
+Ids stay globally unique: shard k allocates ids from (k + 1) * SHARD_ID_RANGE
+(SQLite AUTOINCREMENT seeded per shard), so an id alone names its shard. Global
+categories (user_id NULL) are copied to every shard under one id below
+SHARD_ID_RANGE, keeping transaction -> category joins shard-local.
+
+Caveats: a commit touching several shards is not atomic across them. Alembic
+manages the primary only; shard schemas are brought up to the models at
+startup (`create_schema`): create_all for missing tables, then ALTER TABLE ADD
+COLUMN / CREATE INDEX for columns and indexes added to the models later.
+Column changes other than additions (type changes, drops) need a manual step.
+
+Config keys:
+- SHARD_URIS               list of database URIs (default empty: sharding off)
+- SHARD_ENGINE_OPTIONS     create_engine kwargs for the shard engines
+"""
+
+import heapq
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from flask import request, has_request_context
+from sqlalchemy import MetaData, create_engine, inspect, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+from sqlalchemy.sql.util import find_tables
+
+logger = logging.getLogger("application.sharding")
+
+SHARDED_TABLES = frozenset({"transactions", "categories", "transaction_tags"})
+SHARD_ID_RANGE = 10 ** 12
+
+_shard_override = ContextVar("shard_override", default=None)
+
+
+class ShardRoutingError(RuntimeError):
+    """A statement on a sharded table ran with no way to tell which shard it belongs to."""
+
+
+class ShardSet:
+    def __init__(self):
+        self.engines = {}
+        self.names = []
+        self._executor = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.engines)
+
+    def configure(self, uris, engine_options=None):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+        for uri in uris:
+            if not uri.startswith("sqlite"):
+                raise ValueError(f"SHARD_URIS must be SQLite URIs, got {uri!r}")
+        self.names = [f"shard{i}" for i in range(len(uris))]
+        self.engines = {name: create_engine(uri, **(engine_options or {})) for name, uri in zip(self.names, uris)}
+        self._executor = ThreadPoolExecutor(max_workers=len(uris), thread_name_prefix="shard") if uris else None
+
+    def name_for_user(self, user_id) -> str:
+        return self.names[int(user_id) % len(self.names)]
+
+    def name_for_id(self, row_id):
+        """Shard owning a transaction / per-user category id, or None if the id is not a shard id."""
+        index = int(row_id) // SHARD_ID_RANGE - 1
+        return self.names[index] if 0 <= index < len(self.names) else None
+
+    def create_schema(self, tables):
+        """Create the sharded tables on every shard, with ids seeded to the shard's range."""
+        for index, name in enumerate(self.names):
+            metadata = MetaData()
+            for table in tables:
+                copy = table.to_metadata(metadata)
+                # users live on the primary: drop foreign keys that point off-shard
+                for fk in list(copy.foreign_key_constraints):
+                    if fk.elements[0].target_fullname.split(".")[0] not in SHARDED_TABLES:
+                        copy.constraints.discard(fk)
+                        for element in fk.elements:
+                            copy.foreign_keys.discard(element)
+                            element.parent.foreign_keys.discard(element)
+                copy.dialect_options["sqlite"]["autoincrement"] = True
+            engine = self.engines[name]
+            metadata.create_all(engine)
+            with engine.begin() as conn:
+                for table in metadata.sorted_tables:
+                    _add_missing_columns(conn, table, name)
+                base = (index + 1) * SHARD_ID_RANGE
+                for table in tables:
+                    seeded = conn.execute(text("SELECT 1 FROM sqlite_sequence WHERE name = :n"), {"n": table.name}).first()
+                    if seeded is None:
+                        conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:n, :s)"),
+                                     {"n": table.name, "s": base})
+
+    def map(self, fn):
+        """Run fn(name, engine) on every shard in parallel; results in shard order."""
+        return list(self._executor.map(lambda name: fn(name, self.engines[name]), self.names))
+
+
+def _add_missing_columns(conn, table, shard_name):
+    """
+    Bring an existing shard table up to the model: add columns and indexes that
+    create_all skipped because the table already existed.
+    """
+    existing = {column["name"] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in existing:
+            continue
+        if column.primary_key or (not column.nullable and column.server_default is None):
+            raise RuntimeError(f"{shard_name}: cannot add column {table.name}.{column.name} automatically "
+                               "(primary key, or NOT NULL without a server default); migrate this shard by hand")
+        ddl = CreateColumn(column).compile(dialect=conn.dialect)
+        try:
+            conn.execute(text(f"ALTER TABLE {conn.dialect.identifier_preparer.format_table(table)} ADD COLUMN {ddl}"))
+        except OperationalError as e:
+            if "duplicate column" not in str(e):  # another process starting up added it first
+                raise
+        logger.info("%s: added column %s.%s", shard_name, table.name, column.name)
+    indexes = {index["name"] for index in inspect(conn).get_indexes(table.name)}
+    for index in table.indexes:
+        if index.name not in indexes:
+            index.create(conn, checkfirst=True)
+            logger.info("%s: created index %s", shard_name, index.name)
+
+
+shards = ShardSet()
+
+
+# --------------------------- Routing helpers ---------------------------
+def touches_shards(mapper=None, clause=None) -> bool:
+    if mapper is not None:
+        return inspect(mapper).local_table.name in SHARDED_TABLES
+    if clause is not None:
+        return any(t.name in SHARDED_TABLES for t in find_tables(clause, include_crud=True))
+    return False
+
+
+def current_shard() -> str:
+    """Shard for statements that do not carry one: use_shard() block, else the authenticated user's."""
+    name = _shard_override.get()
+    if name is not None:
+        return name
+    if has_request_context() and getattr(request, "user", None) is not None:
+        return shards.name_for_user(request.user.id)
+    raise ShardRoutingError("No shard for this statement: wrap it in use_shard(...) or use for_each_shard()")
+
+
+def shard_for_instance(instance) -> str:
+    """Shard of a mapped instance being flushed; remembered on its state as the identity token."""
+    state = inspect(instance)
+    if state.key is not None and state.key[2] is not None:
+        return state.key[2]
+    if state.identity_token is not None:
+        return state.identity_token
+    user_id = getattr(instance, "user_id", None)
+    if user_id is None:
+        raise ShardRoutingError("Global categories are replicated to every shard; create them with get_or_create_categories()")
+    state.identity_token = shards.name_for_user(user_id)
+    return state.identity_token
+
+
+def shard_for_row_id(row_id) -> str:
+    """Shard to read a row of a sharded table from by its id; global categories are on every shard."""
+    return shards.name_for_id(row_id) or shards.names[0]
+
+
+def shard_for_lazy_load(state):
+    """Lazy loads follow their parent: its shard token, or the shard of the user it belongs to."""
+    if state.key is not None and state.key[2] is not None:
+        return state.key[2]
+    obj = state.obj()
+    if obj is None:
+        return None
+    if state.mapper.local_table.name == "users":
+        return shards.name_for_user(obj.id)
+    user_id = getattr(obj, "user_id", None)
+    return shards.name_for_user(user_id) if user_id is not None else None
+
+
+@contextmanager
+def use_shard(user_id=None, *, name=None, row_id=None):
+    """
+    Send sharded-table statements in the block to the shard of `user_id`, the
+    shard named `name`, or the shard encoded in `row_id`. No-op when sharding
+    is off or no target is given.
+    """
+    if shards.enabled and name is None:
+        if user_id is not None:
+            name = shards.name_for_user(user_id)
+        elif row_id is not None:
+            name = shards.name_for_id(row_id)
+            if name is None:
+                raise ShardRoutingError(f"id {row_id} does not belong to any shard")
+    if not shards.enabled or name is None:
+        yield
+        return
+    token = _shard_override.set(name)
+    try:
+        yield
+    finally:
+        _shard_override.reset(token)
+
+
+# --------------------------- Fan-out ---------------------------
+def for_each_shard(fn):
+    """
+    Call fn(session) once per shard in parallel (each with its own plain
+    session bound to that shard) and return the results in shard order.
+    With sharding off: [fn(db.session)]. fn must not rely on the request context.
+    """
+    if not shards.enabled:
+        from .database import db
+        return [fn(db.session)]
+
+    def run(name, engine):
+        with Session(bind=engine) as session:
+            return fn(session)
+
+    return shards.map(run)
+
+
+def shard_sessions():
+    """Yield one session per shard, one after another (db.session when sharding is off)."""
+    if not shards.enabled:
+        from .database import db
+        yield db.session
+        return
+    for name in shards.names:
+        with Session(bind=shards.engines[name]) as session:
+            yield session
+
+
+def merge_sorted(results, key, reverse=False):
+    """Merge per-shard lists that are each already sorted by `key`."""
+    if len(results) == 1:
+        return list(results[0])
+    return list(heapq.merge(*results, key=key, reverse=reverse))
+
+
+def init_sharding(app, sharded_tables):
+    shards.configure(app.config.get("SHARD_URIS") or [], app.config.get("SHARD_ENGINE_OPTIONS"))
+    if shards.enabled:
+        shards.create_schema(sharded_tables)
+    return shards
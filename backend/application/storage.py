@@ -0,0 +1,158 @@
+"""
+Content-addressed file storage for uploads (receipts).
+
+A file is stored once under the SHA-256 of its bytes:
+
+    <root>/ab/cd/abcd1234...            the original
+    <root>/ab/cd/abcd1234....thumb.jpg  derived files (thumbnails) next to it
+
+so uploading the same receipt twice, or attaching one PDF to several
+transactions, costs one copy on disk. Uploads are streamed: `save_stream()`
+reads the request body in chunks, hashing and writing each chunk to a
+temporary file in the same directory tree, and only then links it into
+place (atomic; a concurrent upload of the same content just finds the file
+already there). Nothing holds a whole upload in memory.
+
+Callers reference files by digest; deleting the last reference is the
+caller's job (see services/receipt_service.py). Deduplication makes that racy:
+an upload may find the file present just before a delete of its last
+reference removes it. Both sides guard against it:
+- `upload()` keeps the uploaded copy (a hard link) until the caller has
+  committed its reference, then puts the file back if it vanished meanwhile,
+- `delete(..., keep_if=)` first moves the file aside, re-checks for new
+  references and moves it back if one appeared.
+
+Config keys:
+- RECEIPT_FOLDER       root directory of the store (default data/receipts)
+- RECEIPT_CHUNK_SIZE   bytes read / written per chunk (default 64 KiB)
+"""
+
+import hashlib
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+class UploadTooLarge(ValueError):
+    """The stream exceeded `max_bytes`; nothing was stored."""
+
+
+class BlobStore:
+    def __init__(self, root=None, chunk_size: int = 64 * 1024):
+        self.root = root
+        self.chunk_size = chunk_size
+
+    def configure(self, root, chunk_size: int = 64 * 1024):
+        self.root = os.path.abspath(root)
+        self.chunk_size = chunk_size
+        os.makedirs(os.path.join(self.root, "tmp"), exist_ok=True)
+
+    def path(self, digest: str, suffix: str = "") -> str:
+        if len(digest) != 64 or not all(c in "0123456789abcdef" for c in digest):
+            raise ValueError("not a sha256 hex digest")
+        return os.path.join(self.root, digest[:2], digest[2:4], digest + suffix)
+
+    def exists(self, digest: str, suffix: str = "") -> bool:
+        return os.path.isfile(self.path(digest, suffix))
+
+    @contextmanager
+    def upload(self, stream, max_bytes: int = None, first_chunk: bytes = b""):
+        """
+        Copy `stream` (file-like with .read(n)) into the store; yields
+        (digest, size, created) where `created` is False if the content was
+        already stored. `first_chunk` is data already read from the stream
+        (e.g. for content sniffing). Raises UploadTooLarge past `max_bytes`.
+
+        Commit the reference to `digest` inside the block: until it ends, the
+        upload's own copy is kept and restores the file if a concurrent delete
+        removed it.
+        """
+        tmp_path, digest, size = self._spool(stream, max_bytes, first_chunk)
+        target = self.path(digest)
+        try:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.link(tmp_path, target)
+                created = True
+            except FileExistsError:
+                created = False
+            yield digest, size, created
+            if not os.path.isfile(target):
+                os.replace(tmp_path, target)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def save_stream(self, stream, max_bytes: int = None, first_chunk: bytes = b""):
+        """upload() for callers without a reference to commit: returns (digest, size, created)."""
+        with self.upload(stream, max_bytes, first_chunk) as result:
+            return result
+
+    def _spool(self, stream, max_bytes, first_chunk):
+        """Write the stream to a temporary file while hashing it: (tmp path, digest, size)."""
+        sha = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        try:
+            with os.fdopen(fd, "wb") as out:
+                chunk = first_chunk or stream.read(self.chunk_size)
+                while chunk:
+                    size += len(chunk)
+                    if max_bytes is not None and size > max_bytes:
+                        raise UploadTooLarge(f"upload exceeds {max_bytes} bytes")
+                    sha.update(chunk)
+                    out.write(chunk)
+                    chunk = stream.read(self.chunk_size)
+            return tmp_path, sha.hexdigest(), size
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def write_derived(self, digest: str, suffix: str, data: bytes):
+        """Atomically store a file derived from `digest` (e.g. a thumbnail)."""
+        target = self.path(digest, suffix)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"))
+        with os.fdopen(fd, "wb") as out:
+            out.write(data)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(tmp_path, target)
+        return target
+
+    def delete(self, digest: str, *suffixes: str, keep_if=None):
+        """
+        Remove the original and the given derived files; missing files are ignored.
+        `keep_if()` is asked again once the original is out of place: if it returns
+        True (a reference appeared meanwhile) the file is put back and kept.
+        Returns True if the file was deleted.
+        """
+        fd, trash = tempfile.mkstemp(dir=os.path.join(self.root, "tmp"), suffix=".deleted")
+        os.close(fd)
+        try:
+            os.replace(self.path(digest), trash)
+        except FileNotFoundError:
+            pass
+        else:
+            if keep_if is not None and keep_if():
+                os.replace(trash, self.path(digest))
+                return False
+        finally:
+            if os.path.exists(trash):
+                os.remove(trash)
+        for suffix in suffixes:
+            try:
+                os.remove(self.path(digest, suffix))
+            except FileNotFoundError:
+                pass
+        return True
+
+
+receipts = BlobStore()
+
+
+def init_storage(app):
+    receipts.configure(
+        app.config["RECEIPT_FOLDER"],
+        chunk_size=app.config.get("RECEIPT_CHUNK_SIZE", 64 * 1024),
+    )
+    return receipts
@@ -0,0 +1,36 @@
+"""
+Transaction tags.
+
+Tags arrive in `Transaction.meta_data["tags"]` (a JSON list of strings), which
+the database cannot index. Every write is mirrored into the `transaction_tags`
+table, one row per (transaction, tag), indexed on (user_id, tag,
+transaction_id): the `tag=` filter becomes an index range scan and tag totals
+a join, instead of parsing every row's JSON.
+
+- ORM writes: an after_insert / after_update / after_delete hook in models.py
+  rewrites the rows on the same connection (same flush, same shard),
+- Core bulk inserts (import) call `tag_rows()` for their own INSERT.
+
+Tags are compared case-insensitively: stored stripped and lower-cased,
+at most MAX_TAG_LENGTH characters.
+"""
+
+MAX_TAG_LENGTH = 64
+
+
+def normalize_tag(tag) -> str:
+    if not isinstance(tag, str):
+        return ""
+    return tag.strip().lower()[:MAX_TAG_LENGTH]
+
+
+def tags_from_meta(meta_data) -> list:
+    """Normalized, de-duplicated tags of a meta_data value (order kept)."""
+    if not isinstance(meta_data, dict) or not isinstance(meta_data.get("tags"), list):
+        return []
+    return [t for t in dict.fromkeys(map(normalize_tag, meta_data["tags"])) if t]
+
+
+def tag_rows(transaction_id, user_id, meta_data) -> list:
+    """transaction_tags rows for one transaction."""
+    return [{"transaction_id": transaction_id, "user_id": user_id, "tag": tag} for tag in tags_from_meta(meta_data)]
@@ -0,0 +1,139 @@
+"""
+Background job handlers (see application/jobs.py).
+
+Each handler receives a JobContext and returns a JSON-serialisable result,
+stored on the job row and in the completion AuditLog entry. Handlers run in
+a worker process inside an app context, so they use db.session as usual.
+"""
+
+import os
+import sqlite3
+from datetime import datetime
+from flask import current_app
+from sqlalchemy.engine import make_url
+from .database import db
+from .jobs import job_handler
+from .audit import apply_retention
+from .models.models import AuditLog
+from .services.export_service import export_transactions_columnar, count_transactions
+from .services.user_deletion_service import purge_user, count_owned_rows
+from .services.merchant_service import renormalize_transactions
+from .services.import_service import backfill_fingerprints
+from .services.receipt_service import generate_thumbnail
+from .services.training_service import train_categorizer as run_categorizer_training
+
+
+def _parse_date(value):
+    return datetime.fromisoformat(value) if value else None
+
+
+@job_handler("export_transactions", concurrency=1, max_attempts=2)
+def export_transactions(ctx):
+    """payload: {"format", "user_id", "start_date", "end_date", "export_id"}"""
+    p = ctx.payload
+    start_date, end_date = _parse_date(p.get("start_date")), _parse_date(p.get("end_date"))
+    out_dir = os.path.join(current_app.config["EXPORT_FOLDER"], p["export_id"])
+
+    total = count_transactions(p.get("user_id"), start_date, end_date) or 0
+    ctx.progress(0.0, f"exporting {total} rows")
+    manifest = export_transactions_columnar(
+        out_dir,
+        fmt=p.get("format", "parquet"),
+        user_id=p.get("user_id"),
+        start_date=start_date,
+        end_date=end_date,
+        batch_size=current_app.config.get("EXPORT_BATCH_SIZE", 50_000),
+        on_batch=lambda written: ctx.progress(written / total if total else 1.0, f"{written}/{total} rows"),
+    )
+    return {"export_id": p["export_id"], "rows": manifest["rows"], "files": len(manifest["files"])}
+
+
+@job_handler("backup_database", concurrency=1, max_attempts=3)
+def backup_database(ctx):
+    """Online, consistent copy of the SQLite database (sqlite3 backup API) into BACKUP_FOLDER."""
+    url = make_url(current_app.config["SQLALCHEMY_DATABASE_URI"])
+    if url.get_backend_name() != "sqlite" or not url.database:
+        raise RuntimeError("backup_database only supports file-based SQLite; use the server's own tooling")
+
+    folder = current_app.config["BACKUP_FOLDER"]
+    os.makedirs(folder, exist_ok=True)
+    target = os.path.join(folder, datetime.utcnow().strftime("database-%Y%m%dT%H%M%S.sqlite3"))
+
+    src = sqlite3.connect(url.database)
+    dst = sqlite3.connect(target)
+    try:
+        with dst:
+            # one step: a stepped copy restarts whenever another connection writes,
+            # which includes this job's own progress updates
+            src.backup(dst, pages=-1)
+    finally:
+        dst.close()
+        src.close()
+    return {"path": target, "bytes": os.path.getsize(target)}
+
+
+@job_handler("audit_retention", concurrency=1, max_attempts=3)
+def audit_retention(ctx):
+    """Move old audit months into their partition tables and drop expired partitions (see audit.py)."""
+    return apply_retention(
+        db.engine,
+        AuditLog.__table__,
+        hot_days=current_app.config.get("AUDIT_HOT_DAYS", 31),
+        retention_days=current_app.config.get("AUDIT_RETENTION_DAYS", 365),
+    )
+
+
+@job_handler("delete_user", concurrency=2, max_attempts=5)
+def delete_user(ctx):
+    """payload: {"user_id"}; the account was already deactivated by the API."""
+    user_id = ctx.payload["user_id"]
+    total = count_owned_rows(user_id)
+    ctx.progress(0.0, f"deleting {total} rows")
+    return purge_user(
+        user_id,
+        chunk_size=current_app.config.get("USER_DELETE_CHUNK_SIZE", 5_000),
+        on_progress=lambda done: ctx.progress(done / total if total else 1.0, f"{done}/{total} rows"),
+    )
+
+
+@job_handler("normalize_vendors", concurrency=1, max_attempts=3)
+def normalize_vendors(ctx):
+    """Re-resolve transactions.merchant_id after the merchant dictionary changed."""
+    return renormalize_transactions(
+        chunk_size=current_app.config.get("MERCHANT_BACKFILL_CHUNK_SIZE", 10_000),
+        on_progress=lambda done, total: ctx.progress(done / total if total else 1.0, f"{done}/{total} rows"),
+    )
+
+
+@job_handler("fingerprint_transactions", concurrency=1, max_attempts=3)
+def fingerprint_transactions(ctx):
+    """Fill transactions.fingerprint for rows written before the column existed."""
+    updated = backfill_fingerprints(
+        chunk_size=current_app.config.get("IMPORT_BATCH_SIZE", 5_000),
+        on_progress=lambda done, total: ctx.progress(done / total if total else 1.0, f"{done}/{total} rows"),
+    )
+    return {"updated": updated}
+
+
+@job_handler("receipt_thumbnail", concurrency=4, max_attempts=3)
+def receipt_thumbnail(ctx):
+    """payload: {"sha256"}; decodes and resizes the image off the request path."""
+    return generate_thumbnail(ctx.payload["sha256"], max_side=current_app.config.get("RECEIPT_THUMBNAIL_SIZE", 320))
+
+
+@job_handler("train_categorizer", concurrency=1, max_attempts=2)
+def train_categorizer(ctx):
+    """payload: {"full": bool}; incremental by default (see services/training_service.py)."""
+    config = current_app.config
+    return run_categorizer_training(
+        config.get("ML_MODEL_FOLDER"),
+        full=bool(ctx.payload.get("full")),
+        chunk_size=config.get("ML_TRAIN_CHUNK_SIZE", 20_000),
+        processes=config.get("ML_TRAIN_PROCESSES", 2),
+        min_user_rows=config.get("ML_MIN_USER_ROWS", 50),
+        full_every=config.get("ML_FULL_RETRAIN_EVERY", 10),
+        max_edited=config.get("ML_MAX_EDITED_FRACTION", 0.05),
+        settle_seconds=config.get("SYNC_SETTLE_SECONDS", 5),
+        keep_versions=config.get("ML_KEEP_VERSIONS", 3),
+        on_progress=ctx.progress,
+    )
@@ -0,0 +1,63 @@
+"""
+Benchmarks for the API hot paths.
+
+Run from backend/ (pip install -r benchmarks/requirements.txt):
+    pytest benchmarks                                # first run saves a baseline, later runs compare
+    pytest benchmarks --benchmark-save=baseline      # re-record the baseline after an intended change
+    BENCH_TRANSACTIONS=1000000 pytest benchmarks     # production-scale data
+
+Thresholds come from benchmarks/pytest.ini (--benchmark-compare-fail).
+"""
+
+import itertools
+
+
+def _ok(resp, status=200):
+    assert resp.status_code == status, (resp.status_code, resp.get_data(as_text=True)[:300])
+    return resp
+
+
+def bench_login(benchmark, client, password):
+    benchmark(lambda: _ok(client.post("/api/login", json={"email": "user2@example.com", "password": password})))
+
+
+def bench_token_required_overhead(benchmark, client, user_headers):
+    """304 profile GET: decode JWT + revocation check + user lookup + ETag, nothing else."""
+    etag = _ok(client.get("/api/user/profile", headers=user_headers)).headers["ETag"]
+    headers = {**user_headers, "If-None-Match": etag}
+    benchmark(lambda: _ok(client.get("/api/user/profile", headers=headers), 304))
+
+
+def bench_list_transactions(benchmark, client, user_headers):
+    benchmark(lambda: _ok(client.get("/api/transactions", headers=user_headers)))
+
+
+def bench_list_transactions_not_modified(benchmark, client, user_headers):
+    etag = _ok(client.get("/api/transactions", headers=user_headers)).headers["ETag"]
+    headers = {**user_headers, "If-None-Match": etag}
+    benchmark(lambda: _ok(client.get("/api/transactions", headers=headers), 304))
+
+
+def bench_list_transactions_filtered(benchmark, client, user_headers, categories):
+    params = {"category_id": categories["Food"], "start_date": "2000-01-01", "vendor": "Swiggy"}
+    benchmark(lambda: _ok(client.get("/api/transactions", headers=user_headers, query_string=params)))
+
+
+def bench_admin_list_transactions_date_range(benchmark, client, admin_headers):
+    params = {"start_date": "2100-01-01"}  # index range scan, empty result
+    benchmark(lambda: _ok(client.get("/api/transactions", headers=admin_headers, query_string=params)))
+
+
+def bench_create_transaction(benchmark, client, user_headers, categories):
+    body = {"amount": 250.0, "vendor": "Swiggy", "category_id": categories["Food"], "note": "bench"}
+    benchmark(lambda: _ok(client.post("/api/transactions", headers=user_headers, json=body), 201))
+
+
+def bench_update_transaction(benchmark, client, user_headers):
+    txn_id = _ok(client.post("/api/transactions", headers=user_headers, json={"amount": 1}), 201).json["transaction"]["id"]
+    amounts = itertools.count(2)
+    benchmark(lambda: _ok(client.put(f"/api/transactions/{txn_id}", headers=user_headers, json={"amount": next(amounts)})))
+
+
+def bench_summary(benchmark, client, user_headers):
+    benchmark(lambda: _ok(client.get("/api/transactions/summary", headers=user_headers)))
@@ -0,0 +1,79 @@
+"""
+Fixtures for the API benchmark suite.
+
+The app is pointed at a scratch SQLite file (DATABASE_URL) that is seeded once
+per session with `seed.seed()`. Size it with BENCH_USERS / BENCH_TRANSACTIONS.
+"""
+
+import glob
+import os
+import sys
+import tempfile
+
+import pytest
+
+BENCH_DIR = tempfile.mkdtemp(prefix="set-bench-")
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(BENCH_DIR, "bench.sqlite3"))
+# login is benchmarked in a tight loop; the auth throttle would turn it into a 429 benchmark
+os.environ.setdefault("RATELIMIT_ENABLED", "false")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PASSWORD = "password123"
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".baselines")
+
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_configure(config):
+    # The first run on a machine has nothing to compare against: record instead of failing.
+    if not glob.glob(os.path.join(BASELINE_DIR, "*", "*.json")) and getattr(config.option, "benchmark_compare", None) is not None:
+        config.option.benchmark_compare = None
+        config.option.benchmark_compare_fail = None
+        config.option.benchmark_save = "baseline"
+
+
+@pytest.fixture(scope="session")
+def flask_app():
+    from app import app
+    from seed import seed
+
+    with app.app_context():
+        seeded = seed(
+            users=int(os.getenv("BENCH_USERS", 20)),
+            transactions=int(os.getenv("BENCH_TRANSACTIONS", 50_000)),
+            password=PASSWORD,
+            verbose=False,
+        )
+    app.config["SEEDED"] = seeded
+    return app
+
+
+@pytest.fixture(scope="session")
+def password():
+    return PASSWORD
+
+
+@pytest.fixture(scope="session")
+def client(flask_app):
+    return flask_app.test_client()
+
+
+def _login(client, email):
+    resp = client.post("/api/login", json={"email": email, "password": PASSWORD})
+    assert resp.status_code == 200, resp.json
+    return {"Authorization": f"Bearer {resp.json['access_token']}"}
+
+
+@pytest.fixture(scope="session")
+def user_headers(client):
+    # user1 is a regular user; user0 is the admin
+    return _login(client, "user1@example.com")
+
+
+@pytest.fixture(scope="session")
+def admin_headers(client):
+    return _login(client, "user0@example.com")
+
+
+@pytest.fixture(scope="session")
+def categories(flask_app):
+    return flask_app.config["SEEDED"]["categories"]
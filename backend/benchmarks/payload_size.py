@@ -0,0 +1,81 @@
+"""
+Bytes-on-wire and serialization CPU for large transaction listings.
+
+Builds N synthetic rows shaped exactly like `Transaction.to_dict()` and reports,
+for every available JSON encoder, the encode time and the body size raw / gzip / br.
+
+Usage (from backend/):
+    python -m benchmarks.payload_size            # 10k rows
+    python -m benchmarks.payload_size --rows 50000 --repeat 5
+"""
+
+import argparse
+import datetime
+import random
+import time
+
+from application.api.representations import ENCODERS
+from application.compression import compress_body, brotli
+
+VENDORS = ["Amazon", "Swiggy", "Zomato", "Uber", "BigBasket", "Flipkart", None]
+CATEGORIES = [(1, "Food"), (2, "Travel"), (3, "Shopping"), (4, "Bills"), (None, None)]
+
+
+def make_rows(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    start = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, n + 1):
+        cid, cname = rnd.choice(CATEGORIES)
+        ts = (start + datetime.timedelta(minutes=rnd.randint(0, 60 * 24 * 365))).isoformat()
+        rows.append({
+            "id": i,
+            "user_id": rnd.randint(1, 50),
+            "amount": round(rnd.uniform(10, 5000), 2),
+            "currency": "INR",
+            "category_id": cid,
+            "category": cname,
+            "note": rnd.choice(["", "lunch", "cab to office", "monthly groceries", None]),
+            "vendor": rnd.choice(VENDORS),
+            "date": ts,
+            "is_recurring": rnd.random() < 0.1,
+            "recurrence_rule": None,
+            "meta_data": None,
+            "created_at": ts,
+            "updated_at": ts,
+            "is_deleted": False,
+        })
+    return {"transactions": rows}
+
+
+def _best_of(fn, repeat):
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def run(rows: int, repeat: int):
+    payload = make_rows(rows)
+    config = {"COMPRESS_LEVEL": 6, "COMPRESS_BR_QUALITY": 4}
+    encodings = ["gzip"] + (["br"] if brotli is not None else [])
+
+    print(f"{rows} rows, best of {repeat}")
+    print(f"{'encoder':<10}{'encode ms':>12}{'raw KB':>10}" + "".join(f"{e + ' KB':>10}{e + ' ms':>10}" for e in encodings))
+    for name, dumps in ENCODERS.items():
+        secs, body = _best_of(lambda: dumps(payload), repeat)
+        line = f"{name:<10}{secs * 1000:>12.1f}{len(body) / 1024:>10.1f}"
+        for enc in encodings:
+            csecs, compressed = _best_of(lambda: compress_body(body, enc, config), repeat)
+            line += f"{len(compressed) / 1024:>10.1f}{csecs * 1000:>10.1f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    run(args.rows, args.repeat)
@@ -0,0 +1,311 @@
+"""
+Offline load test: many simulated dashboard users against the real app under gunicorn.
+
+What it does:
+1. seeds a scratch SQLite database (seed.py) — nothing touches data/database.sqlite3
+2. starts gunicorn on 127.0.0.1 with that DATABASE_URL
+3. runs N simulated users, each looping: login -> refresh -> list -> add -> delete
+4. reports throughput, p50/p95/p99 per step, HTTP errors and SQLite lock errors
+
+Usage (from backend/):
+    python -m loadtest.run --users 50 --duration 60
+    python -m loadtest.run --users 200 --workers 4 --threads 8 --think-ms 200 --json report.json
+
+Only the standard library is used on the client side; gunicorn must be installed.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import re
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STEPS = ("login", "refresh", "list", "add", "delete")
+LOCK_MARKERS = ("database is locked", "database table is locked")
+LOG_HEADER = re.compile(r"\[\d{4}-\d\d-\d\d ")  # gunicorn and Flask log records start "[2026-01-31 ..."
+TRACEBACK = "Traceback (most recent call last):"
+CHAINED = ("The above exception was the direct cause of the following exception:",
+           "During handling of the above exception, another exception occurred:")
+
+
+class Recorder:
+    """Thread-safe collection of (step -> latencies) and error counts."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+        self.scenarios = 0
+
+    def record(self, step, seconds, status):
+        with self._lock:
+            self.latencies[step].append(seconds)
+            self.statuses[step][status] += 1
+            if status == "conn" or status >= 400:
+                self.errors[step] += 1
+
+    def scenario_done(self):
+        with self._lock:
+            self.scenarios += 1
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(int(round(pct / 100.0 * len(sorted_values))) - 1, 0)
+    return sorted_values[min(rank, len(sorted_values) - 1)]
+
+
+# --------------------------- Simulated user ---------------------------
+class DashboardUser(threading.Thread):
+    def __init__(self, host, port, email, password, recorder, stop_at, think_s, rnd):
+        super().__init__(daemon=True)
+        self.host, self.port = host, port
+        self.email, self.password = email, password
+        self.recorder = recorder
+        self.stop_at = stop_at
+        self.think_s = think_s
+        self.rnd = rnd
+        self.conn = None
+
+    def _request(self, step, method, path, body=None, token=None):
+        headers = {"Content-Type": "application/json", "Accept-Encoding": "gzip"}
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        payload = json.dumps(body) if body is not None else None
+        started = time.perf_counter()
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=30)
+            self.conn.request(method, path, body=payload, headers=headers)
+            resp = self.conn.getresponse()
+            raw = resp.read()
+            status = resp.status
+            if resp.getheader("Connection", "").lower() == "close":
+                self.conn.close()
+                self.conn = None
+        except (OSError, http.client.HTTPException):
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+            self.recorder.record(step, time.perf_counter() - started, "conn")
+            return None, None
+        self.recorder.record(step, time.perf_counter() - started, status)
+        if resp.getheader("Content-Encoding") == "gzip":
+            import gzip
+            raw = gzip.decompress(raw)
+        try:
+            data = json.loads(raw) if raw else None
+        except ValueError:
+            data = None
+        return status, data
+
+    def _think(self):
+        if self.think_s:
+            time.sleep(self.rnd.uniform(0.5, 1.5) * self.think_s)
+
+    def run(self):
+        while time.time() < self.stop_at:
+            status, data = self._request("login", "POST", "/api/login", {"email": self.email, "password": self.password})
+            if status != 200:
+                self._think()
+                continue
+            access, refresh = data["access_token"], data["refresh_token"]
+            self._think()
+
+            status, data = self._request("refresh", "POST", "/api/token/refresh", {"refresh_token": refresh})
+            if status == 200:
+                access = data["access_token"]
+                refresh = data.get("refresh_token", refresh)
+            self._think()
+
+            self._request("list", "GET", "/api/transactions", token=access)
+            self._think()
+
+            body = {"amount": round(self.rnd.uniform(50, 2000), 2), "vendor": "Load Test", "note": "loadtest"}
+            status, data = self._request("add", "POST", "/api/transactions", body, token=access)
+            self._think()
+
+            if status == 201:
+                self._request("delete", "DELETE", f"/api/transactions/{data['transaction']['id']}", token=access)
+            self.recorder.scenario_done()
+            self._think()
+        if self.conn is not None:
+            self.conn.close()
+
+
+# --------------------------- Server lifecycle ---------------------------
+def seed_database(env, users, transactions):
+    subprocess.run(
+        [sys.executable, "seed.py", "--users", str(users), "--transactions", str(transactions)],
+        cwd=BACKEND_DIR, env=env, check=True, stdout=subprocess.DEVNULL,
+    )
+
+
+def start_gunicorn(env, port, workers, threads, log_path):
+    cmd = [
+        sys.executable, "-m", "gunicorn", "app:app",
+        "--bind", f"127.0.0.1:{port}",
+        "--workers", str(workers),
+        "--threads", str(threads),
+        "--worker-class", "gthread" if threads > 1 else "sync",
+        "--log-level", "warning",
+    ]
+    log = open(log_path, "w")
+    proc = subprocess.Popen(cmd, cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT)
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"gunicorn exited early, see {log_path}")
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/api/health/live")
+            if conn.getresponse().status == 200:
+                return proc, log
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("gunicorn did not become live within 30s")
+
+
+def stop_gunicorn(proc, log):
+    proc.send_signal(signal.SIGTERM)
+    try:
+        proc.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+    log.close()
+
+
+def count_lock_errors(log_path):
+    """
+    SQLite lock errors in the gunicorn log, one per logged error. A record (from
+    one "[timestamp] ..." header, or one traceback, to the next) counts once however
+    many of its lines mention the lock: a single OperationalError shows it in
+    sqlite3's exception and again in the SQLAlchemy exception chained to it.
+    """
+    errors = 0
+    locked = has_traceback = chained = False
+    with open(log_path, errors="replace") as f:
+        for line in f:
+            text = line.strip()
+            if LOG_HEADER.match(line) or (text == TRACEBACK and has_traceback and not chained):
+                errors += locked
+                locked = has_traceback = False
+            if text == TRACEBACK:
+                has_traceback, chained = True, False
+            elif text.startswith(CHAINED):
+                chained = True
+            locked = locked or any(m in line for m in LOCK_MARKERS)
+    return errors + locked
+
+
+# --------------------------- Report ---------------------------
+def build_report(recorder, elapsed, lock_errors, args):
+    steps = {}
+    total = 0
+    for step in STEPS:
+        values = sorted(recorder.latencies.get(step, []))
+        total += len(values)
+        steps[step] = {
+            "requests": len(values),
+            "errors": recorder.errors.get(step, 0),
+            "statuses": {str(k): v for k, v in recorder.statuses.get(step, {}).items()},
+            "p50_ms": round(percentile(values, 50) * 1000, 1) if values else None,
+            "p95_ms": round(percentile(values, 95) * 1000, 1) if values else None,
+            "p99_ms": round(percentile(values, 99) * 1000, 1) if values else None,
+        }
+    return {
+        "config": {k: v for k, v in vars(args).items() if k != "json"},
+        "elapsed_s": round(elapsed, 2),
+        "requests": total,
+        "throughput_rps": round(total / elapsed, 1) if elapsed else None,
+        "scenarios": recorder.scenarios,
+        "scenarios_per_s": round(recorder.scenarios / elapsed, 2) if elapsed else None,
+        "errors": sum(recorder.errors.values()),
+        "sqlite_lock_errors": lock_errors,
+        "steps": steps,
+    }
+
+
+def print_report(report):
+    print(f"\n{report['requests']:,} requests in {report['elapsed_s']}s "
+          f"-> {report['throughput_rps']} req/s, {report['scenarios_per_s']} scenarios/s")
+    print(f"errors: {report['errors']}   sqlite lock errors: {report['sqlite_lock_errors']}\n")
+    print(f"{'step':<10}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for step, s in report["steps"].items():
+        print(f"{step:<10}{s['requests']:>10}{s['errors']:>8}{str(s['p50_ms']):>10}{str(s['p95_ms']):>10}{str(s['p99_ms']):>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20, help="concurrent simulated users")
+    parser.add_argument("--duration", type=float, default=30, help="seconds to run")
+    parser.add_argument("--think-ms", type=float, default=0, help="mean pause between steps")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn worker processes")
+    parser.add_argument("--threads", type=int, default=4, help="threads per worker (gthread)")
+    parser.add_argument("--port", type=int, default=5099)
+    parser.add_argument("--seed-transactions", type=int, default=20_000)
+    parser.add_argument("--keep", action="store_true", help="keep the scratch dir (DB + server log)")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="set-loadtest-")
+    env = dict(os.environ, DATABASE_URL="sqlite:///" + os.path.join(workdir, "loadtest.sqlite3"), ENV="development")
+    # every simulated user logs in from 127.0.0.1; keep the auth throttle out of the measurement
+    env.setdefault("RATELIMIT_ENABLED", "false")
+    log_path = os.path.join(workdir, "gunicorn.log")
+    password = "password123"
+    accounts = max(args.users, 2) + 1  # user0 is the admin; simulated users start at user1
+
+    print(f"🌱 seeding {accounts} users / {args.seed_transactions:,} transactions in {workdir}")
+    seed_database(env, accounts, args.seed_transactions)
+
+    print(f"🚀 gunicorn: {args.workers} workers x {args.threads} threads on :{args.port}")
+    proc, log = start_gunicorn(env, args.port, args.workers, args.threads, log_path)
+
+    recorder = Recorder()
+    stop_at = time.time() + args.duration
+    users = [
+        DashboardUser("127.0.0.1", args.port, f"user{i + 1}@example.com", password, recorder, stop_at,
+                      args.think_ms / 1000.0, random.Random(i))
+        for i in range(args.users)
+    ]
+    print(f"👥 {args.users} users for {args.duration:.0f}s ...")
+    started = time.time()
+    try:
+        for u in users:
+            u.start()
+        for u in users:
+            u.join()
+    finally:
+        elapsed = time.time() - started
+        stop_gunicorn(proc, log)
+
+    report = build_report(recorder, elapsed, count_lock_errors(log_path), args)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.keep:
+        print(f"\nscratch files kept in {workdir}")
+    else:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+"""add users.data_version for conditional GET
+
+Revision ID: a1c3e5f70026
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c3e5f70026'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _has_column(table, column):
+    # dev databases are bootstrapped with db.create_all(), so the column may already exist
+    inspector = sa.inspect(op.get_bind())
+    return column in {c["name"] for c in inspector.get_columns(table)}
+
+
+def upgrade():
+    if not _has_column('users', 'data_version'):
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('data_version')
@@ -0,0 +1,45 @@
+"""receipts table for transaction attachments
+
+Revision ID: a9d3f5b70048
+Revises: f3c9a7d20047
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d3f5b70048'
+down_revision = 'f3c9a7d20047'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'receipts' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'receipts',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('transaction_id', sa.Integer(), nullable=False),
+        sa.Column('sha256', sa.String(length=64), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('content_type', sa.String(length=64), nullable=False),
+        sa.Column('filename', sa.String(length=255), nullable=True),
+        sa.Column('thumbnail_status', sa.String(length=16), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_receipts_user_id', 'receipts', ['user_id'])
+    op.create_index('ix_receipts_transaction_id', 'receipts', ['transaction_id'])
+    op.create_index('ix_receipts_sha256', 'receipts', ['sha256'])
+    op.create_index('ix_receipts_created_at', 'receipts', ['created_at'])
+    op.create_index('ix_receipts_updated_at', 'receipts', ['updated_at'])
+
+
+def downgrade():
+    op.drop_table('receipts')
@@ -0,0 +1,56 @@
+"""transaction_tags: indexed copy of meta_data["tags"]
+
+Backfilled from the JSON column on SQLite (json_each); other databases get
+an empty table and fill it as transactions are written.
+
+Revision ID: b2e6c8d10049
+Revises: a9d3f5b70048
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e6c8d10049'
+down_revision = 'a9d3f5b70048'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    bind = op.get_bind()
+    # dev databases are bootstrapped with db.create_all(), so the table may already exist
+    if 'transaction_tags' not in sa.inspect(bind).get_table_names():
+        op.create_table(
+            'transaction_tags',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('transaction_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('tag', sa.String(length=64), nullable=False),
+            sa.ForeignKeyConstraint(['transaction_id'], ['transactions.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('transaction_id', 'tag', name='uq_transaction_tag'),
+        )
+        op.create_index('ix_txn_tags_user_tag', 'transaction_tags', ['user_id', 'tag', 'transaction_id'])
+
+    if bind.dialect.name == 'sqlite':
+        # idempotent (OR IGNORE on uq_transaction_tag), so it also fills a pre-created table;
+        # same normalization as application/tags.py: stripped, lower case, 64 chars
+        op.execute("""
+            INSERT OR IGNORE INTO transaction_tags (transaction_id, user_id, tag)
+            SELECT t.id, t.user_id, substr(lower(trim(j.value)), 1, 64)
+            FROM (SELECT id, user_id,
+                         CASE WHEN json_valid(meta_data) THEN meta_data ELSE '{}' END AS meta
+                  FROM transactions) AS t,
+                 json_each(t.meta, '$.tags') AS j
+            WHERE json_type(t.meta, '$.tags') = 'array'
+              AND j.type = 'text'
+              AND trim(j.value) != ''
+        """)
+
+
+def downgrade():
+    op.drop_table('transaction_tags')
@@ -0,0 +1,48 @@
+"""refresh token families and users.token_generation
+
+Revision ID: b7d2f1e40037
+Revises: a1c3e5f70026
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d2f1e40037'
+down_revision = 'a1c3e5f70026'
+branch_labels = None
+depends_on = None
+
+
+def _columns(table):
+    return {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _indexes(table):
+    return {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade():
+    if 'token_generation' not in _columns('users'):
+        with op.batch_alter_table('users') as batch_op:
+            batch_op.add_column(sa.Column('token_generation', sa.Integer(), server_default='0', nullable=False))
+
+    cols = _columns('refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        if 'family_id' not in cols:
+            batch_op.add_column(sa.Column('family_id', sa.String(length=64), nullable=True))
+        if 'used_at' not in cols:
+            batch_op.add_column(sa.Column('used_at', sa.DateTime(), nullable=True))
+    if 'ix_refresh_tokens_family_id' not in _indexes('refresh_tokens'):
+        op.create_index('ix_refresh_tokens_family_id', 'refresh_tokens', ['family_id'])
+
+
+def downgrade():
+    op.drop_index('ix_refresh_tokens_family_id', table_name='refresh_tokens')
+    with op.batch_alter_table('refresh_tokens') as batch_op:
+        batch_op.drop_column('used_at')
+        batch_op.drop_column('family_id')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('token_generation')
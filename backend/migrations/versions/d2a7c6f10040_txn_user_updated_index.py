@@ -0,0 +1,26 @@
+"""index transactions (user_id, updated_at) for incremental sync
+
+Revision ID: d2a7c6f10040
+Revises: c4e8a2b90038
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a7c6f10040'
+down_revision = 'c4e8a2b90038'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    indexes = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes('transactions')}
+    if 'ix_txn_user_updated' not in indexes:
+        op.create_index('ix_txn_user_updated', 'transactions', ['user_id', 'updated_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_txn_user_updated', table_name='transactions')
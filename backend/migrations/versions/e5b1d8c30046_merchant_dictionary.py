@@ -0,0 +1,69 @@
+"""merchant dictionary and transactions.merchant_id
+
+Revision ID: e5b1d8c30046
+Revises: d2a7c6f10040
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b1d8c30046'
+down_revision = 'd2a7c6f10040'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+    if 'merchants' not in tables:
+        op.create_table(
+            'merchants',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=120), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('name'),
+        )
+        op.create_index('ix_merchants_created_at', 'merchants', ['created_at'])
+        op.create_index('ix_merchants_updated_at', 'merchants', ['updated_at'])
+    if 'merchant_aliases' not in tables:
+        op.create_table(
+            'merchant_aliases',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('merchant_id', sa.Integer(), nullable=False),
+            sa.Column('pattern', sa.String(length=120), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('updated_at', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['merchant_id'], ['merchants.id']),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('pattern'),
+        )
+        op.create_index('ix_merchant_aliases_merchant_id', 'merchant_aliases', ['merchant_id'])
+        op.create_index('ix_merchant_aliases_created_at', 'merchant_aliases', ['created_at'])
+        op.create_index('ix_merchant_aliases_updated_at', 'merchant_aliases', ['updated_at'])
+
+    # dev databases are bootstrapped with db.create_all(), so the column may already exist
+    if 'merchant_id' not in {c["name"] for c in inspector.get_columns('transactions')}:
+        with op.batch_alter_table('transactions') as batch_op:
+            batch_op.add_column(sa.Column('merchant_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key('fk_transactions_merchant_id', 'merchants', ['merchant_id'], ['id'])
+    indexes = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes('transactions')}
+    if 'ix_transactions_merchant_id' not in indexes:
+        op.create_index('ix_transactions_merchant_id', 'transactions', ['merchant_id'])
+    if 'ix_txn_user_merchant' not in indexes:
+        op.create_index('ix_txn_user_merchant', 'transactions', ['user_id', 'merchant_id'])
+
+
+def downgrade():
+    op.drop_index('ix_txn_user_merchant', table_name='transactions')
+    op.drop_index('ix_transactions_merchant_id', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_constraint('fk_transactions_merchant_id', type_='foreignkey')
+        batch_op.drop_column('merchant_id')
+    op.drop_table('merchant_aliases')
+    op.drop_table('merchants')
@@ -0,0 +1,37 @@
+"""transactions.fingerprint for duplicate detection
+
+Existing rows keep a NULL fingerprint until the `fingerprint_transactions`
+job (POST /api/jobs) fills it in; the duplicate checks hash NULL rows on the
+fly meanwhile.
+
+Revision ID: f3c9a7d20047
+Revises: e5b1d8c30046
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c9a7d20047'
+down_revision = 'e5b1d8c30046'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    # dev databases are bootstrapped with db.create_all(), so the column may already exist
+    if 'fingerprint' not in {c["name"] for c in inspector.get_columns('transactions')}:
+        with op.batch_alter_table('transactions') as batch_op:
+            batch_op.add_column(sa.Column('fingerprint', sa.String(length=32), nullable=True))
+    indexes = {i["name"] for i in sa.inspect(op.get_bind()).get_indexes('transactions')}
+    if 'ix_txn_user_fingerprint' not in indexes:
+        op.create_index('ix_txn_user_fingerprint', 'transactions', ['user_id', 'fingerprint'])
+
+
+def downgrade():
+    op.drop_index('ix_txn_user_fingerprint', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('fingerprint')
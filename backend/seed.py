@@ -0,0 +1,206 @@
+"""
+Synthetic data generator for Smart Expense Tracker.
+
+Creates realistic users, global + per-user categories, the default merchant
+dictionary and transactions
+(vendors per category, log-normal amounts, monthly recurring bills) using
+batched Core inserts, so millions of rows load in minutes rather than hours.
+
+Usage (from backend/):
+    python seed.py                                   # 20 users, 50k transactions
+    python seed.py --users 1000 --transactions 2000000 --batch 50000
+    DATABASE_URL=sqlite:////tmp/bench.sqlite3 python seed.py --users 50
+
+Every generated user has the password given by --password (hashed once and
+reused, KDFs are deliberately slow). The first user is an admin.
+
+With SHARD_URIS set, per-user rows are inserted on each user's shard and the
+global categories are copied to every shard (application/sharding.py).
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import insert, select, update, text
+
+# (category, color, [vendors], median amount, spread)
+CATEGORY_PROFILES = [
+    ("Groceries", "#4CAF50", ["BigBasket", "DMart", "Reliance Fresh", "Blinkit", "Zepto"], 900, 0.7),
+    ("Food", "#FF9800", ["Swiggy", "Zomato", "Dominos", "Starbucks", "Local Cafe"], 350, 0.6),
+    ("Travel", "#2196F3", ["Uber", "Ola", "Rapido", "IRCTC", "IndiGo"], 400, 1.1),
+    ("Shopping", "#9C27B0", ["Amazon", "Flipkart", "Myntra", "Ajio", "Decathlon"], 1500, 0.9),
+    ("Bills", "#F44336", ["Airtel", "Jio", "BESCOM", "Tata Power", "ACT Fibernet"], 800, 0.4),
+    ("Entertainment", "#E91E63", ["Netflix", "Spotify", "BookMyShow", "PVR", "Steam"], 500, 0.6),
+    ("Health", "#00BCD4", ["Apollo Pharmacy", "1mg", "Practo", "Cult.fit"], 700, 0.8),
+    ("Rent", "#795548", ["Landlord"], 18000, 0.2),
+]
+NOTES = ["", "", "lunch", "weekly shop", "cab to office", "gift", "refill", "subscription", "split with friends"]
+RECURRING = {"Rent": "FREQ=MONTHLY", "Bills": "FREQ=MONTHLY", "Entertainment": "FREQ=MONTHLY"}
+
+
+def _seed_users(session, n_users, password, email_domain):
+    from application.models.models import User
+    from application.passwords import hash_password
+
+    pw_hash = hash_password(password)
+    now = datetime.utcnow()
+    rows = [
+        {
+            "name": f"User {i}",
+            "email": f"user{i}@{email_domain}",
+            "password_hash": pw_hash,
+            "role": "admin" if i == 0 else "user",
+            "currency": "INR",
+            "is_active": True,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for i in range(n_users)
+    ]
+    session.execute(insert(User.__table__), rows)
+    emails = [r["email"] for r in rows]
+    return list(session.scalars(select(User.id).where(User.email.in_(emails)).order_by(User.id)))
+
+
+def _insert_per_user(session, table, rows):
+    """Core INSERT of rows carrying a user_id; with sharding on, one INSERT per shard."""
+    from application.sharding import shards, use_shard
+
+    if not shards.enabled:
+        session.execute(insert(table), rows)
+        return
+    by_shard = {}
+    for row in rows:
+        by_shard.setdefault(shards.name_for_user(row["user_id"]), []).append(row)
+    for name, shard_rows in by_shard.items():
+        with use_shard(name=name):
+            session.execute(insert(table), shard_rows)
+
+
+def _seed_categories(session, user_ids, per_user_custom):
+    from application.models.models import Category
+    from application.models.model_utils import insert_global_categories
+    from application.sharding import shards, use_shard
+
+    now = datetime.utcnow()
+    global_rows = [
+        {"name": name, "user_id": None, "color": color, "created_at": now, "updated_at": now}
+        for name, color, *_ in CATEGORY_PROFILES
+    ]
+    if shards.enabled:
+        insert_global_categories(global_rows)
+    else:
+        session.execute(insert(Category.__table__), global_rows)
+    if per_user_custom:
+        _insert_per_user(session, Category.__table__, [
+            {"name": f"Custom {k}", "user_id": uid, "color": None, "created_at": now, "updated_at": now}
+            for uid in user_ids for k in range(per_user_custom)
+        ])
+    with use_shard(name=shards.names[0] if shards.enabled else None):
+        return {name: cid for cid, name in session.execute(
+            select(Category.id, Category.name).where(Category.user_id.is_(None)))}
+
+
+def _transaction_rows(rnd, user_ids, category_ids, n, days):
+    """Yield transaction dicts; recurring categories get one row per user per month."""
+    end = datetime.utcnow()
+    start = end - timedelta(days=days)
+    weights = [6, 8, 4, 3, 0, 1, 2, 0]  # Rent / Bills only come from the recurring pass
+    emitted = 0
+
+    months = max(days // 30, 1)
+    for uid in user_ids:
+        for name, rule in RECURRING.items():
+            _, _, vendors, median, spread = next(p for p in CATEGORY_PROFILES if p[0] == name)
+            vendor = rnd.choice(vendors)
+            amount = round(rnd.lognormvariate(0, spread / 4) * median, 2)
+            for m in range(months):
+                if emitted >= n:
+                    return
+                date = start + timedelta(days=30 * m + rnd.randint(0, 3), hours=rnd.randint(8, 20))
+                yield uid, category_ids[name], vendor, amount, date, True, rule
+                emitted += 1
+
+    span = int((end - start).total_seconds())
+    while emitted < n:
+        uid = rnd.choice(user_ids)
+        name, _, vendors, median, spread = rnd.choices(CATEGORY_PROFILES, weights=weights)[0]
+        date = start + timedelta(seconds=rnd.randrange(span))
+        yield uid, category_ids[name], rnd.choice(vendors), round(rnd.lognormvariate(0, spread) * median, 2), date, False, None
+        emitted += 1
+
+
+def seed(users: int = 20, transactions: int = 50_000, days: int = 365, batch: int = 20_000,
+         password: str = "password123", email_domain: str = "example.com", per_user_custom: int = 2,
+         random_seed: int = 42, verbose: bool = True):
+    """
+    Populate the configured database. Must run inside an app context.
+    Returns {"user_ids": [...], "categories": {name: id}, "transactions": n}.
+    """
+    from application.database import db
+    from application.merchants import seed_default_merchants, resolve_merchant_id
+    from application.dedup import transaction_fingerprint
+    from application.models.models import Transaction, User
+
+    rnd = random.Random(random_seed)
+    session = db.session
+    t0 = time.perf_counter()
+
+    if session.get_bind().dialect.name == "sqlite":
+        # bulk-load settings for this connection only
+        session.execute(text("PRAGMA synchronous=OFF"))
+
+    user_ids = _seed_users(session, users, password, email_domain)
+    category_ids = _seed_categories(session, user_ids, per_user_custom)
+    merchants = seed_default_merchants(session)
+    session.commit()
+    if verbose:
+        print(f"👤 {len(user_ids)} users, {len(category_ids)} global categories, {merchants} merchants")
+
+    txn_table = Transaction.__table__
+    buf, total = [], 0
+    for uid, cid, vendor, amount, date, recurring, rule in _transaction_rows(rnd, user_ids, category_ids, transactions, days):
+        buf.append({
+            "user_id": uid, "amount": amount, "currency": "INR", "category_id": cid,
+            "note": rnd.choice(NOTES), "vendor": vendor, "merchant_id": resolve_merchant_id(vendor), "date": date,
+            "fingerprint": transaction_fingerprint(uid, amount, date, vendor),
+            "is_recurring": recurring, "recurrence_rule": rule, "meta_data": {"source": "seed"},
+            "created_at": date, "updated_at": date, "is_deleted": False,
+        })
+        if len(buf) >= batch:
+            _insert_per_user(session, txn_table, buf)
+            session.commit()
+            total += len(buf)
+            buf.clear()
+            if verbose:
+                print(f"   … {total:,} transactions ({total / (time.perf_counter() - t0):,.0f} rows/s)")
+    if buf:
+        _insert_per_user(session, txn_table, buf)
+        total += len(buf)
+
+    # Core inserts bypass the ORM flush hooks, so bump the ETag versions by hand
+    session.execute(update(User).where(User.id.in_(user_ids)).values(data_version=User.data_version + 1))
+    session.commit()
+
+    if verbose:
+        print(f"✅ Seeded {total:,} transactions in {time.perf_counter() - t0:.1f}s")
+    return {"user_ids": user_ids, "categories": category_ids, "transactions": total}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--transactions", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=365, help="history length")
+    parser.add_argument("--batch", type=int, default=20_000, help="rows per INSERT batch")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--email-domain", default="example.com")
+    parser.add_argument("--seed", type=int, default=42, help="random seed (output is reproducible)")
+    args = parser.parse_args()
+
+    from app import app
+
+    with app.app_context():
+        seed(users=args.users, transactions=args.transactions, days=args.days, batch=args.batch,
+             password=args.password, email_domain=args.email_domain, random_seed=args.seed)
@@ -0,0 +1,154 @@
+"""
+Background job worker for Smart Expense Tracker (see application/jobs.py).
+
+Claims queued jobs from the `jobs` table and runs them on a process pool, so
+exports, backups and other heavy work never occupy a web request thread.
+Run as many workers (on as many hosts) as needed: claiming is atomic.
+Housekeeping jobs (audit log retention) are enqueued once a day.
+
+Usage (from backend/):
+    python worker.py                     # JOB_WORKER_PROCESSES processes, runs until SIGTERM / Ctrl-C
+    python worker.py --processes 4
+    python worker.py --once              # drain runnable jobs, then exit (cron / tests)
+"""
+
+import argparse
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+from sqlalchemy import text
+
+logger = logging.getLogger("worker")
+
+_app = None
+
+
+# --------------------------- Pool processes ---------------------------
+def _init_process():
+    """Each pool process builds its own app (and engine); nothing DB-related is inherited."""
+    global _app
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # the supervisor handles Ctrl-C and drains
+    from app import app
+    _app = app
+
+
+def _run_in_process(job_id):
+    from application.jobs import run_job
+
+    with _app.app_context():
+        return run_job(job_id)
+
+
+# --------------------------- Supervisor ---------------------------
+class Worker:
+    def __init__(self, app, processes, poll_interval, stale_after, housekeeping=()):
+        self.app = app
+        self.processes = processes
+        self.poll_interval = poll_interval
+        self.stale_after = stale_after
+        self.housekeeping = housekeeping  # [(job_type, every_seconds)] enqueued periodically
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = False
+        self.pool = None
+
+    def _new_pool(self):
+        # spawn, not fork: a forked child would share the parent's SQLite / socket connections
+        return ProcessPoolExecutor(max_workers=self.processes, mp_context=multiprocessing.get_context("spawn"),
+                                   initializer=_init_process)
+
+    def _prepare_database(self):
+        from application.database import db
+
+        if db.engine.dialect.name == "sqlite":
+            # WAL lets progress updates and API writes proceed while a job holds a long read open
+            db.session.execute(text("PRAGMA journal_mode=WAL"))
+            db.session.commit()
+
+    def stop(self, *_):
+        logger.info("stopping: finishing running jobs, no new claims")
+        self.stopping = True
+
+    def _reap(self, done, inflight):
+        from application.jobs import record_crash
+
+        broken = False
+        for future in done:
+            job_id = inflight.pop(future)
+            try:
+                status = future.result()
+                logger.info("job %s finished: %s", job_id, status)
+            except BrokenProcessPool:
+                broken = True
+                record_crash(job_id, "worker process died while running the job", locked_by=self.worker_id)
+            except Exception as e:  # run_job records handler errors itself; this is pickling / infra
+                record_crash(job_id, f"{type(e).__name__}: {e}", locked_by=self.worker_id)
+        if broken:
+            logger.error("process pool broke, starting a new one")
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._new_pool()
+
+    def run(self, once=False):
+        from application.jobs import claim_next, requeue_stale, enqueue_if_due, heartbeat
+
+        with self.app.app_context():
+            self._prepare_database()
+            self.pool = self._new_pool()
+            inflight = {}
+            next_stale_check = 0.0
+            logger.info("worker %s started with %d processes", self.worker_id, self.processes)
+            try:
+                while not (self.stopping and not inflight):
+                    if time.monotonic() >= next_stale_check:
+                        # our own jobs are alive as long as their future is pending
+                        heartbeat(list(inflight.values()), self.worker_id)
+                        requeued = requeue_stale(self.stale_after)
+                        if requeued:
+                            logger.warning("requeued %d stale jobs", requeued)
+                        for job_type, every in self.housekeeping:
+                            if enqueue_if_due(job_type, every) is not None:
+                                logger.info("enqueued periodic %s job", job_type)
+                        next_stale_check = time.monotonic() + 60
+
+                    while not self.stopping and len(inflight) < self.processes:
+                        job_id = claim_next(self.worker_id)
+                        if job_id is None:
+                            break
+                        logger.info("claimed job %s", job_id)
+                        inflight[self.pool.submit(_run_in_process, job_id)] = job_id
+
+                    if not inflight:
+                        if once:
+                            break
+                        time.sleep(self.poll_interval)
+                        continue
+                    done, _ = wait(inflight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                    self._reap(done, inflight)
+            finally:
+                self.pool.shutdown(wait=True)
+        logger.info("worker %s stopped", self.worker_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=None, help="pool size (default JOB_WORKER_PROCESSES)")
+    parser.add_argument("--once", action="store_true", help="exit when no runnable job is left")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    from app import app
+
+    worker = Worker(
+        app,
+        processes=args.processes or app.config.get("JOB_WORKER_PROCESSES", 2),
+        poll_interval=app.config.get("JOB_POLL_INTERVAL", 1.0),
+        stale_after=app.config.get("JOB_STALE_AFTER", 3600),
+        housekeeping=[("audit_retention", 24 * 3600), ("train_categorizer", 24 * 3600)],
+    )
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run(once=args.once)